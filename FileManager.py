@@ -11,6 +11,21 @@ import subprocess
 import shutil  # All imports at the top
 import logging # All imports at the top
 import sys 
+import sqlite3
+import time
+import concurrent.futures
+import multiprocessing
+import collections
+import heapq
+import itertools
+import bisect
+import array
+import mmap
+import select
+import struct
+import errno
+import re
+import json
 
 try:
     from send2trash import send2trash
@@ -18,15 +33,2662 @@ try:
 except ImportError:
     HAS_SEND2TRASH = False
 
+try:
+    import fcntl # Unix only; needed for reflinks
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+HAS_INOTIFY = False
+if platform.system() == "Linux":
+    try:
+        import ctypes
+        import ctypes.util
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        HAS_INOTIFY = hasattr(_libc, "inotify_init1")
+    except OSError:
+        pass
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
 VERSION = "1.5.7" # Incremented for final polish
 STATUS_CLEAR_DELAY_MS = 5000 # 5 seconds
 STATUS_ERROR_DELAY_MS = 10000 # 10 seconds
-QUEUE_BATCH_PROCESS_LIMIT = 50 # Process this many queue items per cycle
-QUEUE_POLL_INTERVAL_MS = 10 # Check the queue every 10ms
+QUEUE_FRAME_BUDGET_S = 0.012 # Time check_queue may spend on messages before letting Tk redraw
+QUEUE_POLL_MIN_MS = 10 # Queue poll interval while messages are coming in...
+QUEUE_POLL_MAX_MS = 100 # ...doubled each idle poll up to this (the longest a new message waits)
 
 # List of hidden/junk files to ignore when checking if a folder is empty
 JUNK_FILES = {'.ds_store', 'thumbs.db', 'desktop.ini'}
 
+APP_DIR_NAME = "FileManagementToolkit"
+HASH_CACHE_FILENAME = "hash_cache.sqlite3"
+SCAN_SNAPSHOT_FILENAME = "scan_snapshots.sqlite3"
+SCAN_SNAPSHOT_SCHEMA_VERSION = 1
+CATALOG_FILENAME = "catalog.sqlite3"
+FOLDER_SIZE_CACHE_FILENAME = "folder_sizes.sqlite3"
+FOLDER_SIZE_SCHEMA_VERSION = 1
+SETTINGS_FILENAME = "settings.json"
+EXCLUSION_TABS = ("dupe", "sorter", "collector", "finder", "analyzer") # Tabs with their own exclusion rules
+CATALOG_SCHEMA_VERSION = 2
+CATALOG_INSERT_BATCH = 5000 # Files per executemany() while building a catalog
+WATCH_SETTLE_S = 0.5 # Apply live catalog changes once events pause this long...
+WATCH_MAX_DELAY_S = 5.0 # ...or at the latest this long after the first one
+WATCH_SWEEP_INTERVAL_S = 30.0 # Folder-mtime sweep when inotify is missing or out of watches
+WATCH_RELIST_THRESHOLD = 256 # Changed names in one folder before it is listed again as a whole
+
+# inotify(7) flags
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x800
+IN_CLOEXEC = 0x80000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+HASH_CACHE_MAX_ENTRIES = 1000000 # Least-recently-used rows are evicted past this
+HASH_CACHE_COMMIT_EVERY = 500 # Batch cache writes into transactions of this size
+HASH_CACHE_SCHEMA_VERSION = 2 # Bump to discard caches written by older versions
+HASH_BLOCK_SIZE = 65536 # Read size used when hashing whole files
+HASH_MMAP_THRESHOLD = 64 * 1024**2 # Files at least this big may be hashed through mmap
+HAS_FADVISE = hasattr(os, "posix_fadvise") # Page cache hints (Linux and most Unixes)
+COMPARE_CHUNK_SIZE = 65536 # Bytes read from each file per step of a lockstep byte compare
+MAX_COMPARE_GROUP = 64 # Bigger same-size groups are hashed instead (open file limits)
+HARDLINK_SET_PREFIX = "Links" # Set # label for paths that share one inode (never auto-deleted)
+FICLONE = 0x40049409 # Linux ioctl: share all extents of one file with another (btrfs, XFS, ...)
+LINK_MODES = {
+    "Hardlink": "hardlink",
+    "Reflink (copy-on-write)": "reflink",
+    "Reflink, else hardlink": "auto",
+}
+CONTENT_SNIFF_BYTES = 8192 # Files with a NUL byte this early are taken as binary and not searched
+CONTENT_MMAP_THRESHOLD = 4 * 1024**2 # Content search maps files at least this big instead of reading them
+ANALYZER_SPLIT_DEPTH = 3 # Folder levels the Analyzer lists itself while looking for subtrees to size in parallel
+FINDER_INDEX_MAX_FILES = 5000000 # Bigger Finder walks are not kept for re-queries
+SAMPLE_HASH_BYTES = 16384 # Bytes read from each end of a file by the sample tier
+DEFAULT_HASH_WORKERS = 4 # Hashing threads used by Pass 3 of the duplicate scan
+MAX_HASH_WORKERS = 32
+DEFAULT_WALK_WORKERS = 8 # Threads listing folders in parallel (mostly waiting on the disk or network)
+MAX_WALK_WORKERS = 64
+WALK_MAX_BUFFERED_DIRS = 4096 # Listed folders the walkers may get ahead of the consumer
+HASH_PROGRESS_INTERVAL_S = 0.5 # Minimum time between hashing status updates
+RESULT_LIST_WHEEL_ROWS = 3 # Rows a result list scrolls per mouse wheel step
+RESULT_LIST_INDENT = "    " # Indentation per level of rows shown under an expanded row
+
+
+def get_user_cache_dir():
+    """Return the per-user cache folder for the app (created on demand)."""
+    if platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        path = os.path.join(base, APP_DIR_NAME, "Cache")
+    elif platform.system() == "Darwin": # macOS
+        path = os.path.join(os.path.expanduser("~/Library/Caches"), APP_DIR_NAME)
+    else: # Linux
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        path = os.path.join(base, APP_DIR_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_settings():
+    """Return the saved user settings, or {} if there are none (or they can't be read)."""
+    try:
+        with open(os.path.join(get_user_cache_dir(), SETTINGS_FILENAME), encoding='utf-8') as f:
+            settings = json.load(f)
+        return settings if isinstance(settings, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_settings(settings):
+    """Write the user settings atomically (raises OSError on failure)."""
+    path = os.path.join(get_user_cache_dir(), SETTINGS_FILENAME)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# Digest constructors selectable in the Duplicate Cleaner. Duplicate detection
+# doesn't need cryptographic strength, so the faster options are fine to use.
+HASH_ALGORITHMS = {
+    "SHA-256": hashlib.sha256,
+    "BLAKE2b": hashlib.blake2b,
+}
+if HAS_XXHASH:
+    HASH_ALGORITHMS["xxh3-128"] = xxhash.xxh3_128
+DEFAULT_HASH_ALGORITHM = "SHA-256"
+
+
+def _fadvise(fd, advice):
+    """Best-effort posix_fadvise over the whole file; a no-op where unsupported."""
+    if HAS_FADVISE:
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+
+def digest_file(path, algorithm=DEFAULT_HASH_ALGORITHM, block_size=HASH_BLOCK_SIZE, cancel_event=None, use_mmap=False, drop_cache=False):
+    """
+    Return the hex digest of a file's contents, or None if cancelled part-way.
+    Blocks are read into one reusable buffer (or sliced out of an mmap for big
+    files when use_mmap is set), so no bytes object is allocated per block.
+    drop_cache tells the OS to evict the file from the page cache afterwards.
+    """
+    hasher = HASH_ALGORITHMS[algorithm]()
+    with open(path, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        if HAS_FADVISE:
+            _fadvise(fd, os.POSIX_FADV_SEQUENTIAL)
+        try:
+            if use_mmap and size >= HASH_MMAP_THRESHOLD:
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mapped:
+                    if hasattr(mapped, "madvise"):
+                        mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    with memoryview(mapped) as view:
+                        for offset in range(0, size, block_size):
+                            if cancel_event is not None and cancel_event.is_set():
+                                return None
+                            hasher.update(view[offset:offset + block_size])
+            else:
+                buffer = bytearray(block_size)
+                with memoryview(buffer) as view:
+                    while True:
+                        count = f.readinto(buffer)
+                        if not count:
+                            break
+                        if cancel_event is not None and cancel_event.is_set():
+                            return None
+                        hasher.update(view[:count])
+        finally:
+            if drop_cache and HAS_FADVISE:
+                _fadvise(fd, os.POSIX_FADV_DONTNEED)
+    return hasher.hexdigest()
+
+
+def run_hash_benchmark(file_size=128 * 1024**2, block_sizes=(16384, 65536, 262144, 1048576), out=None):
+    """
+    Print the throughput of every available hash algorithm at several block
+    sizes. A temporary file is written and read back, so the numbers include
+    the read path (from the page cache) as well as the digest itself.
+    """
+    import tempfile
+    out = out or sys.stdout
+    fd, path = tempfile.mkstemp(prefix="fmt_hash_bench_")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            chunk = os.urandom(1024**2)
+            for _ in range(file_size // len(chunk)):
+                f.write(chunk)
+        digest_file(path) # Warm the page cache
+
+        out.write(f"Hash throughput on a {file_size // 1024**2} MiB file ({platform.platform()})\n")
+        out.write(f"{'Algorithm':<12}" + "".join(f"{bs // 1024:>10} KiB" for bs in block_sizes) + "\n")
+        for algorithm in HASH_ALGORITHMS:
+            row = f"{algorithm:<12}"
+            for block_size in block_sizes:
+                start = time.perf_counter()
+                digest_file(path, algorithm, block_size)
+                elapsed = time.perf_counter() - start
+                row += f"{file_size / 1024**2 / elapsed:>9.0f} MB/s"
+            out.write(row + "\n")
+        if not HAS_XXHASH:
+            out.write("(install the 'xxhash' package to benchmark xxh3-128)\n")
+    finally:
+        os.remove(path)
+
+
+def compare_files_lockstep(paths, chunk_size=COMPARE_CHUNK_SIZE, cancel_event=None):
+    """
+    Byte-compare a group of same-size files by reading them all in step, one
+    chunk at a time. Whenever the chunks differ the group is split, and files
+    left on their own are closed without reading the rest of them.
+
+    Returns (identical_groups, singles, bytes_read) where identical_groups are
+    lists of byte-identical paths and singles are (path, bytes_read) for files
+    proven unique. Returns None if cancelled.
+    """
+    handles = []
+    try:
+        for path in paths:
+            try:
+                handles.append((path, open(path, 'rb')))
+            except (IOError, OSError):
+                continue # Unreadable files can't be anyone's duplicate
+
+        identical_groups = []
+        singles = []
+        bytes_read = 0
+        offset = 0
+        if len(handles) == 1: # Everything else was unreadable
+            singles.append((handles[0][0], 0))
+        active = [handles] if len(handles) > 1 else []
+
+        while active:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            next_active = []
+            for group in active:
+                by_chunk = {}
+                for path, f in group:
+                    try:
+                        chunk = f.read(chunk_size)
+                    except (IOError, OSError):
+                        continue
+                    bytes_read += len(chunk)
+                    by_chunk.setdefault(chunk, []).append((path, f))
+                for chunk, members in by_chunk.items():
+                    if len(members) == 1:
+                        singles.append((members[0][0], offset + len(chunk)))
+                    elif not chunk: # All reached EOF together
+                        identical_groups.append([path for path, _ in members])
+                    else:
+                        next_active.append(members)
+            active = next_active
+            offset += chunk_size
+        return identical_groups, singles, bytes_read
+    finally:
+        for _, f in handles:
+            f.close()
+
+
+def reflink_file(source, dest):
+    """Create dest as a copy-on-write clone of source. Raises OSError where unsupported."""
+    if not (HAS_FCNTL and platform.system() == "Linux"):
+        raise OSError(f"Reflinks are not supported on {platform.system()}")
+    with open(source, 'rb') as src, open(dest, 'xb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(dest)
+            raise
+
+
+# --- ============================= ---
+# --- Directory Traversal ---
+# --- ============================= ---
+
+def scan_dir(path):
+    """
+    List one folder with os.scandir and return (dirs, files): the names of its
+    subfolders and the os.DirEntry objects of everything else. Symlinked
+    folders are in neither list, so they are never followed. Raises OSError if
+    the folder can't be listed.
+    """
+    dirs = []
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                files.append(entry)
+            elif not entry.is_symlink():
+                dirs.append(entry.name)
+    return dirs, files
+
+
+class WalkRules:
+    """
+    Exclusion rules for a walk, compiled once. Patterns use .gitignore syntax:
+    '*', '?' and '[...]' match within one path component and '**' across them.
+    A pattern with a '/' (other than a trailing one) is anchored to the scan
+    root, otherwise it matches the name at any depth. A trailing '/' matches
+    folders only, and a leading '!' includes again what an earlier pattern
+    excluded (the last matching pattern wins). With one_filesystem, folders on
+    another device than the root (mount points) are skipped too.
+    """
+
+    def __init__(self, root, patterns=(), one_filesystem=False):
+        self.root = root
+        self._root_dev = os.stat(root).st_dev if one_filesystem else None
+        flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+        self._rules = [] # (regex, negate, dir_only), in file order
+        for line in patterns:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            line = line[1:] if negate else line
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            regex = self._translate(line.lstrip('/'))
+            if not anchored:
+                regex = '(?:.*/)?' + regex
+            self._rules.append((re.compile(regex + r'\Z', flags), negate, dir_only))
+
+        # Without '!' rules any match excludes, so each kind of entry needs one regex
+        self._fast = None
+        if not any(negate for _, negate, _ in self._rules):
+            def combine(rules):
+                return re.compile('|'.join(f'(?:{regex.pattern})' for regex, _, _ in rules), flags) if rules else None
+            self._fast = {True: combine(self._rules), False: combine([r for r in self._rules if not r[2]])}
+
+    @staticmethod
+    def _translate(pattern):
+        """Turn one gitignore-style glob into a regex over '/'-separated paths."""
+        out = []
+        i = 0
+        while i < len(pattern):
+            c = pattern[i]
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            if c == '*':
+                out.append('[^/]*')
+            elif c == '?':
+                out.append('[^/]')
+            elif c == '[' and pattern.find(']', i + 2) != -1:
+                end = pattern.find(']', i + 2)
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end + 1
+                continue
+            else:
+                out.append(re.escape(c))
+            i += 1
+        return ''.join(out)
+
+    def _prefix(self, parent):
+        rel = parent[len(self.root):].lstrip(os.sep)
+        if os.sep != '/':
+            rel = rel.replace(os.sep, '/')
+        return rel + '/' if rel else ''
+
+    def _excluded(self, rel_path, is_dir):
+        if self._fast is not None:
+            regex = self._fast[is_dir]
+            return regex is not None and regex.match(rel_path) is not None
+        for regex, negate, dir_only in reversed(self._rules):
+            if (is_dir or not dir_only) and regex.match(rel_path):
+                return not negate
+        return False
+
+    def filter_dirs(self, parent, names):
+        """Return the subfolder names of parent the walk should descend into."""
+        prefix = self._prefix(parent)
+        kept = [name for name in names if not self._excluded(prefix + name, True)]
+        if self._root_dev is not None:
+            on_root_device = []
+            for name in kept:
+                try:
+                    if os.stat(os.path.join(parent, name)).st_dev != self._root_dev:
+                        continue # A mount point
+                except OSError:
+                    pass
+                on_root_device.append(name)
+            kept = on_root_device
+        return kept
+
+    def keep_file(self, parent, name):
+        return not self._excluded(self._prefix(parent) + name, False)
+
+    def filter_files(self, parent, entries):
+        """Return the DirEntry objects of parent that aren't excluded."""
+        prefix = self._prefix(parent)
+        return [entry for entry in entries if not self._excluded(prefix + entry.name, False)]
+
+
+def scan_tree(top, topdown=True, onerror=None, rules=None):
+    """
+    Walk a tree like os.walk, yielding (root, dirs, files) where dirs are
+    folder names and files are os.DirEntry objects. DirEntry caches its
+    stat(), so a file is stat'd at most once (and never if only its name is
+    used); on Windows the stat comes free with the listing. When topdown is
+    True, dirs can be pruned in place. Folders excluded by rules (WalkRules)
+    are never listed.
+    """
+    stack = [(top, None)]
+    while stack:
+        root, listing = stack.pop()
+        if listing is not None: # Bottom-up: children are done
+            yield (root,) + listing
+            continue
+        try:
+            listing = scan_dir(root)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            continue
+        if rules is not None:
+            listing = (rules.filter_dirs(root, listing[0]), rules.filter_files(root, listing[1]))
+
+        if topdown:
+            dirs, files = listing
+            yield root, dirs, files
+        else:
+            stack.append((root, listing))
+            dirs = listing[0]
+        stack.extend((os.path.join(root, d), None) for d in reversed(dirs))
+
+
+def parallel_scan_tree(top, workers=DEFAULT_WALK_WORKERS, topdown=True, onerror=None, lister=scan_dir, stat_files=False, cancel_event=None, max_buffered=WALK_MAX_BUFFERED_DIRS, rules=None, file_filter=None, dir_mtimes=None):
+    """
+    scan_tree() with the folders listed by a pool of threads. Each thread takes
+    the next folder from a shared queue, lists it with lister(path) -> (dirs,
+    files) and feeds the subfolders back into the queue, so slow listings (on
+    network shares) overlap. The output order is the same as scan_tree's.
+
+    The queue is ordered by each folder's position in that output, so the
+    threads always work on the folder the consumer needs next, and stop
+    getting more than max_buffered folders ahead of it. With stat_files the
+    threads also stat every file (cached on the DirEntry). In top-down mode,
+    pruned dirs are dropped from the queue. Folders excluded by rules are
+    never queued; files are filtered too when lister is scan_dir (custom
+    listers filter their own). file_filter(name) -> bool drops files before
+    they are stat'd, so only the files it keeps cost a syscall. dir_mtimes,
+    if given, is a dict the threads fill with each folder's mtime_ns, taken
+    before listing it (-1 if that fails), so a change made during or after
+    the listing always shows as a newer mtime; the consumer pops them.
+    """
+    cond = threading.Condition()
+    pending = [((), top)] # Heap of (position, path); a position is the child index at each depth
+    listed = {} # position -> (dirs, files), or the OSError
+    pruned = set()
+    wanted = [()]
+    stopped = [False]
+
+    def is_pruned(key):
+        return any(key[:i] in pruned for i in range(1, len(key) + 1))
+
+    def work():
+        while True:
+            with cond:
+                while not stopped[0]:
+                    while pending and is_pruned(pending[0][0]):
+                        heapq.heappop(pending)
+                    if pending and (len(listed) < max_buffered or pending[0][0] == wanted[0]):
+                        break
+                    cond.wait()
+                if stopped[0]:
+                    return
+                key, path = heapq.heappop(pending)
+            if dir_mtimes is not None:
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns # Before listing, so a change during the listing shows next time
+                except OSError:
+                    mtime_ns = -1
+                with cond:
+                    dir_mtimes[path] = mtime_ns
+            try:
+                dirs, files = lister(path)
+                if rules is not None:
+                    dirs = rules.filter_dirs(path, dirs)
+                    if lister is scan_dir:
+                        files = rules.filter_files(path, files)
+                if file_filter is not None:
+                    files = [entry for entry in files if file_filter(entry.name)]
+                if stat_files:
+                    for entry in files:
+                        try:
+                            entry.stat()
+                        except OSError:
+                            pass
+                result = (dirs, files)
+            except OSError as e:
+                result = e
+            with cond:
+                if not is_pruned(key):
+                    listed[key] = result
+                    if not isinstance(result, OSError):
+                        for i, name in enumerate(result[0]):
+                            heapq.heappush(pending, (key + (i,), os.path.join(path, name)))
+                cond.notify_all()
+
+    def take(key):
+        with cond:
+            wanted[0] = key
+            cond.notify_all()
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if key in listed:
+                    break
+                cond.wait(0.1)
+            return listed.pop(key)
+
+    def preorder():
+        stack = [((), top)]
+        while stack:
+            key, root = stack.pop()
+            result = take(key)
+            if result is None: # Cancelled
+                return
+            if isinstance(result, OSError):
+                if onerror is not None:
+                    onerror(result)
+                continue
+            dirs, files = result
+            names = list(dirs)
+            yield key, root, dirs, files
+            kept = set(dirs)
+            children = []
+            for i, name in enumerate(names):
+                if name in kept:
+                    children.append((key + (i,), os.path.join(root, name)))
+                else:
+                    with cond:
+                        pruned.add(key + (i,))
+                        for stale in [k for k in listed if is_pruned(k)]:
+                            del listed[stale]
+                        cond.notify_all()
+            stack.extend(reversed(children))
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    try:
+        if topdown:
+            for _, root, dirs, files in preorder():
+                yield root, dirs, files
+        else:
+            # A folder is finished once the walk leaves its subtree
+            open_dirs = []
+            for key, root, dirs, files in preorder():
+                while open_dirs and open_dirs[-1][0] != key[:len(open_dirs[-1][0])]:
+                    yield open_dirs.pop()[1:]
+                open_dirs.append((key, root, dirs, files))
+            if cancel_event is None or not cancel_event.is_set():
+                while open_dirs:
+                    yield open_dirs.pop()[1:]
+    finally:
+        with cond:
+            stopped[0] = True
+            cond.notify_all()
+
+
+# --- ============================= ---
+# --- Search Filters and Ranking ---
+# --- ============================= ---
+
+def _all_of(tests):
+    """Chain predicates into one that stops at the first failing test."""
+    if not tests:
+        return None
+    if len(tests) == 1:
+        return tests[0]
+    return lambda value: all(test(value) for test in tests)
+
+
+def compile_finder_filters(filters):
+    """
+    Compile the Finder's filters once into two predicate chains, cheapest test
+    first: name_ok(name) for the tests that need only the file name ('ext',
+    then a 'name' wildcard or regex) and stat_ok(stat) for 'size' and 'date'.
+    Files are stat'd only after they pass name_ok. Returns (name_ok, stat_ok);
+    either is None when none of its filters are on.
+    """
+    name_tests = []
+    if 'ext' in filters:
+        extensions = frozenset(filters['ext'])
+        name_tests.append(lambda name: os.path.splitext(name)[1].lower() in extensions)
+    if 'name' in filters:
+        mode, pattern = filters['name']
+        if mode == "wildcard":
+            # Matched like the extension list, ignoring case
+            match = re.compile(WalkRules._translate(pattern) + r'\Z', re.IGNORECASE).match
+        else:
+            match = re.compile(pattern).search
+        name_tests.append(lambda name: match(name) is not None)
+
+    stat_tests = []
+    if 'size' in filters:
+        op, size_bytes = filters['size']
+        if op == "greater than":
+            stat_tests.append(lambda stat: stat.st_size > size_bytes)
+        else:
+            stat_tests.append(lambda stat: stat.st_size < size_bytes)
+    if 'date' in filters:
+        op, timestamp = filters['date']
+        if op == "before":
+            stat_tests.append(lambda stat: stat.st_mtime < timestamp)
+        else:
+            stat_tests.append(lambda stat: stat.st_mtime > timestamp)
+
+    return _all_of(name_tests), _all_of(stat_tests)
+
+
+def file_contains(path, search):
+    """
+    Return whether search(data) is true for the file's contents, where data is
+    bytes or an mmap. Files with a NUL byte in their first CONTENT_SNIFF_BYTES
+    are taken as binary and never match. Big files are searched through an
+    mmap, so only the pages up to the first match are read.
+    """
+    with open(path, 'rb', buffering=0) as f:
+        head = f.read(CONTENT_SNIFF_BYTES)
+        if b'\0' in head:
+            return False
+        if len(head) < CONTENT_SNIFF_BYTES:
+            return search(head)
+        if os.fstat(f.fileno()).st_size >= CONTENT_MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return search(mapped)
+        return search(head + f.read())
+
+
+def compile_content_filter(filters):
+    """
+    Compile the Finder's 'content' filter into content_ok(path), or return None
+    when it is off. The text is searched as UTF-8; "text" is a literal match,
+    "text, ignore case" the same ignoring case and "regex" a regular expression.
+    """
+    if 'content' not in filters:
+        return None
+    mode, pattern = filters['content']
+    needle = pattern.encode('utf-8')
+    if mode == "text":
+        search = lambda data: data.find(needle) != -1
+    else:
+        if mode == "regex":
+            regex = re.compile(needle, re.MULTILINE)
+        else:
+            regex = re.compile(re.escape(needle), re.IGNORECASE)
+        search = lambda data: regex.search(data) is not None
+    return lambda path: file_contains(path, search)
+
+
+class TopK:
+    """
+    The k items with the highest keys offered so far, kept in a bounded
+    min-heap: n offers cost O(n log k) time and O(k) memory. On equal keys the
+    item offered first ranks higher.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.seen = 0
+        self._heap = [] # (key, -order, item); the weakest entry is on top
+
+    def offer(self, key, item):
+        """Consider one item, dropping it or the current weakest entry."""
+        self.seen += 1
+        entry = (key, -self.seen, item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self):
+        """Return the kept items, highest key first."""
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[:2], reverse=True)]
+
+
+# --- ============================= ---
+# --- Compact File Table ---
+# --- ============================= ---
+
+class FileTable:
+    """
+    Append-only table of file records, compact enough for scans of millions of
+    files. Each folder path is stored once and referenced by ID, basenames are
+    packed into one bytes buffer, and size, mtime, device, inode and link count
+    live in array columns. A row costs about 40 bytes plus its name, against
+    several hundred for a dict of full path -> stat tuple.
+    """
+
+    def __init__(self):
+        self.dirs = [] # Folder ID -> path
+        self._dir_index = {} # Folder path -> ID
+        self.dir_ids = array.array('I')
+        self._names = bytearray()
+        self._name_ends = array.array('Q')
+        self.sizes = array.array('q')
+        self.mtimes = array.array('q') # Nanoseconds
+        self.devs = array.array('Q')
+        self.inodes = array.array('Q')
+        self.nlinks = array.array('I')
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def add_dir(self, path):
+        """Return the ID of a folder, adding it if it's new."""
+        dir_id = self._dir_index.get(path)
+        if dir_id is None:
+            dir_id = self._dir_index[path] = len(self.dirs)
+            self.dirs.append(path)
+        return dir_id
+
+    def add(self, dir_id, name, size, mtime_ns, dev, ino, nlink):
+        """Append a file and return its row number."""
+        self.dir_ids.append(dir_id)
+        self._names += os.fsencode(name)
+        self._name_ends.append(len(self._names))
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+        self.devs.append(dev)
+        self.inodes.append(ino & 0xFFFFFFFFFFFFFFFF) # ReFS file IDs can exceed 64 bits
+        self.nlinks.append(nlink)
+        return len(self.sizes) - 1
+
+    def name(self, row):
+        start = self._name_ends[row - 1] if row else 0
+        return os.fsdecode(bytes(self._names[start:self._name_ends[row]]))
+
+    def path(self, row):
+        return os.path.join(self.dirs[self.dir_ids[row]], self.name(row))
+
+    def record(self, row):
+        """Return (size, mtime_ns, dev, ino, nlink) for a row."""
+        return (self.sizes[row], self.mtimes[row], self.devs[row], self.inodes[row], self.nlinks[row])
+
+    def items(self):
+        """Yield (path, record) for every row, like dict.items()."""
+        for row in range(len(self)):
+            yield self.path(row), self.record(row)
+
+    def nbytes(self):
+        """Approximate memory used by the table, in bytes."""
+        columns = (self.dir_ids, self._name_ends, self.sizes, self.mtimes, self.devs, self.inodes, self.nlinks)
+        total = sum(column.buffer_info()[1] * column.itemsize for column in columns) + len(self._names)
+        total += sum(sys.getsizeof(path) for path in self.dirs)
+        return total + sys.getsizeof(self.dirs) + sys.getsizeof(self._dir_index)
+
+
+def run_table_benchmark(file_count=1000000, out=None):
+    """
+    Print the memory per file of a FileTable against the dict of full path ->
+    stat tuple it replaced, filled with the same synthetic paths.
+    """
+    import tracemalloc
+    out = out or sys.stdout
+    root = os.path.join(os.sep, "home", "user", "Pictures", "Camera Uploads")
+
+    def synthetic_files():
+        for i in range(file_count):
+            folder = os.path.join(root, f"{2000 + i // 100000}", f"{i // 1000 % 100:02d}")
+            yield folder, f"IMG_{i:08d}.jpg", (1000000 + i * 37 % 500000, 1600000000000000000 + i, 2049, 100000 + i, 1)
+
+    tracemalloc.start()
+    records = {}
+    for folder, name, record in synthetic_files():
+        records[os.path.join(folder, name)] = record
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    del records
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    table = FileTable()
+    for folder, name, record in synthetic_files():
+        table.add(table.add_dir(folder), name, *record)
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    out.write(f"Memory for {file_count} files ({platform.python_implementation()} {platform.python_version()})\n")
+    out.write(f"{'dict of path -> tuple':<24}{dict_bytes / 1024**2:>10.1f} MiB{dict_bytes / file_count:>10.0f} B/file\n")
+    out.write(f"{'FileTable':<24}{table_bytes / 1024**2:>10.1f} MiB{table_bytes / file_count:>10.0f} B/file\n")
+
+
+class RangeIndex:
+    """
+    The files of one finished Finder walk, kept in a FileTable with its rows
+    also sorted by size and by mtime, so size and date ranges are answered
+    by bisect instead of the disk. key identifies the walk (root and
+    exclusions). dir_mtimes holds each folder's mtime_ns from the walk, so
+    is_current() needs to stat only the folders to notice added, removed or
+    renamed files. Edits inside existing files don't change their folder's
+    mtime: find() re-stats the files it returns, so it never reports stale
+    sizes or dates, but a file edited into matching is only found by a new walk.
+    """
+
+    def __init__(self, key, table, dir_mtimes):
+        self.key = key
+        self.table = table
+        self.dir_mtimes = dir_mtimes
+        rows = range(len(table))
+        self._by_size = array.array('I', sorted(rows, key=table.sizes.__getitem__))
+        self._sizes = array.array('q', (table.sizes[row] for row in self._by_size))
+        self._by_mtime = array.array('I', sorted(rows, key=table.mtimes.__getitem__))
+        self._mtimes = array.array('q', (table.mtimes[row] for row in self._by_mtime))
+
+    def is_current(self):
+        """Return whether no folder of the walk has changed since."""
+        for path, mtime_ns in zip(self.table.dirs, self.dir_mtimes):
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    @staticmethod
+    def _range(order, keys, above=None, below=None):
+        """Rows (from order) whose key is strictly between above and below."""
+        start = bisect.bisect_right(keys, above) if above is not None else 0
+        end = bisect.bisect_left(keys, below) if below is not None else len(keys)
+        return order[start:max(start, end)]
+
+    def find(self, filters):
+        """
+        Yield (name, folder, size, mtime) for every file matching the Finder's
+        filters, in walk order. The size and date ranges are cut out of the
+        sorted rows and intersected; name tests run on what is left. Each
+        match is stat'd again, and dropped if it is gone or no longer passes.
+        """
+        table = self.table
+        ranges = []
+        if 'size' in filters:
+            op, size_bytes = filters['size']
+            above, below = (size_bytes, None) if op == "greater than" else (None, size_bytes)
+            ranges.append((self._range(self._by_size, self._sizes, above, below), table.sizes, above, below))
+        if 'date' in filters:
+            op, timestamp = filters['date']
+            above, below = (None, timestamp * 1e9) if op == "before" else (timestamp * 1e9, None)
+            ranges.append((self._range(self._by_mtime, self._mtimes, above, below), table.mtimes, above, below))
+
+        if ranges:
+            # Walk the narrower range and check the other one per row
+            ranges.sort(key=lambda r: len(r[0]))
+            rows = ranges[0][0]
+            for _, column, above, below in ranges[1:]:
+                rows = [row for row in rows if (above is None or column[row] > above) and (below is None or column[row] < below)]
+            rows = sorted(rows)
+        else:
+            rows = range(len(table))
+
+        name_ok, stat_ok = compile_finder_filters(filters)
+        for row in rows:
+            name = table.name(row)
+            if name_ok is not None and not name_ok(name):
+                continue
+            folder = table.dirs[table.dir_ids[row]]
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue # Gone since the walk
+            if stat.st_mtime_ns != table.mtimes[row] or stat.st_size != table.sizes[row]:
+                if stat_ok is not None and not stat_ok(stat):
+                    continue # Edited in place since the walk
+            yield name, folder, stat.st_size, stat.st_mtime_ns / 1e9
+
+
+# --- ============================= ---
+# --- Folder Size Tree ---
+# --- ============================= ---
+
+class SizeNode:
+    """
+    One folder or file of a Folder Analyzer scan, with its total size and
+    item count. children lists a folder's subfolders (and files, when they
+    are shown) biggest first; it is None for a file.
+    """
+    __slots__ = ('path', 'size', 'items', 'children')
+
+    def __init__(self, path, size, items, children=None):
+        self.path = path
+        self.size = size
+        self.items = items
+        self.children = children
+
+    def sort_children(self):
+        self.children.sort(key=lambda node: node.size, reverse=True)
+
+
+def check_size_filters(filters, item_size, item_count, is_file=False):
+    """Return whether an Analyzer item passes the 'size' and 'items' filters (folders only for 'items')."""
+    if 'size' in filters:
+        op, size_bytes = filters['size']
+        if op == "greater than":
+            if not item_size > size_bytes: return False
+        elif op == "less than":
+            if not item_size < size_bytes: return False
+
+    if not is_file and 'items' in filters:
+        op, count = filters['items']
+        if op == "greater than":
+            if not item_count > count: return False
+        elif op == "less than":
+            if not item_count < count: return False
+
+    return True # All checks passed
+
+
+def analyzer_rank(order, size, items):
+    """The TopK key of an Analyzer row for the top-K order ("largest" or "most items")."""
+    if order == "largest":
+        return size
+    return 1 if items == "File" else items
+
+
+def _folder_cache_index(cached, include_files):
+    """
+    Return (cached, subdirs_of) for _size_folder: the saved folder sizes (none
+    when files are listed, since they aren't saved) and each folder's saved
+    subfolder names.
+    """
+    if not cached or include_files:
+        return {}, {}
+    subdirs_of = collections.defaultdict(list)
+    for path in cached:
+        subdirs_of[os.path.dirname(path)].append(os.path.basename(path))
+    return cached, subdirs_of
+
+
+def _size_folder(path, rules, cached, subdirs_of):
+    """
+    Return (own, dirs, sizes) for one folder: own is the (mtime_ns, size,
+    items) of its own files, dirs its subfolder names and sizes the (name,
+    size) of its files. When the folder's mtime matches its entry in cached,
+    own and dirs come from there without listing it, and sizes is None.
+    Raises OSError if the folder can't be read.
+    """
+    mtime_ns = os.stat(path).st_mtime_ns # Before listing, so a change during the listing shows next time
+    own = cached.get(path)
+    if own is not None and own[0] == mtime_ns:
+        return own, subdirs_of.get(path, []), None
+    dirs, files = scan_dir(path)
+    if rules is not None:
+        dirs, files = rules.filter_dirs(path, dirs), rules.filter_files(path, files)
+    sizes = []
+    for entry in files:
+        try:
+            sizes.append((entry.name, entry.stat().st_size))
+        except OSError:
+            continue # Skip inaccessible files
+    return (mtime_ns, sum(size for _, size in sizes), len(sizes)), dirs, sizes
+
+
+def size_subtree(top, include_files, filters, rules=None, keep_tree=False, cancel_event=None, cached=None):
+    """
+    Size one folder tree bottom-up for the Folder Analyzer, independently of
+    any other, so several can run at once in threads or worker processes.
+    cached maps folder paths to the (mtime_ns, size, items) of their own files
+    from an earlier scan; folders whose mtime still matches are not listed.
+    Returns (node, rows, matched, folders, reused): top's SizeNode (with its
+    whole subtree when keep_tree), the (name, parent, size, items) rows
+    passing filters, items being "File" for files, and their count (with a
+    'top' filter only the best rows are kept), the (mtime_ns, size, items) of
+    every folder for the next scan, and how many came from cached. node is
+    None if top can't be listed or cancel_event is set.
+    """
+    cached, subdirs_of = _folder_cache_index(cached, include_files)
+    folder_data = {} # SizeNode of each folder whose parent hasn't been reached yet
+    folders = {}
+    reused = 0
+    rows = []
+    matched = 0
+    ranked = None
+    if 'top' in filters:
+        top_k, order = filters['top']
+        ranked = TopK(top_k)
+
+    def add_row(row):
+        nonlocal matched
+        matched += 1
+        if ranked is None:
+            rows.append(row)
+        else:
+            ranked.offer(analyzer_rank(order, row[2], row[3]), row)
+
+    stack = [(top, None)]
+    while stack:
+        root, listing = stack.pop()
+        if listing is None:
+            # First visit: size the folder's own files, then come back after its subfolders
+            if cancel_event is not None and cancel_event.is_set():
+                return None, [], 0, {}, 0
+            try:
+                own, dirs, sizes = _size_folder(root, rules, cached, subdirs_of)
+            except OSError:
+                continue
+            folders[root] = own
+            reused += sizes is None
+            stack.append((root, (dirs, sizes)))
+            stack.extend((os.path.join(root, d), None) for d in reversed(dirs))
+            continue
+
+        dirs, sizes = listing
+        _, size_total, items = folders[root]
+        children = []
+        if include_files:
+            for name, size in sizes:
+                if keep_tree:
+                    children.append(SizeNode(os.path.join(root, name), size, 1))
+                if check_size_filters(filters, size, 1, is_file=True):
+                    add_row((name, root, size, "File"))
+        for d in dirs:
+            subdir = folder_data.pop(os.path.join(root, d), None)
+            if subdir is not None:
+                size_total += subdir.size
+                items += subdir.items
+                children.append(subdir)
+        node = folder_data[root] = SizeNode(root, size_total, items, children if keep_tree else [])
+        if keep_tree:
+            node.sort_children()
+        if check_size_filters(filters, size_total, items):
+            add_row((os.path.basename(root), os.path.dirname(root), size_total, items))
+
+    return folder_data.get(top), (ranked.items() if ranked is not None else rows), matched, folders, reused
+
+
+_worker_cancel_event = None # Set in each Analyzer worker process by _init_size_worker
+
+
+def _init_size_worker(cancel_event):
+    """Process pool initializer: keep the pool's cancel event (it can only be passed at process start)."""
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+
+
+def _size_subtree_in_worker(top, include_files, filters, rules, keep_tree, cached):
+    """size_subtree() in a worker process, stopping early once the pool's cancel event is set."""
+    return size_subtree(top, include_files, filters, rules, keep_tree, _worker_cancel_event, cached)
+
+
+def analyze_tree(source_dir, include_files, filters, rules=None, workers=DEFAULT_WALK_WORKERS, use_processes=False, cancel_event=None, on_rows=None, cached=None):
+    """
+    Size the tree under source_dir for the Folder Analyzer. The top levels are
+    listed here until there are enough subtrees to keep every worker busy
+    (or ANALYZER_SPLIT_DEPTH is reached); those subtrees are then sized at
+    once by size_subtree() in a thread pool, or in a process pool with
+    use_processes (for very large trees, where the per-file work is CPU-bound).
+    Their totals are merged into the folders above them. on_rows(rows,
+    matched, done, total) gets the matching rows as each subtree finishes
+    (matched can exceed len(rows) with a 'top' filter). cached is the folders
+    of an earlier scan, as returned here, whose unchanged folders are reused.
+    Returns (root, folders, reused): the root SizeNode (holding the whole
+    tree when filters is empty, None if cancelled), the folders to save for
+    the next scan and how many were reused.
+    """
+    keep_tree = not filters
+    cached, subdirs_of = _folder_cache_index(cached, include_files)
+    folders = {}
+    reused = 0
+    upper = [] # (path, [(file name, size)] or None, [subfolder paths]) of the folders sized here, breadth first
+    level = [source_dir]
+    for depth in range(ANALYZER_SPLIT_DEPTH):
+        next_level = []
+        for path in level:
+            try:
+                own, dirs, sizes = _size_folder(path, rules, cached, subdirs_of)
+            except OSError:
+                continue
+            folders[path] = own
+            reused += sizes is None
+            subdirs = [os.path.join(path, d) for d in dirs]
+            upper.append((path, sizes, subdirs))
+            next_level.extend(subdirs)
+        if cancel_event is not None and cancel_event.is_set():
+            return None, {}, 0
+        level = next_level
+        if len(level) >= workers * 4:
+            break
+
+    def cached_subtree(top):
+        """The entries of cached for top and every folder under it."""
+        subset = {}
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            if path in cached:
+                subset[path] = cached[path]
+                stack.extend(os.path.join(path, name) for name in subdirs_of.get(path, ()))
+        return subset
+
+    nodes = {} # Finished folders
+    worker_cancel = None # Process-shared copy of cancel_event, set once it is
+    if use_processes:
+        context = multiprocessing.get_context("spawn")
+        worker_cancel = context.Event()
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(workers, os.cpu_count() or 1)), mp_context=context,
+                                                      initializer=_init_size_worker, initargs=(worker_cancel,))
+        futures = {pool.submit(_size_subtree_in_worker, path, include_files, filters, rules, keep_tree, cached_subtree(path)): path for path in level}
+    else:
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers))
+        futures = {pool.submit(size_subtree, path, include_files, filters, rules, keep_tree, cancel_event, cached_subtree(path)): path for path in level}
+    try:
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(pending, timeout=0.1)
+            if cancel_event is not None and cancel_event.is_set():
+                if worker_cancel is not None:
+                    worker_cancel.set() # Running subtrees stop at their next folder
+                return None, {}, 0
+            for future in done:
+                node, rows, matched, subtree_folders, subtree_reused = future.result()
+                if node is not None:
+                    nodes[futures[future]] = node
+                folders.update(subtree_folders)
+                reused += subtree_reused
+                if on_rows is not None:
+                    on_rows(rows, matched, len(futures) - len(pending), len(futures))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Merge the subtrees into the folders above them, deepest first
+    rows = []
+    for path, sizes, subdirs in reversed(upper):
+        _, size_total, items = folders[path]
+        children = []
+        if include_files:
+            for name, size in sizes:
+                if keep_tree:
+                    children.append(SizeNode(os.path.join(path, name), size, 1))
+                if check_size_filters(filters, size, 1, is_file=True):
+                    rows.append((name, path, size, "File"))
+        for subdir in subdirs:
+            node = nodes.pop(subdir, None)
+            if node is not None:
+                size_total += node.size
+                items += node.items
+                children.append(node)
+        node = nodes[path] = SizeNode(path, size_total, items, children if keep_tree else [])
+        if keep_tree:
+            node.sort_children()
+        # The root source_dir itself isn't a result, only its children
+        if path != source_dir and check_size_filters(filters, size_total, items):
+            rows.append((os.path.basename(path), os.path.dirname(path), size_total, items))
+    if on_rows is not None:
+        on_rows(rows, len(rows), len(futures), len(futures))
+    return nodes.get(source_dir), folders, reused
+
+
+class FolderSizeCache:
+    """
+    SQLite store of the Folder Analyzer's last scan of each source folder
+    (per set of exclusions): every folder's mtime and the size and count of
+    its own files. A rescan reuses the folders whose mtime hasn't changed
+    without listing them. Edits inside existing files don't change a folder's
+    mtime, so they show up only once something else in the folder changes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != FOLDER_SIZE_SCHEMA_VERSION:
+            for table in ("folder_scans", "folder_sizes"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {FOLDER_SIZE_SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS folder_scans ("
+            " id INTEGER PRIMARY KEY, root TEXT, rules TEXT, scanned_at INTEGER, UNIQUE (root, rules))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS folder_sizes ("
+            " scan_id INTEGER, path TEXT, mtime_ns INTEGER, size INTEGER, items INTEGER,"
+            " PRIMARY KEY (scan_id, path)) WITHOUT ROWID"
+        )
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def _scan_id(conn, source_dir, rules_key):
+        row = conn.execute("SELECT id FROM folder_scans WHERE root=? AND rules=?",
+                           (os.path.normcase(os.path.abspath(source_dir)), rules_key)).fetchone()
+        return row[0] if row else None
+
+    def load(self, source_dir, rules_key):
+        """Return {folder: (mtime_ns, size, items)} from the last scan, or None if there is none."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                scan_id = self._scan_id(conn, source_dir, rules_key)
+                if scan_id is None:
+                    return None
+                return {path: (mtime_ns, size, items) for path, mtime_ns, size, items in conn.execute(
+                    "SELECT path, mtime_ns, size, items FROM folder_sizes WHERE scan_id=?", (scan_id,))}
+            finally:
+                conn.close()
+
+    def save(self, source_dir, rules_key, folders):
+        """
+        Replace the saved scan of source_dir with folders, as returned by
+        analyze_tree(). Folders SQLite can't store are left out, and so are
+        their parents (whose saved subfolders would miss them), so they are
+        listed again next time.
+        """
+        unsaved = {path for path in folders if not _utf8_encodable(path)}
+        unsaved.update([os.path.dirname(path) for path in unsaved])
+        root = os.path.normcase(os.path.abspath(source_dir))
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn: # One transaction
+                    scan_id = self._scan_id(conn, source_dir, rules_key)
+                    if scan_id is not None:
+                        conn.execute("DELETE FROM folder_sizes WHERE scan_id=?", (scan_id,))
+                        conn.execute("UPDATE folder_scans SET scanned_at=? WHERE id=?", (int(time.time()), scan_id))
+                    else:
+                        scan_id = conn.execute("INSERT INTO folder_scans (root, rules, scanned_at) VALUES (?, ?, ?)",
+                                               (root, rules_key, int(time.time()))).lastrowid
+                    conn.executemany(
+                        "INSERT INTO folder_sizes VALUES (?, ?, ?, ?, ?)",
+                        ((scan_id, path) + tuple(own) for path, own in folders.items() if path not in unsaved)
+                    )
+            finally:
+                conn.close()
+
+    def apply_deletes(self, source_dir, rules_key, deleted):
+        """
+        Update the saved scan after items were deleted, without walking the
+        disk. deleted holds (path, file_size, parent_mtime_before,
+        parent_mtime_after) per item, file_size being None for folders: the
+        folder and everything under it are dropped, and a deleted file's size
+        comes off its folder's own total. The parent's new mtime is stored only
+        if it still had the saved one before the delete, so changes made by
+        anything else are still picked up by the next scan.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn: # One transaction
+                    scan_id = self._scan_id(conn, source_dir, rules_key)
+                    if scan_id is None:
+                        return
+                    for path, file_size, mtime_before, mtime_after in deleted:
+                        if file_size is None:
+                            # The folder and its subtree ('/' + 1 == '0' bounds the paths under it)
+                            conn.execute("DELETE FROM folder_sizes WHERE scan_id=? AND (path=? OR (path>? AND path<?))",
+                                         (scan_id, path, path + os.sep, path + chr(ord(os.sep) + 1)))
+                            size_change, items_change = 0, 0
+                        else:
+                            size_change, items_change = file_size, 1
+                        conn.execute(
+                            "UPDATE folder_sizes SET mtime_ns=?, size=size-?, items=items-? WHERE scan_id=? AND path=? AND mtime_ns=?",
+                            (mtime_after, size_change, items_change, scan_id, os.path.dirname(path), mtime_before)
+                        )
+            finally:
+                conn.close()
+
+
+def run_analyzer_benchmark(path=None, workers=DEFAULT_WALK_WORKERS, out=None):
+    """
+    Print how long the Folder Analyzer's sizing takes over path (or a
+    synthetic tree of small files) as one serial bottom-up walk, the way it
+    used to run, against the parallel subtree sizing with threads and with
+    processes. The tree is walked once first, so all runs see a warm cache;
+    over a network share or a cold disk the threads gain much more.
+    """
+    import tempfile
+    out = out or sys.stdout
+    with tempfile.TemporaryDirectory() as scratch:
+        if path is None:
+            path = scratch
+            for top in range(48):
+                for sub in range(20):
+                    folder = os.path.join(scratch, f"project{top}", f"dir{sub}")
+                    os.makedirs(folder)
+                    for i in range(25):
+                        with open(os.path.join(folder, f"file{i}.dat"), "wb") as f:
+                            f.write(b"x" * (i * 37))
+
+        def serial():
+            totals = {}
+            for root, dirs, files in scan_tree(path, topdown=False):
+                size = items = 0
+                for entry in files:
+                    try:
+                        size += entry.stat().st_size
+                        items += 1
+                    except OSError:
+                        continue
+                for d in dirs:
+                    sub_size, sub_items = totals.pop(os.path.join(root, d), (0, 0))
+                    size += sub_size
+                    items += sub_items
+                totals[root] = (size, items)
+            return totals[path][0]
+
+        runs = [
+            ("serial walk", serial),
+            (f"{workers} threads", lambda: analyze_tree(path, False, {}, workers=workers)[0].size),
+            (f"{workers} processes", lambda: analyze_tree(path, False, {}, workers=workers, use_processes=True)[0].size),
+        ]
+        out.write(f"Sizing {path}\n")
+        serial() # Warm the cache, so every run sees the same disk state
+        baseline = None
+        for label, run in runs:
+            start = time.perf_counter()
+            size = run()
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            out.write(f"{label:<16}{elapsed:>8.2f} s{baseline / elapsed:>8.1f}x   ({size} bytes)\n")
+
+
+# --- ============================= ---
+# --- Duplicate Pipeline Tiers ---
+# --- ============================= ---
+
+class DupeTier:
+    """Counters for one elimination tier of the duplicate-detection pipeline."""
+
+    def __init__(self, name):
+        self.name = name
+        self.files_in = 0 # Files that entered this tier
+        self.files_eliminated = 0 # Files proven unique by this tier
+        self.bytes_saved = 0 # Bytes later tiers no longer need to read
+
+    def record(self, group_sizes, file_size, bytes_read_per_file=0):
+        """Account for one group split by this tier into groups of the given sizes."""
+        self.files_in += sum(group_sizes)
+        singletons = sum(1 for n in group_sizes if n == 1)
+        self.files_eliminated += singletons
+        self.bytes_saved += singletons * max(0, file_size - bytes_read_per_file)
+
+    def record_unique(self, files, total_bytes):
+        """Account for files eliminated before any of them was read."""
+        self.files_in += files
+        self.files_eliminated += files
+        self.bytes_saved += total_bytes
+
+    def record_singles(self, files_in, singles, file_size):
+        """Account for a group where each (path, bytes_read) single stopped early."""
+        self.files_in += files_in
+        self.files_eliminated += len(singles)
+        self.bytes_saved += sum(max(0, file_size - bytes_read) for _, bytes_read in singles)
+
+    def summary(self, format_size):
+        return f"{self.name}: -{self.files_eliminated} files ({format_size(self.bytes_saved)} saved)"
+
+
+# --- ============================= ---
+# --- Concurrent Hashing Engine ---
+# --- ============================= ---
+
+class HashingEngine:
+    """
+    Thread pool that hashes many files at once. hashlib releases the GIL while
+    digesting, so several readers keep fast disks and NAS arrays busy. At most
+    max_in_flight files are queued or being read at any moment.
+    """
+
+    def __init__(self, workers=DEFAULT_HASH_WORKERS, cancel_event=None, max_in_flight=None):
+        self.workers = max(1, workers)
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.cancel_event = cancel_event or threading.Event()
+        self.bytes_done = 0
+        self.files_done = 0
+        self._started = None
+
+    def rate(self):
+        """Aggregate bytes read per second since the first job was submitted."""
+        if self._started is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started
+        return self.bytes_done / elapsed if elapsed > 0 else 0.0
+
+    def run(self, func, items):
+        """
+        Call func(item) on the pool for every item and yield (item, result, error)
+        in completion order. func must return (result, bytes_read). items may be a
+        collections.deque that the caller keeps adding to while consuming
+        results; the run ends once it is empty and nothing is in flight. No new
+        work is submitted once the cancel event is set, and queued work is dropped.
+        """
+        if self._started is None:
+            self._started = time.monotonic()
+        if not isinstance(items, collections.deque):
+            items = collections.deque(items)
+        pending = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                while items and len(pending) < self.max_in_flight and not self.cancel_event.is_set():
+                    item = items.popleft()
+                    pending[pool.submit(func, item)] = item
+
+                if self.cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+                    return
+                if not pending:
+                    return
+
+                done, _ = concurrent.futures.wait(pending, timeout=0.2, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result, bytes_read = future.result()
+                    except (IOError, OSError) as e:
+                        yield item, None, e
+                        continue
+                    self.bytes_done += bytes_read
+                    self.files_done += 1
+                    yield item, result, None
+
+
+# --- ============================= ---
+# --- Persistent Hash Cache ---
+# --- ============================= ---
+
+# The stat fields HashCache keys on, as recorded by a scan's walk
+FileStat = collections.namedtuple('FileStat', ('st_size', 'st_mtime_ns', 'st_dev', 'st_ino'))
+
+
+class HashCache:
+    """
+    SQLite-backed cache of file hashes keyed by (device, inode, size, mtime_ns)
+    and hash algorithm.
+    A file that is renamed keeps its entry; a file that is modified gets a new key,
+    so stale digests are never returned. Safe to share between threads.
+    """
+
+    def __init__(self, db_path, max_entries=HASH_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pending_writes = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Open the database on first use, discarding it if the schema is outdated."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != HASH_CACHE_SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS file_hashes")
+                conn.execute(f"PRAGMA user_version = {HASH_CACHE_SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, algorithm TEXT,"
+                " digest TEXT NOT NULL, last_used INTEGER NOT NULL,"
+                " PRIMARY KEY (dev, ino, size, mtime_ns, algorithm))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_file_hashes_last_used ON file_hashes (last_used)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(stat, algorithm):
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, algorithm)
+
+    def reset_stats(self):
+        """Zero the hit/miss counters (called at the start of each scan)."""
+        self.hits = 0
+        self.misses = 0
+
+    def record_miss(self):
+        """Count a lookup that was skipped (e.g. while rebuilding the cache)."""
+        with self._lock:
+            self.misses += 1
+
+    def lookup(self, stat, algorithm=DEFAULT_HASH_ALGORITHM):
+        """Return the cached digest for a stat result, or None on a miss."""
+        if not stat.st_ino: # No usable inode (some network filesystems)
+            self.record_miss()
+            return None
+        with self._lock:
+            conn = self._connect()
+            key = self._key(stat, algorithm)
+            row = conn.execute(
+                "SELECT digest FROM file_hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            conn.execute(
+                "UPDATE file_hashes SET last_used=? WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=?",
+                (int(time.time()),) + key
+            )
+            self._count_write()
+            return row[0]
+
+    def store(self, stat, digest, algorithm=DEFAULT_HASH_ALGORITHM):
+        """Record the digest for a stat result."""
+        if not stat.st_ino:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (dev, ino, size, mtime_ns, algorithm, digest, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._key(stat, algorithm) + (digest, int(time.time()))
+            )
+            self._count_write()
+
+    def _count_write(self):
+        # Caller holds the lock
+        self._pending_writes += 1
+        if self._pending_writes >= HASH_CACHE_COMMIT_EVERY:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def flush(self):
+        """Commit pending writes and evict the least-recently-used rows over the cap."""
+        with self._lock:
+            if self._conn is None:
+                return
+            count = self._conn.execute("SELECT COUNT(*) FROM file_hashes").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM file_hashes WHERE rowid IN "
+                    "(SELECT rowid FROM file_hashes ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def entry_count(self):
+        """Return the number of cached digests."""
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM file_hashes").fetchone()[0]
+
+    def purge(self):
+        """Delete every cached digest and shrink the database file."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM file_hashes")
+            conn.commit()
+            conn.execute("VACUUM")
+            self._pending_writes = 0
+
+    def stats_text(self):
+        """Short hit/miss summary for the status bar."""
+        return f"cache: {self.hits} hits, {self.misses} misses"
+
+
+# --- ============================= ---
+# --- Duplicate Scan Snapshots ---
+# --- ============================= ---
+
+def _utf8_encodable(path):
+    """Return whether SQLite can store path (names of undecodable bytes can't be)."""
+    try:
+        path.encode('utf-8')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+
+class ScanSnapshotStore:
+    """
+    SQLite store holding the last duplicate scan of each source folder: folder
+    mtimes and layout, one (size, mtime_ns, dev, ino, nlink) record per file,
+    and the duplicate sets that were found. Used by incremental rescans.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCAN_SNAPSHOT_SCHEMA_VERSION:
+            for table in ("snapshots", "snapshot_dirs", "snapshot_files"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {SCAN_SNAPSHOT_SCHEMA_VERSION}")
+        conn.execute("CREATE TABLE IF NOT EXISTS snapshots (root TEXT PRIMARY KEY, method TEXT, scanned_at INTEGER)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshot_dirs ("
+            " root TEXT, path TEXT, parent TEXT, mtime_ns INTEGER, PRIMARY KEY (root, path))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshot_files ("
+            " root TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, dev INTEGER, ino INTEGER,"
+            " nlink INTEGER, dupe_set INTEGER, PRIMARY KEY (root, path))"
+        )
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def _root_key(source_dir):
+        return os.path.normcase(os.path.abspath(source_dir))
+
+    def load(self, source_dir):
+        """Return the saved snapshot of source_dir as a dict, or None if there is none."""
+        root = self._root_key(source_dir)
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT method, scanned_at FROM snapshots WHERE root=?", (root,)).fetchone()
+                if row is None:
+                    return None
+                dirs = {}
+                for path, parent, mtime_ns in conn.execute(
+                        "SELECT path, parent, mtime_ns FROM snapshot_dirs WHERE root=? ORDER BY rowid", (root,)):
+                    dirs[path] = (mtime_ns, dirs[path][1] if path in dirs else [])
+                    if parent is not None:
+                        dirs.setdefault(parent, (None, []))[1].append(path)
+                files = {}
+                sets = {}
+                for path, size, mtime_ns, dev, ino, nlink, dupe_set in conn.execute(
+                        "SELECT path, size, mtime_ns, dev, ino, nlink, dupe_set FROM snapshot_files WHERE root=?", (root,)):
+                    files[path] = (size, mtime_ns, dev, ino, nlink)
+                    if dupe_set is not None:
+                        sets.setdefault(dupe_set, []).append(path)
+            finally:
+                conn.close()
+        return {'method': row[0], 'scanned_at': row[1], 'dirs': dirs, 'files': files, 'dupe_sets': list(sets.values())}
+
+    def save(self, source_dir, method, dir_info, records, dupe_sets):
+        """
+        Replace the snapshot of source_dir with the result of a finished scan.
+        records is anything with items() yielding (path, (size, mtime_ns, dev,
+        ino, nlink)), such as a FileTable. Paths SQLite can't store are left
+        out, and so are the mtimes of the folders holding them, so the next
+        rescan lists those folders again instead of losing the names.
+        """
+        root = self._root_key(source_dir)
+        set_of_path = {path: i for i, dupe_set in enumerate(dupe_sets) for path in dupe_set}
+        parent_of = {sub: path for path, (_, subdirs) in dir_info.items() for sub in subdirs}
+        unsaved = {os.path.dirname(path) for path, _ in records.items() if not _utf8_encodable(path)}
+        unsaved.update(os.path.dirname(path) for path in dir_info if not _utf8_encodable(path))
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn: # One transaction
+                    for table in ("snapshots", "snapshot_dirs", "snapshot_files"):
+                        conn.execute(f"DELETE FROM {table} WHERE root=?", (root,))
+                    conn.execute("INSERT INTO snapshots VALUES (?, ?, ?)", (root, method, int(time.time())))
+                    conn.executemany(
+                        "INSERT INTO snapshot_dirs VALUES (?, ?, ?, ?)",
+                        ((root, path, parent_of.get(path), mtime_ns) for path, (mtime_ns, _) in dir_info.items()
+                         if path not in unsaved and _utf8_encodable(path))
+                    )
+                    conn.executemany(
+                        "INSERT INTO snapshot_files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        ((root, path) + record + (set_of_path.get(path),) for path, record in records.items()
+                         if _utf8_encodable(path))
+                    )
+            finally:
+                conn.close()
+
+
+# --- ============================= ---
+# --- Filesystem Catalog ---
+# --- ============================= ---
+
+class FileCatalog:
+    """
+    SQLite catalog of every file under a source folder (name, extension, size,
+    mtime, device, inode and link count), built by one walk and indexed on
+    size, mtime, extension and folder. The Finder, Analyzer and Duplicate
+    Cleaner can answer from it instead of walking the folder again.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock() # Serializes builds and updates
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL") # Readers keep working while a build runs
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_SCHEMA_VERSION:
+            for table in ("catalogs", "catalog_dirs", "catalog_files"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"PRAGMA user_version = {CATALOG_SCHEMA_VERSION}")
+        conn.execute("CREATE TABLE IF NOT EXISTS catalogs (id INTEGER PRIMARY KEY, root TEXT UNIQUE, built_at INTEGER, updated_at INTEGER, file_count INTEGER)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS catalog_dirs ("
+            " catalog_id INTEGER, dir_id INTEGER, path TEXT, parent_id INTEGER, mtime_ns INTEGER,"
+            " PRIMARY KEY (catalog_id, dir_id))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS catalog_files ("
+            " catalog_id INTEGER, dir_id INTEGER, name TEXT, ext TEXT, size INTEGER, mtime_ns INTEGER,"
+            " dev INTEGER, ino INTEGER, nlink INTEGER)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS catalog_dirs_parent ON catalog_dirs (catalog_id, parent_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS catalog_dirs_path ON catalog_dirs (catalog_id, path)")
+        for column in ("size", "mtime_ns", "ext", "dir_id"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS catalog_files_{column} ON catalog_files (catalog_id, {column})")
+        conn.commit()
+        return conn
+
+    @staticmethod
+    def _root_key(source_dir):
+        return os.path.normcase(os.path.abspath(source_dir))
+
+    def _catalog_id(self, conn, source_dir):
+        row = conn.execute("SELECT id FROM catalogs WHERE root=?", (self._root_key(source_dir),)).fetchone()
+        return row[0] if row else None
+
+    def info(self, source_dir):
+        """
+        Return (updated_at, file_count) for the catalog of source_dir, or None.
+        updated_at is when it was built or last changed by live updates.
+        """
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT updated_at, file_count FROM catalogs WHERE root=?", (self._root_key(source_dir),)).fetchone()
+        finally:
+            conn.close()
+
+    def build(self, source_dir, walk, cancel_event=None):
+        """
+        Replace the catalog of source_dir with the output of walk, an iterable of
+        (folder, folder_mtime_ns, [(name, size, mtime_ns, dev, ino, nlink)]) in
+        top-down order. Returns the number of files, or None if cancelled (the
+        old catalog is then kept).
+        """
+        root = self._root_key(source_dir)
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN")
+                old_id = self._catalog_id(conn, source_dir)
+                if old_id is not None:
+                    for table in ("catalog_dirs", "catalog_files"):
+                        conn.execute(f"DELETE FROM {table} WHERE catalog_id=?", (old_id,))
+                    conn.execute("DELETE FROM catalogs WHERE id=?", (old_id,))
+                now = int(time.time())
+                catalog_id = conn.execute("INSERT INTO catalogs (root, built_at, updated_at, file_count) VALUES (?, ?, ?, 0)", (root, now, now)).lastrowid
+
+                dir_ids = {}
+                file_rows = []
+                file_count = 0
+                for folder, folder_mtime_ns, files in walk:
+                    if cancel_event is not None and cancel_event.is_set():
+                        conn.rollback()
+                        return None
+                    dir_id = dir_ids[folder] = len(dir_ids)
+                    parent_id = dir_ids.get(os.path.dirname(folder))
+                    conn.execute("INSERT INTO catalog_dirs VALUES (?, ?, ?, ?, ?)", (catalog_id, dir_id, folder, parent_id, folder_mtime_ns))
+                    for name, size, mtime_ns, dev, ino, nlink in files:
+                        file_rows.append((catalog_id, dir_id, name, os.path.splitext(name)[1].lower(), size, mtime_ns, dev, ino, nlink))
+                    if len(file_rows) >= CATALOG_INSERT_BATCH:
+                        conn.executemany("INSERT INTO catalog_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", file_rows)
+                        file_count += len(file_rows)
+                        file_rows.clear()
+                conn.executemany("INSERT INTO catalog_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", file_rows)
+                file_count += len(file_rows)
+                conn.execute("UPDATE catalogs SET file_count=? WHERE id=?", (file_count, catalog_id))
+                conn.commit()
+                return file_count
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def dir_mtimes(self, source_dir):
+        """Return {folder: mtime_ns} for every catalogued folder of source_dir."""
+        conn = self._connect()
+        try:
+            catalog_id = self._catalog_id(conn, source_dir)
+            if catalog_id is None:
+                return {}
+            return dict(conn.execute("SELECT path, mtime_ns FROM catalog_dirs WHERE catalog_id=? ORDER BY dir_id", (catalog_id,)))
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _insert_files(conn, catalog_id, dir_id, rows):
+        conn.executemany(
+            "INSERT INTO catalog_files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((catalog_id, dir_id, name, os.path.splitext(name)[1].lower(), size, mtime_ns, dev, ino, nlink)
+             for name, size, mtime_ns, dev, ino, nlink in rows)
+        )
+        return len(rows)
+
+    @staticmethod
+    def _delete_tree(conn, catalog_id, path):
+        """Delete a folder and everything under it; return the number of files removed."""
+        dir_ids = [(catalog_id, row[0]) for row in conn.execute(
+            "SELECT dir_id FROM catalog_dirs WHERE catalog_id=? AND (path=? OR (path >= ? AND path < ?))",
+            (catalog_id, path, path + os.sep, path + chr(ord(os.sep) + 1)))]
+        removed = conn.executemany("DELETE FROM catalog_files WHERE catalog_id=? AND dir_id=?", dir_ids).rowcount
+        conn.executemany("DELETE FROM catalog_dirs WHERE catalog_id=? AND dir_id=?", dir_ids)
+        return max(0, removed)
+
+    def apply_changes(self, source_dir, changes):
+        """
+        Apply live changes to the catalog of source_dir in one transaction and
+        return the new subfolders that still need listing. Each change is one of
+          ('dir', folder, mtime_ns, file_rows, subfolders): folder listed again
+          ('files', folder, names, file_rows): only these names changed
+          ('gone', folder): folder and everything under it removed
+        where file_rows are (name, size, mtime_ns, dev, ino, nlink).
+        """
+        new_dirs = []
+        with self._lock:
+            conn = self._connect()
+            try:
+                catalog_id = self._catalog_id(conn, source_dir)
+                if catalog_id is None:
+                    return []
+                delta = 0
+                with conn: # One transaction
+                    for change in changes:
+                        kind, folder = change[0], change[1]
+                        if kind == 'gone':
+                            delta -= self._delete_tree(conn, catalog_id, folder)
+                            continue
+                        row = conn.execute("SELECT dir_id FROM catalog_dirs WHERE catalog_id=? AND path=?", (catalog_id, folder)).fetchone()
+                        if kind == 'files':
+                            if row is None:
+                                continue # Folder not catalogued (yet); it will be listed whole
+                            _, _, names, rows = change
+                            delta -= max(0, conn.executemany(
+                                "DELETE FROM catalog_files WHERE catalog_id=? AND dir_id=? AND name=?",
+                                ((catalog_id, row[0], name) for name in names)).rowcount)
+                            delta += self._insert_files(conn, catalog_id, row[0], rows)
+                            continue
+
+                        _, _, mtime_ns, rows, subdirs = change
+                        known = set()
+                        if row is None:
+                            parent = conn.execute("SELECT dir_id FROM catalog_dirs WHERE catalog_id=? AND path=?", (catalog_id, os.path.dirname(folder))).fetchone()
+                            if parent is None:
+                                continue # Outside the catalogued tree
+                            # New IDs are larger than their parent's, as after a top-down walk
+                            dir_id = conn.execute("SELECT MAX(dir_id) + 1 FROM catalog_dirs WHERE catalog_id=?", (catalog_id,)).fetchone()[0]
+                            conn.execute("INSERT INTO catalog_dirs VALUES (?, ?, ?, ?, ?)", (catalog_id, dir_id, folder, parent[0], mtime_ns))
+                        else:
+                            dir_id = row[0]
+                            conn.execute("UPDATE catalog_dirs SET mtime_ns=? WHERE catalog_id=? AND dir_id=?", (mtime_ns, catalog_id, dir_id))
+                            delta -= max(0, conn.execute("DELETE FROM catalog_files WHERE catalog_id=? AND dir_id=?", (catalog_id, dir_id)).rowcount)
+                            wanted = set(subdirs)
+                            for (child,) in conn.execute("SELECT path FROM catalog_dirs WHERE catalog_id=? AND parent_id=?", (catalog_id, dir_id)).fetchall():
+                                if child in wanted:
+                                    known.add(child)
+                                else:
+                                    delta -= self._delete_tree(conn, catalog_id, child)
+                        delta += self._insert_files(conn, catalog_id, dir_id, rows)
+                        new_dirs.extend(d for d in subdirs if d not in known)
+                    conn.execute("UPDATE catalogs SET file_count = file_count + ?, updated_at=? WHERE id=?", (delta, int(time.time()), catalog_id))
+            finally:
+                conn.close()
+        return new_dirs
+
+    def find(self, source_dir, filters):
+        """
+        Yield (name, folder, size, mtime_ns) for every catalogued file matching
+        the Finder's filters, in walk order. 'size', 'date' and 'ext' are
+        answered by the indexes; a 'name' pattern is checked on the rows left.
+        """
+        name_ok, _ = compile_finder_filters({k: v for k, v in filters.items() if k == 'name'})
+        clauses = ["f.catalog_id=?"]
+        params = []
+        if 'size' in filters:
+            op, size_bytes = filters['size']
+            clauses.append("f.size > ?" if op == "greater than" else "f.size < ?")
+            params.append(size_bytes)
+        if 'date' in filters:
+            op, timestamp = filters['date']
+            clauses.append("f.mtime_ns < ?" if op == "before" else "f.mtime_ns > ?")
+            params.append(int(timestamp * 1e9))
+        if 'ext' in filters:
+            extensions = sorted(filters['ext'])
+            clauses.append(f"f.ext IN ({', '.join('?' * len(extensions))})")
+            params.extend(extensions)
+
+        conn = self._connect()
+        try:
+            catalog_id = self._catalog_id(conn, source_dir)
+            if catalog_id is None:
+                return
+            query = (
+                "SELECT f.name, d.path, f.size, f.mtime_ns FROM catalog_files f"
+                " JOIN catalog_dirs d ON d.catalog_id=f.catalog_id AND d.dir_id=f.dir_id"
+                f" WHERE {' AND '.join(clauses)} ORDER BY f.rowid"
+            )
+            rows = conn.execute(query, [catalog_id] + params)
+            if name_ok is None:
+                yield from rows
+            else:
+                for row in rows:
+                    if name_ok(row[0]):
+                        yield row
+        finally:
+            conn.close()
+
+    def folder_totals(self, source_dir):
+        """
+        Return [(folder, size, items)] for every catalogued folder, where size
+        and items include all subfolders, deepest folders first.
+        """
+        conn = self._connect()
+        try:
+            catalog_id = self._catalog_id(conn, source_dir)
+            if catalog_id is None:
+                return []
+            own = {dir_id: (size, items) for dir_id, size, items in conn.execute(
+                "SELECT dir_id, SUM(size), COUNT(*) FROM catalog_files WHERE catalog_id=? GROUP BY dir_id", (catalog_id,))}
+            dirs = conn.execute(
+                "SELECT dir_id, path, parent_id FROM catalog_dirs WHERE catalog_id=? ORDER BY dir_id DESC", (catalog_id,)).fetchall()
+        finally:
+            conn.close()
+
+        # Folder IDs follow a top-down walk, so every folder comes after its parent
+        totals = {}
+        result = []
+        for dir_id, path, parent_id in dirs:
+            size, items = own.get(dir_id, (0, 0))
+            sub_size, sub_items = totals.pop(dir_id, (0, 0))
+            size += sub_size
+            items += sub_items
+            result.append((path, size, items))
+            if parent_id is not None:
+                parent_size, parent_items = totals.get(parent_id, (0, 0))
+                totals[parent_id] = (parent_size + size, parent_items + items)
+        return result
+
+    def load_table(self, source_dir):
+        """
+        Return (table, singles, singles_bytes): a FileTable of the catalogued
+        non-empty files that share their size with another file, plus the count
+        and total size of the files whose size is unique.
+        """
+        conn = self._connect()
+        try:
+            catalog_id = self._catalog_id(conn, source_dir)
+            if catalog_id is None:
+                return None
+            singles, singles_bytes = conn.execute(
+                "SELECT COUNT(*), IFNULL(SUM(size), 0) FROM (SELECT size FROM catalog_files"
+                " WHERE catalog_id=? AND size > 0 GROUP BY size HAVING COUNT(*) = 1)", (catalog_id,)).fetchone()
+            dir_paths = dict(conn.execute("SELECT dir_id, path FROM catalog_dirs WHERE catalog_id=?", (catalog_id,)))
+            table = FileTable()
+            rows = conn.execute(
+                "SELECT dir_id, name, size, mtime_ns, dev, ino, nlink FROM catalog_files"
+                " WHERE catalog_id=? AND size IN (SELECT size FROM catalog_files"
+                " WHERE catalog_id=? AND size > 0 GROUP BY size HAVING COUNT(*) > 1)", (catalog_id, catalog_id))
+            for dir_id, name, size, mtime_ns, dev, ino, nlink in rows:
+                table.add(table.add_dir(dir_paths[dir_id]), name, size, mtime_ns, dev, ino, nlink)
+            return table, singles, singles_bytes
+        finally:
+            conn.close()
+
+
+def catalog_listing(path):
+    """
+    List one folder for the catalog. Returns (subfolder names, folder mtime_ns,
+    file rows, skipped), where rows are (name, size, mtime_ns, dev, ino, nlink)
+    and skipped counts names SQLite can't store (undecodable bytes).
+    """
+    dir_mtime = os.stat(path).st_mtime_ns
+    dirs, files = scan_dir(path)
+    rows = []
+    skipped = 0
+    for entry in files:
+        try:
+            entry.name.encode('utf-8')
+            # DirEntry.stat() has no inode/link data on Windows
+            stat = os.stat(entry.path) if os.name == 'nt' else entry.stat()
+        except UnicodeEncodeError:
+            skipped += 1
+            continue
+        except (IOError, OSError):
+            continue
+        rows.append((entry.name, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, stat.st_nlink))
+    kept_dirs = []
+    for d in dirs:
+        try:
+            d.encode('utf-8')
+            kept_dirs.append(d)
+        except UnicodeEncodeError:
+            skipped += 1
+    return kept_dirs, dir_mtime, rows, skipped
+
+
+class CatalogWatcher:
+    """
+    Keeps the catalog of one source folder current while the app runs. On
+    Linux every catalogued folder gets an inotify watch. Events are coalesced
+    per folder until the tree has been quiet for WATCH_SETTLE_S (or at most
+    WATCH_MAX_DELAY_S) and then applied in one transaction. Without inotify,
+    or once the watch limit is reached, all folders are swept for mtime
+    changes every WATCH_SWEEP_INTERVAL_S instead; like an incremental rescan,
+    a sweep misses files rewritten in place.
+    """
+
+    def __init__(self, catalog, source_dir, on_change=None, logger=None):
+        self.catalog = catalog
+        self.source_dir = source_dir
+        self.on_change = on_change
+        self.logger = logger or logging.getLogger(__name__)
+        self.sweeping = not HAS_INOTIFY
+        self._stop = threading.Event()
+        self._fd = None
+        self._paths = {} # Watch descriptor -> folder
+        self._dirty_dirs = set()
+        self._dirty_files = {} # Folder -> changed names
+        self._overflow = False
+        self._first_event = None
+        self._last_event = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        try:
+            if HAS_INOTIFY:
+                fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+                if fd < 0:
+                    self.logger.warning(f"inotify unavailable ({os.strerror(ctypes.get_errno())}); sweeping folders instead")
+                    self.sweeping = True
+                else:
+                    self._fd = fd
+                    for folder in self.catalog.dir_mtimes(self.source_dir):
+                        if self._stop.is_set() or not self._watch(folder):
+                            break
+            # Catch up with whatever changed since the catalog was built
+            self._sweep()
+            next_sweep = time.monotonic() + WATCH_SWEEP_INTERVAL_S
+
+            while not self._stop.is_set():
+                if self._fd is not None:
+                    ready, _, _ = select.select([self._fd], [], [], WATCH_SETTLE_S / 2)
+                    if ready:
+                        self._read_events()
+                else:
+                    self._stop.wait(WATCH_SETTLE_S)
+                now = time.monotonic()
+                if self._first_event is not None and (now - self._last_event >= WATCH_SETTLE_S or now - self._first_event >= WATCH_MAX_DELAY_S):
+                    self._flush()
+                if self.sweeping and now >= next_sweep:
+                    self._sweep()
+                    next_sweep = time.monotonic() + WATCH_SWEEP_INTERVAL_S
+        except Exception:
+            self.logger.exception("Catalog watcher stopped")
+        finally:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _watch(self, folder):
+        """Add an inotify watch; returns False once the watch limit is reached."""
+        if self._fd is None or self.sweeping:
+            return False
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(folder), WATCH_MASK)
+        if wd >= 0:
+            self._paths[wd] = folder
+            return True
+        if ctypes.get_errno() == errno.ENOSPC:
+            self.logger.warning("inotify watch limit reached (fs.inotify.max_user_watches); sweeping folders instead")
+            self.sweeping = True
+            return False
+        return True # Folder vanished or unreadable; its parent's events cover it
+
+    def _read_events(self):
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                return
+            offset = 0
+            while offset + 16 <= len(data):
+                wd, mask, _, length = struct.unpack_from("iIII", data, offset)
+                name = data[offset + 16:offset + 16 + length].rstrip(b"\0")
+                offset += 16 + length
+                self._on_event(wd, mask, os.fsdecode(name))
+
+    def _on_event(self, wd, mask, name):
+        if mask & IN_IGNORED:
+            self._paths.pop(wd, None)
+            return
+        if mask & IN_Q_OVERFLOW:
+            self._overflow = True
+        else:
+            folder = self._paths.get(wd)
+            if folder is None or not name:
+                return # Events on a watched folder itself show up in its parent too
+            if mask & IN_ISDIR:
+                self._dirty_dirs.add(folder)
+            else:
+                self._dirty_files.setdefault(folder, set()).add(name)
+        self._last_event = time.monotonic()
+        if self._first_event is None:
+            self._first_event = self._last_event
+
+    def _list_change(self, folder):
+        try:
+            dirs, dir_mtime, rows, _ = catalog_listing(folder)
+        except (IOError, OSError):
+            return ('gone', folder)
+        return ('dir', folder, dir_mtime, rows, [os.path.join(folder, d) for d in dirs])
+
+    def _flush(self):
+        dirty_dirs, self._dirty_dirs = self._dirty_dirs, set()
+        dirty_files, self._dirty_files = self._dirty_files, {}
+        self._first_event = self._last_event = None
+        if self._overflow: # Events were lost; fall back on folder mtimes
+            self._overflow = False
+            self._sweep()
+
+        changes = [self._list_change(folder) for folder in dirty_dirs]
+        for folder, names in dirty_files.items():
+            if folder in dirty_dirs:
+                continue
+            if len(names) > WATCH_RELIST_THRESHOLD:
+                changes.append(self._list_change(folder))
+                continue
+            rows = []
+            for name in names:
+                try:
+                    stat = os.stat(os.path.join(folder, name))
+                    if not os.path.isdir(os.path.join(folder, name)):
+                        rows.append((name, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, stat.st_nlink))
+                except (IOError, OSError):
+                    pass # Deleted or moved away
+            changes.append(('files', folder, names, rows))
+        self._apply(changes)
+
+    def _sweep(self):
+        changes = []
+        for folder, mtime_ns in self.catalog.dir_mtimes(self.source_dir).items():
+            if self._stop.is_set():
+                return
+            try:
+                if os.stat(folder).st_mtime_ns == mtime_ns:
+                    continue
+            except (IOError, OSError):
+                pass
+            changes.append(self._list_change(folder))
+        self._apply(changes)
+
+    def _apply(self, changes):
+        if not changes:
+            return
+        while changes and not self._stop.is_set():
+            new_dirs = self.catalog.apply_changes(self.source_dir, changes)
+            for folder in new_dirs:
+                self._watch(folder) # Before listing, so nothing created meanwhile is missed
+            changes = [self._list_change(folder) for folder in new_dirs]
+        if self.on_change is not None:
+            self.on_change()
+
+
+# --- ============================= ---
+# --- Virtual Result Lists ---
+# --- ============================= ---
+
+def result_sort_key(col):
+    """
+    Return the sort key for the values of a result list column: sizes
+    ("1.50 MB") and counts sort by value, "File" before any folder's item
+    count, and everything else as case-insensitive text.
+    """
+    if col == "Size":
+        units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+        def size_to_bytes(value):
+            try:
+                number, unit = str(value).split(" ")
+                return float(number) * units.get(unit, 0)
+            except (ValueError, TypeError, AttributeError):
+                return 0 # Fallback for invalid format
+        return size_to_bytes
+
+    if col in ("Set #", "Items"):
+        def extract_num(value):
+            value = str(value)
+            if value.lower() == 'file':
+                return -1 # Treat "File" as -1 in 'Items' col
+            try:
+                # First, try to convert the whole string (e.g., "500")
+                return float(value.replace(',', ''))
+            except (ValueError, TypeError, AttributeError):
+                try:
+                    # Fallback: get the *second* part (e.g., "Set 1" -> "1")
+                    return float(value.split(" ")[1].replace(',', ''))
+                except (ValueError, TypeError, AttributeError, IndexError):
+                    return 0 # Fallback for non-numeric
+        return extract_num
+
+    return lambda value: str(value).lower()
+
+
+class ResultStore:
+    """
+    The rows of a result list, kept column by column in plain lists rather
+    than as a Tk item each. Every row has an id (unique across all stores, so
+    ids from different lists can't be mixed up), an optional data object and
+    a depth. Rows shown under an expanded row directly follow it, one level
+    deeper, so a row's subtree is the run of deeper rows after it.
+    """
+
+    _next_id = itertools.count(1)
+
+    def __init__(self, columns):
+        self.columns = tuple(columns)
+        self.clear()
+
+    def clear(self):
+        self.cols = [[] for _ in self.columns]
+        self.ids = []
+        self.data = []
+        self.depth = []
+        self._positions = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, row_id):
+        """Return the index of a row, or None if it isn't in the store."""
+        if self._positions is None:
+            self._positions = {row_id: pos for pos, row_id in enumerate(self.ids)}
+        return self._positions.get(row_id)
+
+    def values(self, pos):
+        return tuple(col[pos] for col in self.cols)
+
+    def set_value(self, pos, col, value):
+        self.cols[self.columns.index(col)][pos] = value
+
+    def insert(self, pos, rows, datas=None, depth=0):
+        """Insert rows (tuples of column values) at pos and return their ids."""
+        rows = list(rows)
+        if not rows:
+            return []
+        new_ids = [next(self._next_id) for _ in rows]
+        appended = pos == len(self.ids)
+        for col, values in zip(self.cols, zip(*rows)):
+            col[pos:pos] = values
+        self.ids[pos:pos] = new_ids
+        self.data[pos:pos] = datas if datas is not None else [None] * len(rows)
+        self.depth[pos:pos] = [depth] * len(rows)
+        if appended and self._positions is not None:
+            self._positions.update(zip(new_ids, range(pos, pos + len(rows))))
+        else:
+            self._positions = None # Rebuilt when next needed
+        return new_ids
+
+    def subtree_end(self, pos):
+        """Return the index just past the rows under the row at pos."""
+        depth = self.depth[pos]
+        end = pos + 1
+        while end < len(self.depth) and self.depth[end] > depth:
+            end += 1
+        return end
+
+    def parent(self, pos):
+        """Return the index of the row that pos is shown under, or None for a top-level row."""
+        depth = self.depth[pos]
+        if depth == 0:
+            return None
+        while self.depth[pos] >= depth:
+            pos -= 1
+        return pos
+
+    def remove(self, positions):
+        """Remove the rows at positions, along with the rows under them."""
+        drop = set(positions)
+        keep = []
+        cut_depth = None # Depth of the last removed row while inside its subtree
+        for pos, depth in enumerate(self.depth):
+            if cut_depth is not None and depth > cut_depth:
+                continue
+            cut_depth = None
+            if pos in drop:
+                cut_depth = depth
+            else:
+                keep.append(pos)
+        self._take(keep)
+
+    def sort(self, col, reverse=False, key=None):
+        """Sort by a column. Rows under an expanded row are sorted among themselves and stay under it."""
+        column = self.cols[self.columns.index(col)]
+        keys = column if key is None else [key(value) for value in column]
+        if not any(self.depth):
+            order = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+        else:
+            order = self._tree_order(0, len(keys), keys, reverse)
+        self._take(order)
+
+    def _tree_order(self, start, end, keys, reverse):
+        siblings = [] # (first, end) of each subtree between start and end
+        pos = start
+        while pos < end:
+            stop = self.subtree_end(pos)
+            siblings.append((pos, stop))
+            pos = stop
+        siblings.sort(key=lambda span: keys[span[0]], reverse=reverse)
+        order = []
+        for first, stop in siblings:
+            order.append(first)
+            if stop > first + 1:
+                order.extend(self._tree_order(first + 1, stop, keys, reverse))
+        return order
+
+    def _take(self, order):
+        """Keep only the rows at the positions in order, in that order."""
+        self.cols = [[col[pos] for pos in order] for col in self.cols]
+        self.ids = [self.ids[pos] for pos in order]
+        self.data = [self.data[pos] for pos in order]
+        self.depth = [self.depth[pos] for pos in order]
+        self._positions = None
+
+
+class VirtualList(ttk.Frame):
+    """
+    A result list that keeps its rows in a ResultStore and puts only the rows
+    in view into its Treeview, so a list of millions costs no more to draw
+    than a screenful. Scrolling, selection, sorting and expanding rows all
+    work on the store; the Treeview just holds the visible window, its iids
+    being the row ids. The methods the tabs use mirror Treeview's, taking
+    row ids.
+
+    With children, rows whose data has children can be expanded in place
+    (double-click, or Right and Left): children(data) returns the data of
+    the rows to show under one, and row_values(data) their values. The first
+    column then goes in the tree column (#0), indented by depth.
+    """
+
+    def __init__(self, master, columns, selectmode="extended", children=None, row_values=None):
+        super().__init__(master)
+        self.store = ResultStore(columns)
+        self._children_of = children
+        self._row_values = row_values
+        self._selected = set()
+        self._opened = set()
+        self._anchor = None # Row a Shift-click or Shift+arrow selects from
+        self._focus = None
+        self._sort = None # (column index, reverse, key) of the last sort, for rows expanded later
+        self._top = 0 # Index of the first row shown
+        self._rows_shown = 20 # Rows that fit, measured once drawn
+        self._shown = []
+        self._render_pending = False
+
+        show = "tree headings" if children else "headings"
+        self.tree = ttk.Treeview(self, columns=columns, displaycolumns=columns[1:] if children else columns, show=show, selectmode=selectmode)
+        self.ysb = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        xsb = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        self.tree.configure(xscrollcommand=xsb.set)
+
+        self.ysb.pack(side=tk.RIGHT, fill=tk.Y)
+        xsb.pack(side=tk.BOTTOM, fill=tk.X)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", lambda event: self._schedule())
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<Shift-Button-1>", self._on_shift_click)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        for sequence, step in (("Up", -1), ("Down", 1), ("Prior", "page-up"), ("Next", "page-down"), ("Home", "home"), ("End", "end")):
+            self.tree.bind(f"<{sequence}>", lambda event, _step=step: self._move_focus(_step, extend=False))
+            self.tree.bind(f"<Shift-{sequence}>", lambda event, _step=step: self._move_focus(_step, extend=True))
+        if selectmode == "extended":
+            self.tree.bind("<Control-a>", self._select_all)
+        if children:
+            self.tree.bind("<Double-Button-1>", self._on_double_click)
+            self.tree.bind("<Right>", lambda event: self._open_focus(True))
+            self.tree.bind("<Left>", lambda event: self._open_focus(False))
+
+    # --- Treeview-style interface (row ids in place of iids) ---
+
+    def heading(self, column, **options):
+        return self.tree.heading(column, **options)
+
+    def column(self, column, **options):
+        return self.tree.column(column, **options)
+
+    def append(self, rows, datas=None):
+        """Add top-level rows at the end and return their ids."""
+        row_ids = self.store.insert(len(self.store), rows, datas)
+        self._schedule()
+        return row_ids
+
+    def clear(self):
+        self.store.clear()
+        self._selected.clear()
+        self._opened.clear()
+        self._anchor = self._focus = None
+        self._top = 0
+        self._schedule()
+
+    def get_children(self):
+        """Return the ids of all rows, in display order."""
+        return tuple(self.store.ids)
+
+    def selection(self):
+        """Return the ids of the selected rows, in display order."""
+        return tuple(row_id for row_id in self.store.ids if row_id in self._selected)
+
+    def exists(self, row_id):
+        return self.store.position(row_id) is not None
+
+    def _position(self, row_id):
+        pos = self.store.position(row_id)
+        if pos is None:
+            raise tk.TclError(f'Item {row_id} not found')
+        return pos
+
+    def item(self, row_id, option='values'):
+        if option != 'values':
+            raise ValueError(f"Unsupported item option: {option}")
+        return self.store.values(self._position(row_id))
+
+    def data(self, row_id):
+        return self.store.data[self._position(row_id)]
+
+    def parent(self, row_id):
+        """Return the id of the row this one is shown under, or None."""
+        pos = self.store.parent(self._position(row_id))
+        return None if pos is None else self.store.ids[pos]
+
+    def set(self, row_id, col, value):
+        self.store.set_value(self._position(row_id), col, value)
+        self._schedule()
+
+    def delete(self, *row_ids):
+        """Remove rows (with any rows shown under them). Unknown ids are ignored."""
+        positions = [pos for pos in map(self.store.position, row_ids) if pos is not None]
+        if not positions:
+            return
+        self.store.remove(positions)
+        remaining = set(self.store.ids)
+        self._selected &= remaining
+        self._opened &= remaining
+        self._schedule()
+
+    def sort(self, col, reverse=False, key=None):
+        self.store.sort(col, reverse, key)
+        self._sort = (self.store.columns.index(col), reverse, key)
+        self._schedule()
+
+    # --- Expanding rows ---
+
+    def _can_open(self, pos):
+        data = self.store.data[pos]
+        return self._children_of is not None and data is not None and bool(self._children_of(data))
+
+    def toggle(self, row_id):
+        """Expand a row to show the rows under it, or collapse it again."""
+        pos = self.store.position(row_id)
+        if pos is None or not self._can_open(pos):
+            return
+        if row_id in self._opened:
+            end = self.store.subtree_end(pos)
+            hidden = self.store.ids[pos + 1:end]
+            self.store.remove(range(pos + 1, end))
+            self._opened.discard(row_id)
+            self._opened.difference_update(hidden)
+            self._selected.difference_update(hidden)
+        else:
+            datas = list(self._children_of(self.store.data[pos]))
+            rows = [self._row_values(data) for data in datas]
+            if self._sort is not None:
+                # Keep the rows in the order of the last sort
+                index, reverse, key = self._sort
+                key = key or (lambda value: value)
+                pairs = sorted(zip(rows, datas), key=lambda pair: key(pair[0][index]), reverse=reverse)
+                rows, datas = [row for row, _ in pairs], [data for _, data in pairs]
+            self.store.insert(pos + 1, rows, datas, self.store.depth[pos] + 1)
+            self._opened.add(row_id)
+        self._schedule()
+
+    def _open_focus(self, expand):
+        if self._focus is not None and (self._focus in self._opened) != expand:
+            self.toggle(self._focus)
+        return "break"
+
+    def _on_double_click(self, event):
+        iid = self.tree.identify_row(event.y)
+        if iid:
+            self.toggle(int(iid))
+        return "break"
+
+    # --- Selection ---
+
+    def _on_click(self, event):
+        """A plain click replaces the whole selection, including rows out of view."""
+        iid = self.tree.identify_row(event.y)
+        if not iid:
+            return
+        self._anchor = self._focus = int(iid)
+        if not event.state & 0x0004: # Control-click toggles the row instead
+            self._selected.clear()
+
+    def _on_shift_click(self, event):
+        iid = self.tree.identify_row(event.y)
+        if iid:
+            self._select_to(int(iid))
+            self.tree.focus_set()
+        return "break"
+
+    def _on_select(self, event):
+        """Carry selection changes made in the Treeview over to the rows in view."""
+        selected = {int(iid) for iid in self.tree.selection()}
+        for row_id in self._shown:
+            if row_id in selected:
+                self._selected.add(row_id)
+            else:
+                self._selected.discard(row_id)
+        focus = self.tree.focus()
+        if focus:
+            self._focus = int(focus)
+
+    def _select_to(self, row_id):
+        """Select the rows from the anchor row to row_id."""
+        start = self.store.position(self._anchor) if self._anchor is not None else None
+        end = self.store.position(row_id)
+        if end is None:
+            return
+        if start is None:
+            start = end
+            self._anchor = row_id
+        low, high = min(start, end), max(start, end)
+        self._selected = set(self.store.ids[low:high + 1])
+        self._focus = row_id
+        self._schedule()
+
+    def _select_all(self, event=None):
+        self._selected = set(self.store.ids)
+        self._schedule()
+        return "break"
+
+    def _move_focus(self, step, extend):
+        """Arrow, Page and Home/End keys: move the focus row, scrolling it into view."""
+        count = len(self.store)
+        if not count:
+            return "break"
+        pos = self.store.position(self._focus) if self._focus is not None else None
+        if step == "home":
+            pos = 0
+        elif step == "end":
+            pos = count - 1
+        else:
+            if step in ("page-up", "page-down"):
+                step = self._rows_shown if step == "page-down" else -self._rows_shown
+            pos = self._top if pos is None else pos + step
+        pos = max(0, min(count - 1, pos))
+        row_id = self.store.ids[pos]
+        if extend and self.tree.cget("selectmode") == "extended":
+            self._select_to(row_id)
+        else:
+            self._selected = {row_id}
+            self._anchor = self._focus = row_id
+        self.see(row_id)
+        return "break"
+
+    # --- Scrolling and drawing ---
+
+    def see(self, row_id):
+        """Scroll so a row is in view."""
+        pos = self.store.position(row_id)
+        if pos is None:
+            return
+        if pos < self._top:
+            self._top = pos
+        elif pos >= self._top + self._rows_shown:
+            self._top = pos - self._rows_shown + 1
+        self._schedule()
+
+    def yview(self, *args):
+        """Command of the vertical scrollbar: ("moveto", fraction) or ("scroll", count, "units"/"pages")."""
+        if args and args[0] == tk.MOVETO:
+            self._top = int(float(args[1]) * len(self.store))
+        elif args and args[0] == tk.SCROLL:
+            self._top += int(args[1]) * (self._rows_shown if args[2] == tk.PAGES else 1)
+        self._schedule()
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self._top += -RESULT_LIST_WHEEL_ROWS if up else RESULT_LIST_WHEEL_ROWS
+        self._schedule()
+        return "break"
+
+    def _schedule(self):
+        """Redraw once the current batch of changes is done."""
+        if not self._render_pending:
+            self._render_pending = True
+            self.after_idle(self._render)
+
+    def _render(self):
+        """Put the rows in view into the Treeview, replacing the last window."""
+        self._render_pending = False
+        store = self.store
+        count = len(store)
+        self._top = max(0, min(self._top, count - self._rows_shown))
+        end = min(count, self._top + self._rows_shown)
+
+        self.tree.delete(*self.tree.get_children())
+        self._shown = store.ids[self._top:end]
+        for pos in range(self._top, end):
+            values = store.values(pos)
+            text = ""
+            if self._children_of is not None:
+                row_id = store.ids[pos]
+                marker = ("▾ " if row_id in self._opened else "▸ ") if self._can_open(pos) else "   "
+                text = RESULT_LIST_INDENT * store.depth[pos] + marker + str(values[0])
+            self.tree.insert("", tk.END, iid=store.ids[pos], text=text, values=values)
+        self.tree.selection_set([row_id for row_id in self._shown if row_id in self._selected])
+        if self._focus in self._shown:
+            self.tree.focus(self._focus)
+        self.tree.yview_moveto(0)
+        self.ysb.set(*((self._top / count, end / count) if count else (0, 1)))
+
+        # Fit the window to the widget's height, now that a row can be measured
+        if self._shown:
+            box = self.tree.bbox(self._shown[0])
+            if box and box[3] > 0:
+                fits = max(1, (self.tree.winfo_height() - box[1]) // box[3])
+                if fits != self._rows_shown:
+                    self._rows_shown = fits
+                    self._schedule()
+
+
 class FileManagementApp:
     def __init__(self, root):
         self.root = root
@@ -59,13 +2721,54 @@ class FileManagementApp:
         
         # Threading and Queue
         self.queue = queue.Queue()
+        self._queue_job = None
+        self._queue_interval_ms = QUEUE_POLL_MIN_MS
         self.current_task = None
+        self.walk_workers = DEFAULT_WALK_WORKERS # Folder-listing threads for the running task
+
+        # Persistent hash cache (opened lazily by the first hashing scan)
+        self.hash_cache = None
+        try:
+            self.hash_cache = HashCache(os.path.join(get_user_cache_dir(), HASH_CACHE_FILENAME))
+        except OSError as e:
+            self.initial_cache_error = e
+
+        # Saved duplicate scans, for rescanning only the folders that changed
+        self.scan_snapshots = None
+        try:
+            self.scan_snapshots = ScanSnapshotStore(os.path.join(get_user_cache_dir(), SCAN_SNAPSHOT_FILENAME))
+        except OSError as e:
+            self.initial_snapshot_error = e
+
+        # Folder sizes from the last Analyzer scan, for incremental rescans
+        self.folder_sizes = None
+        try:
+            self.folder_sizes = FolderSizeCache(os.path.join(get_user_cache_dir(), FOLDER_SIZE_CACHE_FILENAME))
+        except OSError as e:
+            self.initial_folder_size_error = e
+
+        # Filesystem catalog shared by the Finder, Analyzer and Duplicate Cleaner
+        self.catalog = None
+        self.active_catalog = None # Set by start_task when the running task may use it
+        self._catalog_label_job = None
+        self.catalog_watcher = None
+        try:
+            self.catalog = FileCatalog(os.path.join(get_user_cache_dir(), CATALOG_FILENAME))
+        except OSError as e:
+            self.initial_catalog_error = e
+
+        # The Finder's last full walk, for answering re-queries from memory
+        self.finder_index = None
+
+        # Saved settings (exclusion rules per tab)
+        self.settings = load_settings()
+        self.exclusion_controls = {} # tab -> (button, checkbutton)
 
         # Main UI setup
         self.setup_ui()
         
         # Start the queue polling loop
-        self.root.after(QUEUE_POLL_INTERVAL_MS, self.check_queue)
+        self._queue_job = self.root.after(QUEUE_POLL_MIN_MS, self.check_queue)
 
     def resource_path(self, relative_path):
         """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -93,6 +2796,27 @@ class FileManagementApp:
         self.browse_button = ttk.Button(self.top_frame, text="Browse...", command=self.browse_source_dir)
         self.browse_button.pack(side=tk.LEFT, padx=5)
 
+        ttk.Label(self.top_frame, text="Scan threads:").pack(side=tk.LEFT, padx=(10, 0))
+        self.walk_workers_var = tk.IntVar(value=DEFAULT_WALK_WORKERS)
+        self.walk_workers_spin = ttk.Spinbox(self.top_frame, from_=1, to=MAX_WALK_WORKERS, textvariable=self.walk_workers_var, width=4)
+        self.walk_workers_spin.pack(side=tk.LEFT, padx=5)
+
+        # Catalog row (only when the cache folder is available)
+        self.use_catalog_var = tk.BooleanVar(value=False)
+        if self.catalog is not None:
+            self.catalog_frame = ttk.Frame(self.root, padding=(10, 0))
+            self.catalog_frame.pack(fill=tk.X, side=tk.TOP)
+            self.use_catalog_check = ttk.Checkbutton(self.catalog_frame, text="Answer Finder, Analyzer and Duplicate scans from the catalog", variable=self.use_catalog_var)
+            self.use_catalog_check.pack(side=tk.LEFT)
+            self.refresh_catalog_button = ttk.Button(self.catalog_frame, text="Refresh Catalog", command=self.start_catalog_refresh)
+            self.refresh_catalog_button.pack(side=tk.RIGHT, padx=5)
+            self.live_catalog_var = tk.BooleanVar(value=False)
+            self.live_catalog_check = ttk.Checkbutton(self.catalog_frame, text="Keep it live", variable=self.live_catalog_var, command=self.toggle_catalog_watch)
+            self.live_catalog_check.pack(side=tk.RIGHT, padx=5)
+            self.catalog_status_var = tk.StringVar(value="No catalog for this folder")
+            ttk.Label(self.catalog_frame, textvariable=self.catalog_status_var).pack(side=tk.RIGHT, padx=5)
+            self.source_dir_var.trace_add("write", lambda *_: self.on_source_dir_changed())
+
         # --- Tabbed Interface ---
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
@@ -145,31 +2869,84 @@ class FileManagementApp:
 
         self.scan_button = ttk.Button(controls_frame, text="Scan for Duplicates", command=self.start_scan, style="Big.TButton")
         self.scan_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+
+        self.rescan_button = ttk.Button(controls_frame, text="Rescan Changed Folders", command=self.start_rescan)
+        self.rescan_button.pack(side=tk.LEFT, padx=5)
+        if self.scan_snapshots is None:
+            self.rescan_button.config(state=tk.DISABLED)
         
         self.empty_folder_button = ttk.Button(controls_frame, text="Delete Empty Folders", command=self.start_delete_empty_folders)
         self.empty_folder_button.pack(side=tk.LEFT, padx=5)
 
         self.cancel_button = ttk.Button(controls_frame, text="Cancel", command=self.cancel_task, state=tk.DISABLED)
         self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.add_exclusion_controls(controls_frame, "dupe")
 
         # Options Frame
         options_frame = ttk.Frame(self.dupe_tab)
         options_frame.pack(fill=tk.X, pady=5)
         
         self.use_hash_var = tk.BooleanVar(value=False)
-        self.use_hash_check = ttk.Checkbutton(options_frame, text="Confirm with SHA-256 (Slower, 100% Accurate)", variable=self.use_hash_var)
-        self.use_hash_check.pack(side=tk.LEFT, padx=5)
+        self.use_hash_check = ttk.Checkbutton(options_frame, text="Confirm with hash (Slower, 100% Accurate):", variable=self.use_hash_var)
+        self.use_hash_check.pack(side=tk.LEFT, padx=(5, 0))
+
+        self.hash_algorithm_var = tk.StringVar(value=DEFAULT_HASH_ALGORITHM)
+        self.hash_algorithm_combo = ttk.Combobox(options_frame, textvariable=self.hash_algorithm_var, values=list(HASH_ALGORITHMS), width=10, state="readonly")
+        self.hash_algorithm_combo.pack(side=tk.LEFT, padx=5)
+
+        self.byte_compare_var = tk.BooleanVar(value=False)
+        self.byte_compare_check = ttk.Checkbutton(options_frame, text="Compare bytes directly (exact)", variable=self.byte_compare_var)
+        self.byte_compare_check.pack(side=tk.LEFT, padx=5)
         
         self.export_csv_var = tk.BooleanVar(value=False)
         self.export_csv_check = ttk.Checkbutton(options_frame, text="Export CSV report on completion", variable=self.export_csv_var)
         self.export_csv_check.pack(side=tk.LEFT, padx=5)
 
+        self.hash_workers_var = tk.IntVar(value=DEFAULT_HASH_WORKERS)
+        self.hash_workers_spin = ttk.Spinbox(options_frame, from_=1, to=MAX_HASH_WORKERS, textvariable=self.hash_workers_var, width=4)
+        self.hash_workers_spin.pack(side=tk.RIGHT, padx=5)
+        ttk.Label(options_frame, text="Hashing threads:").pack(side=tk.RIGHT)
+
+        # Hash Cache Frame
+        cache_frame = ttk.Frame(self.dupe_tab)
+        cache_frame.pack(fill=tk.X, pady=5)
+
+        self.use_hash_cache_var = tk.BooleanVar(value=self.hash_cache is not None)
+        self.use_hash_cache_check = ttk.Checkbutton(cache_frame, text="Reuse cached hashes of unchanged files", variable=self.use_hash_cache_var)
+        self.use_hash_cache_check.pack(side=tk.LEFT, padx=5)
+
+        self.rebuild_hash_cache_var = tk.BooleanVar(value=False)
+        self.rebuild_hash_cache_check = ttk.Checkbutton(cache_frame, text="Rebuild cache (re-hash everything)", variable=self.rebuild_hash_cache_var)
+        self.rebuild_hash_cache_check.pack(side=tk.LEFT, padx=5)
+
+        self.purge_hash_cache_button = ttk.Button(cache_frame, text="Purge Hash Cache", command=self.purge_hash_cache)
+        self.purge_hash_cache_button.pack(side=tk.RIGHT, padx=5)
+
+        if self.hash_cache is None:
+            self.use_hash_cache_check.config(state=tk.DISABLED)
+            self.rebuild_hash_cache_check.config(state=tk.DISABLED)
+            self.purge_hash_cache_button.config(state=tk.DISABLED)
+
+        # Read Path Frame
+        io_frame = ttk.Frame(self.dupe_tab)
+        io_frame.pack(fill=tk.X, pady=5)
+
+        self.hash_use_mmap_var = tk.BooleanVar(value=False)
+        self.hash_use_mmap_check = ttk.Checkbutton(io_frame, text=f"Memory-map files over {HASH_MMAP_THRESHOLD // 1024**2} MB", variable=self.hash_use_mmap_var)
+        self.hash_use_mmap_check.pack(side=tk.LEFT, padx=5)
+
+        self.hash_drop_cache_var = tk.BooleanVar(value=HAS_FADVISE)
+        self.hash_drop_cache_check = ttk.Checkbutton(io_frame, text="Don't keep hashed files in the OS page cache", variable=self.hash_drop_cache_var)
+        self.hash_drop_cache_check.pack(side=tk.LEFT, padx=5)
+        if not HAS_FADVISE:
+            self.hash_drop_cache_check.config(state=tk.DISABLED)
+
         # Results Frame
         results_frame = ttk.Frame(self.dupe_tab)
         results_frame.pack(fill=tk.BOTH, expand=True)
         
         cols = ("Set #", "File path", "Size", "Modified")
-        self.dupe_tree = ttk.Treeview(results_frame, columns=cols, show="headings")
+        self.dupe_tree = VirtualList(results_frame, cols)
         
         for col in cols:
             self.dupe_tree.heading(col, text=col, command=lambda _col=col: self.sort_treeview(self.dupe_tree, _col, False))
@@ -179,17 +2956,10 @@ class FileManagementApp:
         self.dupe_tree.column("Size", width=100, anchor=tk.E)
         self.dupe_tree.column("Modified", width=150, anchor=tk.W)
 
-        # Scrollbars
-        ysb = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.dupe_tree.yview)
-        xsb = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.dupe_tree.xview)
-        self.dupe_tree.configure(yscrollcommand=ysb.set, xscrollcommand=xsb.set)
-        
-        ysb.pack(side=tk.RIGHT, fill=tk.Y)
-        xsb.pack(side=tk.BOTTOM, fill=tk.X)
-        self.dupe_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.dupe_tree.pack(fill=tk.BOTH, expand=True)
 
         # Right-click menu
-        self.dupe_tree.bind("<Button-3>", self.dupe_show_context_menu)
+        self.dupe_tree.tree.bind("<Button-3>", self.dupe_show_context_menu)
         self.dupe_context_menu = tk.Menu(self.root, tearoff=0)
         self.dupe_context_menu.add_command(label="Open Containing Folder", command=self.dupe_open_folder)
         self.dupe_context_menu.add_command(label=f"Delete Selected (to Recycle Bin)", command=self.dupe_delete_selected)
@@ -214,6 +2984,22 @@ class FileManagementApp:
         self.auto_delete_button = ttk.Button(delete_frame, text="Apply Auto-Delete", state=tk.DISABLED, command=self.start_auto_delete, style="Big.TButton")
         self.auto_delete_button.pack(side=tk.RIGHT, padx=5, fill=tk.X, expand=True)
 
+        # Link Dedupe Frame (same keep strategy, but redundant copies become links)
+        link_frame = ttk.Frame(self.dupe_tab)
+        link_frame.pack(fill=tk.X, pady=(5, 0))
+
+        ttk.Label(link_frame, text="Replace duplicates with:").pack(side=tk.LEFT, padx=(0, 5))
+        self.link_mode_var = tk.StringVar(value="Reflink, else hardlink" if HAS_FCNTL else "Hardlink")
+        self.link_mode_combo = ttk.Combobox(link_frame, textvariable=self.link_mode_var, values=list(LINK_MODES), width=24, state="readonly")
+        self.link_mode_combo.pack(side=tk.LEFT, padx=5)
+
+        self.link_dry_run_var = tk.BooleanVar(value=True)
+        self.link_dry_run_check = ttk.Checkbutton(link_frame, text="Dry run (report only)", variable=self.link_dry_run_var)
+        self.link_dry_run_check.pack(side=tk.LEFT, padx=5)
+
+        self.link_dedupe_button = ttk.Button(link_frame, text="Replace with Links", state=tk.DISABLED, command=self.start_link_dedupe)
+        self.link_dedupe_button.pack(side=tk.RIGHT, padx=5)
+
 
     def create_sorter_tab(self):
         # --- Controls Frame ---
@@ -243,13 +3029,14 @@ class FileManagementApp:
         self.sorter_copy_var = tk.BooleanVar(value=False)
         self.sorter_copy_check = ttk.Checkbutton(options_frame, text="Copy files (instead of move)", variable=self.sorter_copy_var)
         self.sorter_copy_check.pack(side=tk.LEFT, padx=5)
+        self.add_exclusion_controls(options_frame, "sorter")
 
         # --- Results Frame ---
         results_frame = ttk.Frame(self.sorter_tab)
         results_frame.pack(fill=tk.BOTH, expand=True)
         
         cols = ("File", "Current Path", "New Path")
-        self.sorter_tree = ttk.Treeview(results_frame, columns=cols, show="headings")
+        self.sorter_tree = VirtualList(results_frame, cols)
         
         for col in cols:
             self.sorter_tree.heading(col, text=col, command=lambda _col=col: self.sort_treeview(self.sorter_tree, _col, False))
@@ -258,14 +3045,7 @@ class FileManagementApp:
         self.sorter_tree.column("Current Path", width=350)
         self.sorter_tree.column("New Path", width=350)
 
-        # Scrollbars
-        ysb = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.sorter_tree.yview)
-        xsb = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.sorter_tree.xview)
-        self.sorter_tree.configure(yscrollcommand=ysb.set, xscrollcommand=xsb.set)
-        
-        ysb.pack(side=tk.RIGHT, fill=tk.Y)
-        xsb.pack(side=tk.BOTTOM, fill=tk.X)
-        self.sorter_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.sorter_tree.pack(fill=tk.BOTH, expand=True)
 
     def create_collector_tab(self):
         # --- Controls Frame ---
@@ -291,13 +3071,14 @@ class FileManagementApp:
         self.collector_copy_var = tk.BooleanVar(value=False)
         self.collector_copy_check = ttk.Checkbutton(options_frame, text="Copy files (instead of move)", variable=self.collector_copy_var)
         self.collector_copy_check.pack(side=tk.LEFT, padx=5)
+        self.add_exclusion_controls(options_frame, "collector")
         
         # --- Results Frame ---
         results_frame = ttk.Frame(self.collector_tab)
         results_frame.pack(fill=tk.BOTH, expand=True)
         
         cols = ("File", "Current Path")
-        self.collector_tree = ttk.Treeview(results_frame, columns=cols, show="headings")
+        self.collector_tree = VirtualList(results_frame, cols)
         
         for col in cols:
             self.collector_tree.heading(col, text=col, command=lambda _col=col: self.sort_treeview(self.collector_tree, _col, False))
@@ -305,14 +3086,7 @@ class FileManagementApp:
         self.collector_tree.column("File", width=250)
         self.collector_tree.column("Current Path", width=650)
 
-        # Scrollbars
-        ysb = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.collector_tree.yview)
-        xsb = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.collector_tree.xview)
-        self.collector_tree.configure(yscrollcommand=ysb.set, xscrollcommand=xsb.set)
-        
-        ysb.pack(side=tk.RIGHT, fill=tk.Y)
-        xsb.pack(side=tk.BOTTOM, fill=tk.X)
-        self.collector_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.collector_tree.pack(fill=tk.BOTH, expand=True)
 
     def create_finder_tab(self):
         # --- Filters Frame ---
@@ -370,19 +3144,74 @@ class FileManagementApp:
         self.finder_ext_entry = ttk.Entry(ext_frame, textvariable=self.finder_ext_var, width=40, state="disabled")
         self.finder_ext_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
+        # --- Name Filter ---
+        name_frame = ttk.Frame(filters_frame)
+        name_frame.pack(fill=tk.X, pady=2)
+
+        self.finder_name_check_var = tk.BooleanVar(value=False)
+        self.finder_name_check = ttk.Checkbutton(name_frame, variable=self.finder_name_check_var, command=self.toggle_finder_filters)
+        self.finder_name_check.pack(side=tk.LEFT)
+
+        ttk.Label(name_frame, text="File name matches").pack(side=tk.LEFT, padx=5)
+        self.finder_name_mode_var = tk.StringVar(value="wildcard")
+        self.finder_name_mode_combo = ttk.Combobox(name_frame, textvariable=self.finder_name_mode_var, values=["wildcard", "regex"], width=12, state="disabled")
+        self.finder_name_mode_combo.pack(side=tk.LEFT, padx=5)
+
+        self.finder_name_var = tk.StringVar(value="*.iso")
+        self.finder_name_entry = ttk.Entry(name_frame, textvariable=self.finder_name_var, width=40, state="disabled")
+        self.finder_name_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+        # --- Content Filter ---
+        content_frame = ttk.Frame(filters_frame)
+        content_frame.pack(fill=tk.X, pady=2)
+
+        self.finder_content_check_var = tk.BooleanVar(value=False)
+        self.finder_content_check = ttk.Checkbutton(content_frame, variable=self.finder_content_check_var, command=self.toggle_finder_filters)
+        self.finder_content_check.pack(side=tk.LEFT)
+
+        ttk.Label(content_frame, text="File contains").pack(side=tk.LEFT, padx=5)
+        self.finder_content_mode_var = tk.StringVar(value="text")
+        self.finder_content_mode_combo = ttk.Combobox(content_frame, textvariable=self.finder_content_mode_var, values=["text", "text, ignore case", "regex"], width=15, state="disabled")
+        self.finder_content_mode_combo.pack(side=tk.LEFT, padx=5)
+
+        self.finder_content_var = tk.StringVar(value="")
+        self.finder_content_entry = ttk.Entry(content_frame, textvariable=self.finder_content_var, width=40, state="disabled")
+        self.finder_content_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+        # --- Top-K Filter ---
+        top_frame = ttk.Frame(filters_frame)
+        top_frame.pack(fill=tk.X, pady=2)
+
+        self.finder_top_check_var = tk.BooleanVar(value=False)
+        self.finder_top_check = ttk.Checkbutton(top_frame, variable=self.finder_top_check_var, command=self.toggle_finder_filters)
+        self.finder_top_check.pack(side=tk.LEFT)
+
+        ttk.Label(top_frame, text="Show only the").pack(side=tk.LEFT, padx=5)
+        self.finder_top_var = tk.StringVar(value="100")
+        self.finder_top_entry = ttk.Entry(top_frame, textvariable=self.finder_top_var, width=8, state="disabled")
+        self.finder_top_entry.pack(side=tk.LEFT, padx=5)
+
+        self.finder_top_order_var = tk.StringVar(value="largest")
+        self.finder_top_order_combo = ttk.Combobox(top_frame, textvariable=self.finder_top_order_var, values=["largest", "newest", "oldest"], width=12, state="disabled")
+        self.finder_top_order_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Label(top_frame, text="matching files").pack(side=tk.LEFT, padx=5)
+
         # --- Controls Frame ---
         controls_frame = ttk.Frame(self.finder_tab)
         controls_frame.pack(fill=tk.X, pady=(10, 10))
         
         self.finder_preview_button = ttk.Button(controls_frame, text="Find Files", command=self.start_find_files, style="Big.TButton")
         self.finder_preview_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.finder_forget_button = ttk.Button(controls_frame, text="Forget Last Scan", command=self.forget_finder_index)
+        self.finder_forget_button.pack(side=tk.LEFT, padx=5)
+        self.add_exclusion_controls(controls_frame, "finder")
         
         # --- Results Frame ---
         results_frame = ttk.Frame(self.finder_tab)
         results_frame.pack(fill=tk.BOTH, expand=True)
         
         cols = ("File", "Folder", "Size", "Modified")
-        self.finder_tree = ttk.Treeview(results_frame, columns=cols, show="headings", selectmode="extended")
+        self.finder_tree = VirtualList(results_frame, cols)
         
         for col in cols:
             self.finder_tree.heading(col, text=col, command=lambda _col=col: self.sort_treeview(self.finder_tree, _col, False))
@@ -392,17 +3221,10 @@ class FileManagementApp:
         self.finder_tree.column("Size", width=100, anchor=tk.E)
         self.finder_tree.column("Modified", width=150, anchor=tk.W)
 
-        # Scrollbars
-        ysb = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.finder_tree.yview)
-        xsb = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.finder_tree.xview)
-        self.finder_tree.configure(yscrollcommand=ysb.set, xscrollcommand=xsb.set)
-        
-        ysb.pack(side=tk.RIGHT, fill=tk.Y)
-        xsb.pack(side=tk.BOTTOM, fill=tk.X)
-        self.finder_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.finder_tree.pack(fill=tk.BOTH, expand=True)
         
         # Right-click menu
-        self.finder_tree.bind("<Button-3>", self.finder_show_context_menu)
+        self.finder_tree.tree.bind("<Button-3>", self.finder_show_context_menu)
         self.finder_context_menu = tk.Menu(self.root, tearoff=0)
         self.finder_context_menu.add_command(label="Open File", command=self.finder_open_file)
         self.finder_context_menu.add_command(label="Open Containing Folder", command=self.finder_open_folder)
@@ -466,6 +3288,24 @@ class FileManagementApp:
         self.analyzer_items_entry.pack(side=tk.LEFT, padx=5)
         ttk.Label(items_frame, text="items (folders only)").pack(side=tk.LEFT, padx=5)
 
+        # --- Top-K Filter ---
+        top_frame = ttk.Frame(filters_frame)
+        top_frame.pack(fill=tk.X, pady=2)
+
+        self.analyzer_top_check_var = tk.BooleanVar(value=False)
+        self.analyzer_top_check = ttk.Checkbutton(top_frame, variable=self.analyzer_top_check_var, command=self.toggle_analyzer_filters)
+        self.analyzer_top_check.pack(side=tk.LEFT)
+
+        ttk.Label(top_frame, text="Show only the").pack(side=tk.LEFT, padx=5)
+        self.analyzer_top_var = tk.StringVar(value="100")
+        self.analyzer_top_entry = ttk.Entry(top_frame, textvariable=self.analyzer_top_var, width=8, state="disabled")
+        self.analyzer_top_entry.pack(side=tk.LEFT, padx=5)
+
+        self.analyzer_top_order_var = tk.StringVar(value="largest")
+        self.analyzer_top_order_combo = ttk.Combobox(top_frame, textvariable=self.analyzer_top_order_var, values=["largest", "most items"], width=12, state="disabled")
+        self.analyzer_top_order_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Label(top_frame, text="matching items").pack(side=tk.LEFT, padx=5)
+
 
         # --- Controls Frame ---
         controls_frame = ttk.Frame(self.analyzer_tab)
@@ -473,6 +3313,11 @@ class FileManagementApp:
 
         self.analyzer_scan_button = ttk.Button(controls_frame, text="Scan Folder Sizes", command=self.start_analyzer_scan, style="Big.TButton")
         self.analyzer_scan_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+
+        self.analyzer_rescan_button = ttk.Button(controls_frame, text="Rescan Changed Folders", command=self.start_analyzer_rescan)
+        self.analyzer_rescan_button.pack(side=tk.LEFT, padx=5)
+        if self.folder_sizes is None:
+            self.analyzer_rescan_button.config(state=tk.DISABLED)
         
         self.analyzer_delete_button = ttk.Button(controls_frame, text="Delete Selected", command=self.start_analyzer_delete, state=tk.DISABLED, style="Big.TButton")
         self.analyzer_delete_button.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
@@ -484,33 +3329,32 @@ class FileManagementApp:
         self.analyzer_include_files_var = tk.BooleanVar(value=False)
         self.analyzer_include_files_check = ttk.Checkbutton(options_frame, text="Include individual files in list (may be slow)", variable=self.analyzer_include_files_var)
         self.analyzer_include_files_check.pack(side=tk.LEFT, padx=5)
+        self.analyzer_processes_var = tk.BooleanVar(value=False)
+        self.analyzer_processes_check = ttk.Checkbutton(options_frame, text="Size subfolders in separate processes (very large trees)", variable=self.analyzer_processes_var)
+        self.analyzer_processes_check.pack(side=tk.LEFT, padx=5)
+        self.add_exclusion_controls(options_frame, "analyzer")
 
         # --- Results Frame ---
         results_frame = ttk.Frame(self.analyzer_tab)
         results_frame.pack(fill=tk.BOTH, expand=True)
         
         cols = ("Name", "Path", "Size", "Items")
-        self.analyzer_tree = ttk.Treeview(results_frame, columns=cols, show="headings", selectmode="extended")
+        # Names go in the tree column, so folders can be expanded in place
+        self.analyzer_tree = VirtualList(results_frame, cols, children=lambda node: node.children, row_values=self.analyzer_row)
         
         for col in cols:
             self.analyzer_tree.heading(col, text=col, command=lambda _col=col: self.sort_treeview(self.analyzer_tree, _col, False))
+        self.analyzer_tree.heading("#0", text="Name", command=lambda: self.sort_treeview(self.analyzer_tree, "Name", False, heading="#0"))
             
-        self.analyzer_tree.column("Name", width=250)
+        self.analyzer_tree.column("#0", width=250)
         self.analyzer_tree.column("Path", width=400)
         self.analyzer_tree.column("Size", width=100, anchor=tk.E)
         self.analyzer_tree.column("Items", width=100, anchor=tk.E)
 
-        # Scrollbars
-        ysb = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.analyzer_tree.yview)
-        xsb = ttk.Scrollbar(results_frame, orient=tk.HORIZONTAL, command=self.analyzer_tree.xview)
-        self.analyzer_tree.configure(yscrollcommand=ysb.set, xscrollcommand=xsb.set)
-        
-        ysb.pack(side=tk.RIGHT, fill=tk.Y)
-        xsb.pack(side=tk.BOTTOM, fill=tk.X)
-        self.analyzer_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.analyzer_tree.pack(fill=tk.BOTH, expand=True)
 
         # --- Right-click menu ---
-        self.analyzer_tree.bind("<Button-3>", self.analyzer_show_context_menu)
+        self.analyzer_tree.tree.bind("<Button-3>", self.analyzer_show_context_menu)
         self.analyzer_context_menu = tk.Menu(self.root, tearoff=0)
         self.analyzer_context_menu.add_command(label="Open Folder/File Location", command=self.analyzer_open_folder)
 
@@ -528,6 +3372,15 @@ class FileManagementApp:
         
         self.finder_ext_entry.config(state=tk.NORMAL if self.finder_ext_check_var.get() else tk.DISABLED)
 
+        self.finder_name_mode_combo.config(state=tk.NORMAL if self.finder_name_check_var.get() else tk.DISABLED)
+        self.finder_name_entry.config(state=tk.NORMAL if self.finder_name_check_var.get() else tk.DISABLED)
+
+        self.finder_content_mode_combo.config(state=tk.NORMAL if self.finder_content_check_var.get() else tk.DISABLED)
+        self.finder_content_entry.config(state=tk.NORMAL if self.finder_content_check_var.get() else tk.DISABLED)
+
+        self.finder_top_entry.config(state=tk.NORMAL if self.finder_top_check_var.get() else tk.DISABLED)
+        self.finder_top_order_combo.config(state=tk.NORMAL if self.finder_top_check_var.get() else tk.DISABLED)
+
     def toggle_analyzer_filters(self):
         """Enable/disable analyzer filter entry fields based on their checkboxes."""
         self.analyzer_size_op_combo.config(state=tk.NORMAL if self.analyzer_size_check_var.get() else tk.DISABLED)
@@ -537,6 +3390,9 @@ class FileManagementApp:
         self.analyzer_items_op_combo.config(state=tk.NORMAL if self.analyzer_items_check_var.get() else tk.DISABLED)
         self.analyzer_items_entry.config(state=tk.NORMAL if self.analyzer_items_check_var.get() else tk.DISABLED)
 
+        self.analyzer_top_entry.config(state=tk.NORMAL if self.analyzer_top_check_var.get() else tk.DISABLED)
+        self.analyzer_top_order_combo.config(state=tk.NORMAL if self.analyzer_top_check_var.get() else tk.DISABLED)
+
 
     def browse_source_dir(self):
         """Open a dialog to select the source directory."""
@@ -545,6 +3401,65 @@ class FileManagementApp:
             self.source_dir_var.set(dir_path)
             self.update_status("Ready. Start a scan or preview.")
 
+    def on_source_dir_changed(self):
+        """Stop watching a catalog that no longer matches the source folder."""
+        watcher = self.catalog_watcher
+        if watcher is not None and watcher.source_dir != self.source_dir_var.get():
+            self.stop_catalog_watch()
+            self.live_catalog_var.set(False)
+        self.schedule_catalog_label_update()
+
+    def toggle_catalog_watch(self):
+        """Start or stop keeping the source folder's catalog live."""
+        self.stop_catalog_watch()
+        if self.live_catalog_var.get():
+            source_dir = self.source_dir_var.get()
+            try:
+                has_catalog = bool(source_dir) and os.path.isdir(source_dir) and self.catalog.info(source_dir) is not None
+            except sqlite3.Error:
+                has_catalog = False
+            if not has_catalog:
+                messagebox.showinfo("No Catalog", "Build a catalog of this folder first (Refresh Catalog).")
+                self.live_catalog_var.set(False)
+            else:
+                self.catalog_watcher = CatalogWatcher(self.catalog, source_dir, on_change=lambda: self.queue.put(("catalog_updated", None)), logger=self.logger)
+                self.catalog_watcher.start()
+        self.update_catalog_label()
+
+    def stop_catalog_watch(self):
+        if self.catalog_watcher is not None:
+            self.catalog_watcher.stop()
+            self.catalog_watcher = None
+
+    def schedule_catalog_label_update(self):
+        """Refresh the catalog label shortly after the source folder stops changing."""
+        if self._catalog_label_job:
+            self.root.after_cancel(self._catalog_label_job)
+        self._catalog_label_job = self.root.after(300, self.update_catalog_label)
+
+    def update_catalog_label(self):
+        """Show how old the catalog of the current source folder is."""
+        self._catalog_label_job = None
+        if self.catalog is None:
+            return
+        source_dir = self.source_dir_var.get()
+        info = None
+        if source_dir and os.path.isdir(source_dir):
+            try:
+                info = self.catalog.info(source_dir)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Could not read the catalog: {e}")
+        if info is None:
+            self.catalog_status_var.set("No catalog for this folder")
+        else:
+            updated_at, file_count = info
+            watcher = self.catalog_watcher
+            if watcher is not None and watcher.source_dir == source_dir:
+                sweep_note = f", swept every {WATCH_SWEEP_INTERVAL_S:.0f} s" if watcher.sweeping else ""
+                self.catalog_status_var.set(f"Catalog: {file_count:,} files, live{sweep_note}")
+            else:
+                self.catalog_status_var.set(f"Catalog: {file_count:,} files, {self.format_age(time.time() - updated_at)} old")
+
     def update_status(self, message, clear_after=0):
         """Update the status bar, with an optional auto-clear timer."""
         if self._status_clear_job:
@@ -576,12 +3491,34 @@ class FileManagementApp:
         # Top-level controls
         self.browse_button.config(state=state)
         self.source_dir_entry.config(state=state)
+        self.walk_workers_spin.config(state=state)
+        for button, check in self.exclusion_controls.values():
+            button.config(state=state)
+            check.config(state=state)
+        if self.catalog is not None:
+            self.use_catalog_check.config(state=state)
+            self.refresh_catalog_button.config(state=state)
+            self.live_catalog_check.config(state=state)
         
         # Duplicate Tab Controls
         self.scan_button.config(state=state)
+        if self.scan_snapshots is not None:
+            self.rescan_button.config(state=state)
         self.empty_folder_button.config(state=state)
         self.use_hash_check.config(state=state)
+        self.byte_compare_check.config(state=state)
+        self.link_mode_combo.config(state=tk.DISABLED if scanning else "readonly")
+        self.link_dry_run_check.config(state=state)
+        self.hash_algorithm_combo.config(state=tk.DISABLED if scanning else "readonly")
         self.export_csv_check.config(state=state)
+        self.hash_workers_spin.config(state=state)
+        self.hash_use_mmap_check.config(state=state)
+        if HAS_FADVISE:
+            self.hash_drop_cache_check.config(state=state)
+        if self.hash_cache is not None:
+            self.use_hash_cache_check.config(state=state)
+            self.rebuild_hash_cache_check.config(state=state)
+            self.purge_hash_cache_button.config(state=state)
         
         # Sorter Tab Controls
         self.sorter_preview_button.config(state=state)
@@ -595,16 +3532,24 @@ class FileManagementApp:
         
         # Finder Tab Controls
         self.finder_preview_button.config(state=state)
+        self.finder_forget_button.config(state=state)
         self.finder_size_check.config(state=state)
         self.finder_date_check.config(state=state)
         self.finder_ext_check.config(state=state)
+        self.finder_name_check.config(state=state)
+        self.finder_content_check.config(state=state)
+        self.finder_top_check.config(state=state)
         # (Child widgets are handled by toggle_finder_filters)
         
         # Analyzer Tab Controls
         self.analyzer_scan_button.config(state=state)
+        if self.folder_sizes is not None:
+            self.analyzer_rescan_button.config(state=state)
         self.analyzer_include_files_check.config(state=state)
+        self.analyzer_processes_check.config(state=state)
         self.analyzer_size_check.config(state=state)
         self.analyzer_items_check.config(state=state)
+        self.analyzer_top_check.config(state=state)
         # (Child widgets are handled by toggle_analyzer_filters)
 
         # Cancel Button
@@ -616,6 +3561,73 @@ class FileManagementApp:
         else:
             self.progress_bar.stop()
 
+    # --- Exclusion Rules ---
+
+    def exclusion_settings(self, tab):
+        """Return the saved {'patterns': [...], 'one_filesystem': bool} of a tab."""
+        return self.settings.get('exclusions', {}).get(tab, {'patterns': [], 'one_filesystem': False})
+
+    def set_exclusion_settings(self, tab, **changes):
+        settings = dict(self.exclusion_settings(tab), **changes)
+        self.settings.setdefault('exclusions', {})[tab] = settings
+        try:
+            save_settings(self.settings)
+        except OSError as e:
+            self.logger.warning(f"Could not save settings: {e}")
+
+    def walk_rules(self, tab, source_dir, extra_patterns=()):
+        """Compile a tab's exclusion rules for a walk of source_dir, or return None if it has none."""
+        settings = self.exclusion_settings(tab)
+        patterns = list(settings.get('patterns', [])) + list(extra_patterns)
+        one_filesystem = settings.get('one_filesystem', False)
+        if not patterns and not one_filesystem:
+            return None
+        return WalkRules(source_dir, patterns, one_filesystem)
+
+    def add_exclusion_controls(self, parent, tab):
+        """Add a tab's "Exclusions..." button and "Stay on one filesystem" check to parent."""
+        one_fs_var = tk.BooleanVar(value=self.exclusion_settings(tab).get('one_filesystem', False))
+        check = ttk.Checkbutton(parent, text="Stay on one filesystem", variable=one_fs_var,
+                                command=lambda: self.set_exclusion_settings(tab, one_filesystem=one_fs_var.get()))
+        button = ttk.Button(parent, command=lambda: self.edit_exclusions(tab))
+        button.pack(side=tk.RIGHT, padx=5)
+        check.pack(side=tk.RIGHT, padx=5)
+        self.exclusion_controls[tab] = (button, check)
+        self.update_exclusions_button(tab)
+
+    def update_exclusions_button(self, tab):
+        count = len([line for line in self.exclusion_settings(tab).get('patterns', []) if line.strip() and not line.strip().startswith('#')])
+        self.exclusion_controls[tab][0].config(text=f"Exclusions ({count})..." if count else "Exclusions...")
+
+    def edit_exclusions(self, tab):
+        """Open a dialog to edit a tab's exclusion patterns."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Exclusions")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        ttk.Label(dialog, text="One .gitignore-style pattern per line, e.g. node_modules/  .git/  *.tmp  /Backups/\n"
+                               "A trailing / matches folders only; a leading ! includes a match again.", justify=tk.LEFT).pack(fill=tk.X, padx=10, pady=(10, 5))
+        text = tk.Text(dialog, width=60, height=12)
+        text.pack(fill=tk.BOTH, expand=True, padx=10)
+        text.insert("1.0", "\n".join(self.exclusion_settings(tab).get('patterns', [])))
+
+        def save():
+            patterns = [line.rstrip() for line in text.get("1.0", tk.END).splitlines() if line.strip()]
+            try:
+                WalkRules(".", patterns) # Reject patterns that don't compile
+            except re.error as e:
+                messagebox.showerror("Invalid Pattern", f"Could not use these patterns: {e}", parent=dialog)
+                return
+            self.set_exclusion_settings(tab, patterns=patterns)
+            self.update_exclusions_button(tab)
+            dialog.destroy()
+
+        buttons = ttk.Frame(dialog)
+        buttons.pack(fill=tk.X, padx=10, pady=10)
+        ttk.Button(buttons, text="Cancel", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(buttons, text="Save", command=save).pack(side=tk.RIGHT, padx=5)
+
     def start_task(self, logic_function, *args):
         """Generic task starter for threaded operations."""
         if self.current_task:
@@ -629,6 +3641,17 @@ class FileManagementApp:
             
         self.toggle_controls(scanning=True)
         self.current_task = threading.Event()
+        try:
+            self.walk_workers = min(MAX_WALK_WORKERS, max(1, int(self.walk_workers_var.get())))
+        except (ValueError, tk.TclError):
+            self.walk_workers = DEFAULT_WALK_WORKERS
+        self.active_catalog = None
+        if self.catalog is not None and self.use_catalog_var.get():
+            try:
+                if self.catalog.info(source_dir) is not None:
+                    self.active_catalog = self.catalog
+            except sqlite3.Error as e:
+                self.logger.warning(f"Could not read the catalog: {e}")
         
         # Pass the event and directory as the first args to the logic function
         all_args = (self.current_task, source_dir) + args
@@ -644,69 +3667,77 @@ class FileManagementApp:
     
     # --- THIS IS THE ONLY, CORRECT check_queue FUNCTION ---
     def check_queue(self):
-        """Poll the queue for messages from worker threads."""
+        """
+        Handle messages from worker threads for up to QUEUE_FRAME_BUDGET_S,
+        then hand back to Tk so the window stays responsive. Only the latest
+        of a run of consecutive status messages is shown. When nothing comes
+        in, the poll interval doubles up to QUEUE_POLL_MAX_MS. Workers never
+        touch Tk themselves; this loop is the only reader of the queue.
+        """
         processed_count = 0
         is_done_or_error = False
         final_message = ""
+        pending_status = None
+        deadline = time.perf_counter() + QUEUE_FRAME_BUDGET_S
         
         try:
-            while processed_count < QUEUE_BATCH_PROCESS_LIMIT:
+            while time.perf_counter() < deadline:
                 msg = self.queue.get_nowait()
                 processed_count += 1
                 
                 msg_type, data = msg
                 
                 if msg_type == "status":
-                    self.update_status(data)
+                    pending_status = data # Shown once the run of statuses ends
+                    continue
+                if pending_status is not None:
+                    # Show it before anything that came after it, such as a "done" message
+                    self.update_status(pending_status)
+                    pending_status = None
                 
                 # --- Batch Treeview Updates ---
-                elif msg_type == "dupe_results_batch":
-                    for item in data:
-                        self.dupe_tree.insert("", tk.END, values=item)
+                if msg_type == "dupe_results_batch":
+                    self.dupe_tree.append(data)
                 elif msg_type == "sorter_results_batch":
-                    for item in data:
-                        self.sorter_tree.insert("", tk.END, values=item)
+                    self.sorter_tree.append(data)
                 elif msg_type == "collector_results_batch":
-                    for item in data:
-                        self.collector_tree.insert("", tk.END, values=item)
+                    self.collector_tree.append(data)
                 elif msg_type == "finder_results_batch":
-                    for item in data:
-                        self.finder_tree.insert("", tk.END, values=item)
+                    self.finder_tree.append(data)
                 elif msg_type == "analyzer_results_batch":
-                    for item in data:
-                        self.analyzer_tree.insert("", tk.END, values=item)
+                    self.analyzer_tree.append(data)
+                elif msg_type == "analyzer_size_tree":
+                    self.analyzer_tree.append([self.analyzer_row(child) for child in data.children], data.children)
 
                 # --- Clear Treeviews ---
                 elif msg_type == "clear_dupe_tree":
-                    self.dupe_tree.delete(*self.dupe_tree.get_children())
+                    self.dupe_tree.clear()
                 elif msg_type == "clear_sorter_tree":
-                    self.sorter_tree.delete(*self.sorter_tree.get_children())
+                    self.sorter_tree.clear()
                 elif msg_type == "clear_collector_tree":
-                    self.collector_tree.delete(*self.collector_tree.get_children())
+                    self.collector_tree.clear()
                 elif msg_type == "clear_finder_tree":
-                    self.finder_tree.delete(*self.finder_tree.get_children())
+                    self.finder_tree.clear()
                 elif msg_type == "clear_analyzer_tree":
-                    self.analyzer_tree.delete(*self.analyzer_tree.get_children())
+                    self.analyzer_tree.clear()
+                elif msg_type == "analyzer_items_deleted":
+                    self.update_analyzer_ancestors(data)
 
                 # --- Remove Specific Items (post-action) ---
                 elif msg_type == "remove_dupe_iids":
                     self.dupe_tree.delete(*data)
                 elif msg_type == "remove_finder_items":
-                    for iid in data:
-                        try:
-                            # This message is now shared by Finder and Analyzer
-                            self.finder_tree.delete(iid)
-                        except tk.TclError:
-                            try:
-                                self.analyzer_tree.delete(iid)
-                            except tk.TclError:
-                                pass # Item already gone from both
+                    # This message is shared by Finder and Analyzer; row ids are
+                    # unique across lists and unknown ones are ignored
+                    self.finder_tree.delete(*data)
+                    self.analyzer_tree.delete(*data)
 
                 # --- "Preview Done" messages (enables action buttons) ---
                 elif msg_type == "dupe_scan_done":
                     message, file_count = data # Unpack (message, count)
                     if file_count > 0:
                         self.auto_delete_button.config(state=tk.NORMAL)
+                        self.link_dedupe_button.config(state=tk.NORMAL)
                     is_done_or_error = True
                     final_message = message
 
@@ -747,16 +3778,17 @@ class FileManagementApp:
                 elif msg_type == "dupe_action_done": # <-- This was missing
                     message, _ = data
                     # Get a fresh, reliable count
-                    remaining_count = len(self.dupe_tree.get_children())
+                    remaining_count = len(self.dupe_tree.store)
                     if remaining_count > 0:
                         self.auto_delete_button.config(state=tk.NORMAL)
+                        self.link_dedupe_button.config(state=tk.NORMAL)
                     is_done_or_error = True
                     final_message = message
                     
                 elif msg_type == "finder_action_done":
                     message, _ = data
                     # Get a fresh, reliable count
-                    remaining_count = len(self.finder_tree.get_children())
+                    remaining_count = len(self.finder_tree.store)
                     if remaining_count > 0:
                         self.finder_delete_button.config(state=tk.NORMAL)
                         self.finder_move_button.config(state=tk.NORMAL)
@@ -767,13 +3799,16 @@ class FileManagementApp:
                 elif msg_type == "analyzer_action_done":
                     message, _ = data
                      # Get a fresh, reliable count
-                    remaining_count = len(self.analyzer_tree.get_children())
+                    remaining_count = len(self.analyzer_tree.store)
                     if remaining_count > 0:
                         self.analyzer_delete_button.config(state=tk.NORMAL)
                     is_done_or_error = True
                     final_message = message
 
                 # --- Final "Done" or "Error" messages ---
+                elif msg_type == "catalog_updated":
+                    self.update_catalog_label()
+
                 elif msg_type == "done":
                     is_done_or_error = True
                     final_message = data
@@ -795,184 +3830,487 @@ class FileManagementApp:
             final_message = f"Critical UI Error: {e}"
             self.logger.exception("Critical error in check_queue")
 
+        if pending_status is not None:
+            self.update_status(pending_status)
+
         # If a task finished, update state
         if self.current_task and is_done_or_error:
             self.toggle_controls(scanning=False) # Re-enable scan buttons
             self.current_task = None
             self.update_status(final_message) # Show final message
             
-        # Reschedule the queue check
-        self.root.after(QUEUE_POLL_INTERVAL_MS, self.check_queue)
+        # Reschedule the queue check: right after Tk has caught up if the budget
+        # ran out, soon while messages flow, and ever more rarely when idle
+        if not self.queue.empty():
+            self._queue_interval_ms = QUEUE_POLL_MIN_MS
+            self._queue_job = self.root.after(1, self.check_queue)
+            return
+        if processed_count:
+            self._queue_interval_ms = QUEUE_POLL_MIN_MS
+        else:
+            self._queue_interval_ms = min(self._queue_interval_ms * 2, QUEUE_POLL_MAX_MS)
+        self._queue_job = self.root.after(self._queue_interval_ms, self.check_queue)
 
 
     # --- ============================= ---
     # --- Duplicate Cleaner Methods ---
     # --- ============================= ---
     
-    def start_scan(self):
-        """Start the duplicate file scan."""
+    def start_scan(self, incremental=False):
+        """Start the duplicate file scan (or a rescan of changed folders only)."""
         # Disable button *before* starting task
         self.auto_delete_button.config(state=tk.DISABLED) 
+        self.link_dedupe_button.config(state=tk.DISABLED)
         self.queue.put(("clear_dupe_tree", None))
         self.update_status("Starting scan...")
-        use_hash = self.use_hash_var.get()
-        export_csv = self.export_csv_var.get()
+        try:
+            hash_workers = min(MAX_HASH_WORKERS, max(1, int(self.hash_workers_var.get())))
+        except (ValueError, tk.TclError):
+            hash_workers = DEFAULT_HASH_WORKERS
+
+        options = {
+            'use_hash': self.use_hash_var.get(),
+            'byte_compare': self.byte_compare_var.get(),
+            'algorithm': self.hash_algorithm_var.get(),
+            'export_csv': self.export_csv_var.get(),
+            'hash_cache': self.hash_cache if self.use_hash_cache_var.get() else None,
+            'rebuild_cache': self.rebuild_hash_cache_var.get(),
+            'hash_workers': hash_workers,
+            'io_options': {'use_mmap': self.hash_use_mmap_var.get(), 'drop_cache': self.hash_drop_cache_var.get()},
+            'snapshots': self.scan_snapshots,
+            'incremental': incremental,
+        }
         
         # --- FIXED BUG: Set start_time only if task successfully starts ---
-        if self.start_task(self.scan_logic, use_hash, export_csv):
+        if self.start_task(self.scan_logic, options):
             self.start_time = datetime.now() # Set start time
-            self.update_status("Scanning for duplicates...")
+            self.update_status("Rescanning changed folders..." if incremental else "Scanning for duplicates...")
+
+    def start_rescan(self):
+        """Re-run the last duplicate scan, re-listing only folders that changed."""
+        self.start_scan(incremental=True)
         
-    def scan_logic(self, cancel_event, source_dir, use_hash, export_csv):
-        """Worker thread logic for finding duplicate files."""
+    def scan_logic(self, cancel_event, source_dir, options):
+        """
+        Worker thread logic for finding duplicate files.
+
+        In incremental mode the previous snapshot of source_dir is loaded and
+        only folders whose mtime changed are listed again. Size groups with no
+        added, removed or changed file keep their previous result; the rest are
+        checked again. Edits that rewrite a file in place don't change its
+        folder's mtime, so run a full scan to pick those up.
+        """
+        use_hash = options.get('use_hash', False)
+        byte_compare = options.get('byte_compare', False)
+        algorithm = options.get('algorithm', DEFAULT_HASH_ALGORITHM)
+        hash_cache = options.get('hash_cache')
+        snapshots = options.get('snapshots')
         try:
-            files_by_size = {}
+            if hash_cache is not None:
+                hash_cache.reset_stats()
+
             files_by_mod_time = {}
-            potential_dupes = []
             final_dupe_sets = []
+            method = self.dupe_match_method(use_hash, byte_compare, algorithm)
+
+            tiers = {
+                'size': DupeTier("Size"),
+                'compare': DupeTier("Byte compare"),
+                'sample': DupeTier("Sample"),
+                'full': DupeTier("Full hash"),
+            }
+            rules = self.walk_rules("dupe", source_dir)
+            catalog = self.active_catalog if rules is None else None # The catalog holds every file
+            catalog_table = None
+            if catalog is not None:
+                # Only files sharing their size with another come back from the catalog
+                self.queue.put(("status", "Reading size groups from the catalog..."))
+                catalog_table = catalog.load_table(source_dir)
+                if catalog_table is None:
+                    # Removed since the task started: walk the folder as if there were none
+                    self.logger.info(f"The catalog of {source_dir} is gone; scanning the folder instead")
+                else:
+                    snapshots = None # The catalog replaces both the walk and the snapshot
+
+            previous = None
+            if options.get('incremental') and snapshots is not None:
+                previous = snapshots.load(source_dir)
+                if previous is None:
+                    self.queue.put(("status", "No saved scan for this folder. Running a full scan..."))
             
             # --- Pass 1: Group by size ---
-            self.queue.put(("status", "Scanning files and grouping by size..."))
-            for root, dirs, files in os.walk(source_dir):
-                if cancel_event.is_set():
+            if catalog_table is not None:
+                table, singles, singles_bytes = catalog_table
+                tiers['size'].record_unique(singles, singles_bytes)
+                dir_info, reused_dirs = {}, 0
+            else:
+                self.queue.put(("status", "Scanning files and grouping by size..."))
+                walk = self.collect_file_records(cancel_event, source_dir, previous, rules)
+                if walk is None:
                     self.queue.put(("cancelled", None))
                     return
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        if file_size < 1: # Skip empty files
+                table, dir_info, reused_dirs = walk
+
+            # Row numbers sorted by size, so each size group is one run. Paths
+            # are only built for runs of two or more files.
+            sizes = table.sizes
+            order = sorted(range(len(table)), key=sizes.__getitem__)
+            groups_to_check = {}
+            hardlink_sets = []
+            file_info = {} # path -> FileStat for every file that can end up in a set
+            start = 0
+            while start < len(order):
+                file_size = sizes[order[start]]
+                end = start + 1
+                while end < len(order) and sizes[order[end]] == file_size:
+                    end += 1
+                run = order[start:end]
+                start = end
+                if file_size < 1: # Skip empty files
+                    continue
+                if len(run) == 1:
+                    tiers['size'].record([1], file_size)
+                    continue
+
+                paths = []
+                links_by_inode = {} # (st_dev, st_ino) -> all paths, for files with st_nlink > 1
+                for row in run:
+                    file_path = table.path(row)
+                    file_info[file_path] = FileStat(file_size, table.mtimes[row], table.devs[row], table.inodes[row])
+                    # Extra hardlinks to an inode we've already seen share its
+                    # data: keep one path per inode, remember the others
+                    if table.nlinks[row] > 1 and table.inodes[row]:
+                        inode = (table.devs[row], table.inodes[row])
+                        if inode in links_by_inode:
+                            links_by_inode[inode].append(file_path)
                             continue
-                        
-                        if file_size in files_by_size:
-                            files_by_size[file_size].append(file_path)
-                        else:
-                            files_by_size[file_size] = [file_path]
-                    except (IOError, OSError):
-                        continue
-            
-            # Filter groups with more than one file
-            groups_to_check = {size: paths for size, paths in files_by_size.items() if len(paths) > 1}
+                        links_by_inode[inode] = [file_path]
+                    paths.append(file_path)
+
+                tiers['size'].record([len(paths)], file_size)
+                if len(paths) > 1: # Filter groups with more than one file
+                    groups_to_check[file_size] = paths
+                hardlink_sets.extend(links for links in links_by_inode.values() if len(links) > 1)
+            del order
+            links_skipped = sum(len(paths) - 1 for paths in hardlink_sets)
+
+            # --- Incremental: keep the results of size groups nothing touched ---
+            rescan_msg = ""
+            reused_sets = []
+            if previous is not None and previous['method'] == method:
+                affected_sizes = self.changed_sizes(previous['files'], table)
+                for dupe_set in previous['dupe_sets']:
+                    # A removed or changed file puts its old size in affected_sizes
+                    size = previous['files'][dupe_set[0]][0]
+                    if size not in affected_sizes:
+                        reused_sets.append(dupe_set)
+                groups_to_check = {size: paths for size, paths in groups_to_check.items() if size in affected_sizes}
+                rescan_msg = f" Rescan reused {reused_dirs}/{len(dir_info)} folders; rechecked {len(groups_to_check)} size groups."
             
-            if not groups_to_check:
-                self.queue.put(("dupe_scan_done", ("Scan complete. No potential duplicates found.", 0)))
+            if not groups_to_check and not hardlink_sets and not reused_sets:
+                self.save_scan_snapshot(snapshots, source_dir, method, dir_info, table, [])
+                self.queue.put(("dupe_scan_done", ("Scan complete. No potential duplicates found." + rescan_msg, 0)))
                 return
 
+            # --- Results are streamed to the UI as each set is confirmed ---
+            results_batch = []
+            totals = {'wasted': 0, 'last_flush': time.monotonic()}
+
+            def emit(dupe_set, set_id=None, wasted=True):
+                if set_id is None:
+                    final_dupe_sets.append(dupe_set)
+                    set_id = f"Set {len(final_dupe_sets)}"
+                # Sort by path by default to keep it consistent
+                files_with_info = sorted((path, file_info[path][0], file_info[path][1] / 1e9) for path in dupe_set)
+                if wasted:
+                    totals['wasted'] += files_with_info[0][1] * (len(files_with_info) - 1)
+                for path, size, mtime in files_with_info:
+                    mod_time_str = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+                    results_batch.append((set_id, path, self.format_size(size), mod_time_str))
+                now = time.monotonic()
+                if len(results_batch) >= 100 or now - totals['last_flush'] >= HASH_PROGRESS_INTERVAL_S:
+                    self.queue.put(("dupe_results_batch", list(results_batch)))
+                    results_batch.clear()
+                    totals['last_flush'] = now
+
+            for dupe_set in reused_sets:
+                emit(dupe_set)
+
+            # Most potentially wasted bytes first, so the valuable sets show up early
+            ordered_groups = sorted(groups_to_check.items(), key=lambda g: g[0] * (len(g[1]) - 1), reverse=True)
+
             # --- Pass 2: Group by Mod Time (Fast Check) ---
-            self.queue.put(("status", "Comparing modification times..."))
-            if not use_hash:
-                for size, paths in groups_to_check.items():
+            if not use_hash and not byte_compare:
+                self.queue.put(("status", "Comparing modification times..."))
+                for size, paths in ordered_groups:
                     if cancel_event.is_set():
                         self.queue.put(("cancelled", None))
                         return
                         
                     files_by_mod_time.clear()
                     for path in paths:
-                        try:
-                            mod_time = os.path.getmtime(path)
-                            if mod_time in files_by_mod_time:
-                                files_by_mod_time[mod_time].append(path)
-                            else:
-                                files_by_mod_time[mod_time] = [path]
-                        except (IOError, OSError):
-                            continue
+                        mod_time = file_info[path][1]
+                        if mod_time in files_by_mod_time:
+                            files_by_mod_time[mod_time].append(path)
+                        else:
+                            files_by_mod_time[mod_time] = [path]
                     
                     for mod_time, dupe_paths in files_by_mod_time.items():
                         if len(dupe_paths) > 1:
-                            potential_dupes.append(dupe_paths)
-                
-                final_dupe_sets = potential_dupes # With this method, potential is final
+                            emit(dupe_paths) # With this method, potential is final
             
-            # --- Pass 3: Group by Hash (Slow Check) ---
+            # --- Pass 3: Confirm by content (Slow Check) ---
             else:
-                self.queue.put(("status", f"Hashing {len(groups_to_check)} potential groups..."))
-                hashes = {}
-                checked_count = 0
-                total_to_check = len(groups_to_check)
+                self.queue.put(("status", f"Checking contents of {len(ordered_groups)} potential groups..."))
+                engine = HashingEngine(options.get('hash_workers', DEFAULT_HASH_WORKERS), cancel_event)
 
-                for size, paths in groups_to_check.items():
-                    if cancel_event.is_set():
-                        self.queue.put(("cancelled", None))
-                        return
-                    
-                    checked_count += 1
-                    if checked_count % 10 == 0:
-                         self.queue.put(("status", f"Hashing group {checked_count}/{total_to_check}..."))
-
-                    hashes.clear()
-                    for path in paths:
-                        try:
-                            file_hash = self.hash_file(path)
-                            if file_hash in hashes:
-                                hashes[file_hash].append(path)
-                            else:
-                                hashes[file_hash] = [path]
-                        except (IOError, OSError):
-                            continue
-                    
-                    for file_hash, dupe_paths in hashes.items():
-                        if len(dupe_paths) > 1:
-                            final_dupe_sets.append(dupe_paths)
-
-            # --- Processing Results ---
-            self.queue.put(("status", "Scan complete. Populating results..."))
-            total_wasted = 0
-            results_batch = []
-            
-            for i, dupe_set in enumerate(final_dupe_sets):
-                set_id = f"Set {i+1}"
-                # Get file info for sorting
-                files_with_info = []
-                for path in dupe_set:
-                    try:
-                        stat = os.stat(path)
-                        files_with_info.append((path, stat.st_size, stat.st_mtime))
-                    except (IOError, OSError):
-                        continue
-                
-                # Sort by path by default to keep it consistent
-                files_with_info.sort(key=lambda x: x[0])
-                
-                total_wasted += files_with_info[0][1] * (len(files_with_info) - 1)
-                
-                for path, size, mtime in files_with_info:
-                    mod_time_str = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-                    size_str = self.format_size(size)
-                    results_batch.append((set_id, path, size_str, mod_time_str))
+                self.confirm_groups_by_content(ordered_groups, engine, tiers, options, emit, file_info)
+                if cancel_event.is_set():
+                    self.queue.put(("cancelled", None))
+                    return
                 
-                if len(results_batch) >= 100: # Send batch to UI
-                    self.queue.put(("dupe_results_batch", results_batch))
-                    results_batch = []
+                tier_keys = ('size', 'compare', 'sample', 'full') if byte_compare else ('size', 'sample', 'full')
+                tiers_msg = "; ".join(tiers[key].summary(self.format_size) for key in tier_keys)
 
+            # Hardlink groups last (they waste no space)
+            for i, link_set in enumerate(hardlink_sets):
+                emit(link_set, f"{HARDLINK_SET_PREFIX} {i+1}", wasted=False)
             if results_batch: # Send final batch
-                self.queue.put(("dupe_results_batch", results_batch))
+                self.queue.put(("dupe_results_batch", list(results_batch)))
 
-            if export_csv and final_dupe_sets:
-                self.export_csv_report(final_dupe_sets, source_dir)
+            self.save_scan_snapshot(snapshots, source_dir, method, dir_info, table, final_dupe_sets)
+
+            if options.get('export_csv') and final_dupe_sets:
+                self.export_csv_report(final_dupe_sets, source_dir, method if (use_hash or byte_compare) else None, file_info)
             
             elapsed = (datetime.now() - self.start_time).total_seconds()
-            stats_msg = f"Scan complete in {elapsed:.2f}s. Found {len(final_dupe_sets)} duplicate sets. Wasted space ≈ {self.format_size(total_wasted)}"
+            stats_msg = f"Scan complete in {elapsed:.2f}s. Found {len(final_dupe_sets)} duplicate sets. Wasted space ≈ {self.format_size(totals['wasted'])}"
+            if hardlink_sets:
+                stats_msg += f". {len(hardlink_sets)} hardlink groups ({links_skipped} extra links not re-hashed)"
+            if use_hash or byte_compare:
+                stats_msg += f" [{method}; {tiers_msg}]"
+                if hash_cache is not None:
+                    stats_msg += f" ({hash_cache.stats_text()})"
+            stats_msg += rescan_msg
             self.queue.put(("dupe_scan_done", (stats_msg, len(final_dupe_sets))))
 
         except Exception as e:
             self.logger.exception("Error in scan_logic")
             self.queue.put(("error", f"An error occurred during scan: {e}"))
 
+        finally:
+            if hash_cache is not None:
+                try:
+                    hash_cache.flush() # Keep whatever was hashed, even on cancel
+                except sqlite3.Error as e:
+                    self.logger.warning(f"Could not save hash cache: {e}")
+
+    def dupe_match_method(self, use_hash, byte_compare, algorithm):
+        """Describe how duplicate contents are confirmed (CSV report and snapshots)."""
+        if byte_compare:
+            return f"Byte-by-byte ({algorithm} for groups over {MAX_COMPARE_GROUP} files)"
+        if use_hash:
+            return algorithm
+        return "Size + modification time"
+
+    def collect_file_records(self, cancel_event, source_dir, previous=None, rules=None):
+        """
+        List every file under source_dir with one stat per file.
+
+        Returns (table, dir_info, reused_dirs), where table is a FileTable of
+        every file's (size, mtime_ns, dev, ino, nlink) and dir_info maps each
+        folder to (mtime_ns, subfolders). Folders whose mtime matches the previous
+        snapshot are not listed; their files and subfolders come from the
+        snapshot. Files and folders excluded by rules (WalkRules) are left out.
+        Returns None if cancelled.
+        """
+        table = FileTable()
+        dir_info = {}
+        reused_dirs = 0
+        prev_dirs = previous['dirs'] if previous else {}
+        prev_files = previous['files'] if previous else {}
+        prev_by_dir = {}
+        if prev_dirs:
+            for path, record in prev_files.items():
+                folder, name = os.path.split(path)
+                prev_by_dir.setdefault(folder, []).append((name, record))
+
+        def list_records(root):
+            # Runs on the walker threads: (subfolder names, (mtime, records, reused))
+            dir_mtime = os.stat(root).st_mtime_ns
+            prev = prev_dirs.get(root)
+            if prev is not None and prev[0] == dir_mtime:
+                reused_records = prev_by_dir.get(root, ())
+                if rules is not None:
+                    reused_records = [(name, record) for name, record in reused_records if rules.keep_file(root, name)]
+                return [os.path.basename(d) for d in prev[1]], (dir_mtime, reused_records, True)
+            dirs, files = scan_dir(root)
+            if rules is not None:
+                files = rules.filter_files(root, files)
+            dir_records = []
+            for entry in files:
+                try:
+                    # DirEntry.stat() has no inode/link data on Windows
+                    stat = os.stat(entry.path) if os.name == 'nt' else entry.stat()
+                except (IOError, OSError):
+                    continue
+                dir_records.append((entry.name, (stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, stat.st_nlink)))
+            return dirs, (dir_mtime, dir_records, False)
+
+        for root, dirs, (dir_mtime, dir_records, reused) in parallel_scan_tree(source_dir, self.walk_workers, lister=list_records, cancel_event=cancel_event, rules=rules):
+            if cancel_event.is_set():
+                return None
+            dir_id = table.add_dir(root)
+            for name, record in dir_records:
+                table.add(dir_id, name, *record)
+            reused_dirs += reused
+            dir_info[root] = (dir_mtime, [os.path.join(root, d) for d in dirs])
+        if cancel_event.is_set():
+            return None
+        return table, dir_info, reused_dirs
+
+    def changed_sizes(self, old_records, table):
+        """Return the file sizes whose group gained, lost or changed a file between two scans."""
+        affected = set()
+        removed = set(old_records)
+        for path, record in table.items():
+            old = old_records.get(path)
+            if old is not None:
+                removed.discard(path)
+            if old != record:
+                affected.add(record[0])
+                if old is not None:
+                    affected.add(old[0])
+        for path in removed:
+            affected.add(old_records[path][0])
+        return affected
+
+    def save_scan_snapshot(self, snapshots, source_dir, method, dir_info, table, dupe_sets):
+        """Persist a finished scan so the next rescan can skip unchanged folders."""
+        if snapshots is None:
+            return
+        self.queue.put(("status", "Saving scan snapshot..."))
+        try:
+            snapshots.save(source_dir, method, dir_info, table, dupe_sets)
+        except (sqlite3.Error, ValueError) as e: # UnicodeEncodeError is a ValueError
+            self.logger.warning(f"Could not save scan snapshot: {e}")
+
+    def confirm_groups_by_content(self, groups, engine, tiers, options, emit, recorded=None):
+        """
+        Confirm same-size (size, paths) groups by content on the engine's pool and
+        call emit(paths) for each duplicate set as soon as its group is resolved.
+        recorded maps paths to the FileStat from the walk, so hash cache hits
+        cost no stat.
+
+        Hashed groups go size -> head+tail sample hash -> full hash, each tier
+        only seeing the files the previous one could not tell apart. In
+        byte-compare mode, groups small enough to keep open together are compared
+        in lockstep instead. Groups are started in the given order, and follow-up
+        work for a group already in progress jumps the queue.
+        """
+        algorithm = options.get('algorithm', DEFAULT_HASH_ALGORITHM)
+        hash_cache = options.get('hash_cache')
+        rebuild_cache = options.get('rebuild_cache', False)
+        io_options = options.get('io_options')
+        cancel_event = engine.cancel_event
+
+        def job(item):
+            stage, size, payload, _ = item
+            if stage == 'compare':
+                result = compare_files_lockstep(payload, cancel_event=cancel_event)
+                return result, (result[2] if result else 0)
+            if stage == 'sample':
+                return self.sample_hash_file(payload, size, algorithm=algorithm, cancel_event=cancel_event), 2 * SAMPLE_HASH_BYTES
+            digest, from_cache = self.cached_hash_file(payload, hash_cache, rebuild_cache, algorithm=algorithm, cancel_event=cancel_event, io_options=io_options,
+                                                       recorded=recorded.get(payload) if recorded else None)
+            return digest, 0 if from_cache else size
+
+        def hash_jobs(stage, size, paths):
+            group = {'pending': len(paths), 'buckets': {}}
+            return [(stage, size, path, group) for path in paths]
+
+        # Work items are (stage, size, path or paths, shared group state)
+        work = collections.deque()
+        for size, paths in groups:
+            if options.get('byte_compare') and len(paths) <= MAX_COMPARE_GROUP:
+                work.append(('compare', size, paths, None))
+            else:
+                # Files no bigger than both samples are read in full anyway
+                work.extend(hash_jobs('sample' if size > 2 * SAMPLE_HASH_BYTES else 'full', size, paths))
+
+        done = 0
+        last_report = 0.0
+        for (stage, size, payload, group), result, error in engine.run(job, work):
+            done += 1
+            now = time.monotonic()
+            if now - last_report >= HASH_PROGRESS_INTERVAL_S:
+                last_report = now
+                cache_msg = f" ({hash_cache.stats_text()})" if hash_cache is not None else ""
+                self.queue.put(("status", f"Checking contents: {done} jobs done, {len(work)} queued, {self.format_size(engine.rate())}/s{cache_msg}"))
+
+            if stage == 'compare':
+                if error is None and result is not None:
+                    identical_groups, singles, _ = result
+                    tiers['compare'].record_singles(len(payload), singles, size)
+                    for dupe_set in identical_groups:
+                        emit(dupe_set)
+                continue
+
+            group['pending'] -= 1
+            if error is None and result is not None:
+                group['buckets'].setdefault(result, []).append(payload)
+            if group['pending']:
+                continue
+
+            # Every file of this group has been through the tier: split it
+            split = list(group['buckets'].values())
+            tiers[stage].record([len(paths) for paths in split], size, 2 * SAMPLE_HASH_BYTES if stage == 'sample' else size)
+            for paths in split:
+                if len(paths) < 2:
+                    continue
+                if stage == 'sample':
+                    work.extendleft(reversed(hash_jobs('full', size, paths)))
+                else:
+                    emit(paths)
+
+    def purge_hash_cache(self):
+        """Delete every entry from the persistent hash cache."""
+        if self.current_task:
+            messagebox.showwarning("Task in Progress", "Please wait for the current task to finish before purging the cache.")
+            return
+        try:
+            count = self.hash_cache.entry_count()
+            if not messagebox.askyesno("Purge Hash Cache", f"Delete all {count} cached file hashes? The next hash scan will re-read every file."):
+                return
+            self.hash_cache.purge()
+            self.update_status(f"Hash cache purge complete. Removed {count} entries.")
+        except sqlite3.Error as e:
+            self.logger.exception("Failed to purge hash cache")
+            self.update_status(f"Error purging hash cache: {e}")
+
     def start_auto_delete(self):
         """Start the auto-delete process based on the selected strategy."""
         strategy = self.delete_strategy_var.get()
         
-        # Get all item IDs from the tree
-        all_iids = self.dupe_tree.get_children()
-        if not all_iids:
+        files_by_set = self.collect_dupe_sets()
+        if not files_by_set:
             messagebox.showinfo("Nothing to Delete", "No duplicates found in the list.")
             return
             
-        # Group files by Set #
+        self.update_status(f"Applying auto-delete strategy: {strategy}...")
+        if self.start_task(self.auto_delete_logic, files_by_set, strategy):
+            self.update_status(f"Auto-deleting files...")
+            self.auto_delete_button.config(state=tk.DISABLED)
+            self.link_dedupe_button.config(state=tk.DISABLED)
+
+    def collect_dupe_sets(self):
+        """Group the rows of the duplicate list by Set # (hardlink groups are skipped)."""
         files_by_set = {}
-        for iid in all_iids:
+        for iid in self.dupe_tree.get_children():
             values = self.dupe_tree.item(iid, 'values')
             set_id = values[0]
+            if set_id.startswith(HARDLINK_SET_PREFIX):
+                continue # Hardlinks share one copy of the data; deleting frees nothing
             path = values[1]
             mtime_str = values[3]
             mtime = datetime.strptime(mtime_str, '%Y-%m-%d %H:%M:%S').timestamp()
@@ -980,11 +4318,16 @@ class FileManagementApp:
             if set_id not in files_by_set:
                 files_by_set[set_id] = []
             files_by_set[set_id].append({'iid': iid, 'path': path, 'mtime': mtime})
-            
-        self.update_status(f"Applying auto-delete strategy: {strategy}...")
-        if self.start_task(self.auto_delete_logic, files_by_set, strategy):
-            self.update_status(f"Auto-deleting files...")
-            self.auto_delete_button.config(state=tk.DISABLED)
+        return files_by_set
+
+    def order_for_keeping(self, files, strategy):
+        """Sort a duplicate set in place so the file to keep comes first."""
+        if strategy == "keep_newest":
+            files.sort(key=lambda x: x['mtime'], reverse=True)
+        elif strategy == "keep_oldest":
+            files.sort(key=lambda x: x['mtime'])
+        elif strategy == "keep_first_found":
+            files.sort(key=lambda x: x['path'])
 
     def auto_delete_logic(self, cancel_event, source_dir, files_by_set, strategy):
         """Worker thread logic for auto-deleting files."""
@@ -1001,12 +4344,7 @@ class FileManagementApp:
                     continue
                 
                 # Determine which file to keep
-                if strategy == "keep_newest":
-                    files.sort(key=lambda x: x['mtime'], reverse=True)
-                elif strategy == "keep_oldest":
-                    files.sort(key=lambda x: x['mtime'])
-                elif strategy == "keep_first_found":
-                    files.sort(key=lambda x: x['path'])
+                self.order_for_keeping(files, strategy)
                 
                 # The first file is kept, the rest are marked for deletion
                 files_to_delete.extend([f['path'] for f in files[1:]])
@@ -1046,6 +4384,94 @@ class FileManagementApp:
             self.logger.exception("Error in auto_delete_logic")
             self.queue.put(("error", f"An error occurred during auto-delete: {e}"))
 
+    def start_link_dedupe(self):
+        """Replace every redundant copy in the duplicate list with a link to the kept file."""
+        strategy = self.delete_strategy_var.get()
+        link_mode = LINK_MODES[self.link_mode_var.get()]
+        dry_run = self.link_dry_run_var.get()
+
+        files_by_set = self.collect_dupe_sets()
+        if not files_by_set:
+            messagebox.showinfo("Nothing to Link", "No duplicates found in the list.")
+            return
+        if not dry_run and not messagebox.askyesno("Confirm Link", f"Replace the redundant copies in {len(files_by_set)} duplicate sets with links to the kept file? Every path stays valid, but linked copies will share their data."):
+            return
+
+        if self.start_task(self.link_dedupe_logic, files_by_set, strategy, link_mode, dry_run):
+            self.update_status("Checking links (dry run)..." if dry_run else "Replacing duplicates with links...")
+            self.auto_delete_button.config(state=tk.DISABLED)
+            self.link_dedupe_button.config(state=tk.DISABLED)
+
+    def link_dedupe_logic(self, cancel_event, source_dir, files_by_set, strategy, link_mode, dry_run):
+        """
+        Worker thread logic for replacing duplicates with hardlinks or reflinks.
+        Each pair is byte-compared again first, so a file that changed since the
+        scan is never replaced.
+        """
+        try:
+            linked_count = 0
+            skipped_count = 0
+            failed_count = 0
+            reclaimed = 0
+            kinds = {}
+            total_sets = len(files_by_set)
+
+            for set_num, files in enumerate(files_by_set.values()):
+                if cancel_event.is_set():
+                    self.queue.put(("cancelled", None))
+                    return
+                if len(files) < 2:
+                    continue
+
+                self.order_for_keeping(files, strategy)
+                keep = files[0]['path']
+                self.queue.put(("status", f"{'Checking' if dry_run else 'Linking'} set {set_num+1}/{total_sets}: {os.path.basename(keep)}"))
+
+                for f in files[1:]:
+                    try:
+                        keep_stat = os.stat(keep)
+                        dupe_stat = os.stat(f['path'])
+                        if (keep_stat.st_dev, keep_stat.st_ino) == (dupe_stat.st_dev, dupe_stat.st_ino):
+                            skipped_count += 1 # Already the same file
+                            continue
+                        if keep_stat.st_dev != dupe_stat.st_dev:
+                            self.logger.warning(f"Cannot link across filesystems: {f['path']}")
+                            skipped_count += 1
+                            continue
+                        identical = compare_files_lockstep([keep, f['path']], cancel_event=cancel_event)
+                        if identical is None:
+                            self.queue.put(("cancelled", None))
+                            return
+                        if not identical[0]:
+                            self.logger.warning(f"Contents differ from the kept file, not linking: {f['path']}")
+                            skipped_count += 1
+                            continue
+
+                        kind = ({'auto': 'reflink or hardlink'}.get(link_mode, link_mode) if dry_run
+                                else self.replace_with_link(keep, f['path'], link_mode))
+                        kinds[kind] = kinds.get(kind, 0) + 1
+                        linked_count += 1
+                        if dupe_stat.st_nlink == 1: # Its last link, so the space comes back
+                            reclaimed += dupe_stat.st_size
+                    except (IOError, OSError) as e:
+                        self.logger.warning(f"Failed to link {f['path']} to {keep}: {e}")
+                        failed_count += 1
+
+            kinds_msg = ", ".join(f"{count} {kind}" for kind, count in kinds.items())
+            if dry_run:
+                msg = f"Dry run complete. Would link {linked_count} files ({kinds_msg or 'none'}), reclaiming ≈ {self.format_size(reclaimed)}."
+            else:
+                msg = f"Link dedupe complete. Linked {linked_count} files ({kinds_msg or 'none'}), reclaimed ≈ {self.format_size(reclaimed)}."
+            if skipped_count:
+                msg += f" Skipped {skipped_count} (already linked, other filesystem or changed)."
+            if failed_count:
+                msg += f" Failed to link {failed_count} files (see console)."
+            self.queue.put(("dupe_action_done", (msg, 0)))
+
+        except Exception as e:
+            self.logger.exception("Error in link_dedupe_logic")
+            self.queue.put(("error", f"An error occurred during link dedupe: {e}"))
+
     def start_delete_empty_folders(self):
         """Start the task to find and delete empty subfolders."""
         if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to find and delete all empty subfolders in '{self.source_dir_var.get()}'? This will use the Recycle Bin if possible."):
@@ -1061,8 +4487,8 @@ class FileManagementApp:
             deleted_folders = 0
             deleted_files = 0
             
-            # Walk from the bottom up
-            for root, dirs, files in os.walk(source_dir, topdown=False):
+            # Walk from the bottom up, never entering excluded folders
+            for root, dirs, files in scan_tree(source_dir, topdown=False, rules=self.walk_rules("dupe", source_dir)):
                 if cancel_event.is_set():
                     self.queue.put(("cancelled", None))
                     return
@@ -1075,7 +4501,11 @@ class FileManagementApp:
                 is_empty = True
                 junk_in_folder = []
                 
+                if any(entry.name.lower() not in JUNK_FILES for entry in files):
+                    continue # Holds a real file; no need to list it again
+                
                 try:
+                    # List again: subfolders may have been deleted just now
                     for filename in os.listdir(root):
                         if filename.lower() in JUNK_FILES:
                             junk_in_folder.append(os.path.join(root, filename))
@@ -1117,6 +4547,51 @@ class FileManagementApp:
             self.logger.exception("Error in delete_empty_folders_logic")
             self.queue.put(("error", f"An error occurred during empty folder deletion: {e}"))
 
+    # --- ============================= ---
+    # --- Catalog Methods ---
+    # --- ============================= ---
+
+    def start_catalog_refresh(self):
+        """Walk the source folder and rebuild its catalog."""
+        if self.start_task(self.catalog_build_logic):
+            self.update_status("Building catalog...")
+
+    def catalog_build_logic(self, cancel_event, source_dir):
+        """Worker thread logic for (re)building the catalog of source_dir."""
+        try:
+            skipped = [0] # Names SQLite can't store (undecodable bytes)
+
+            def list_catalog_dir(path):
+                # Runs on the walker threads
+                dirs, dir_mtime, rows, skipped_names = catalog_listing(path)
+                return dirs, (dir_mtime, rows, skipped_names)
+
+            def walk():
+                file_count = 0
+                last_report = 0.0
+                for root, dirs, (dir_mtime, rows, skipped_names) in parallel_scan_tree(os.path.abspath(source_dir), self.walk_workers, lister=list_catalog_dir, cancel_event=cancel_event):
+                    file_count += len(rows)
+                    skipped[0] += skipped_names
+                    now = time.monotonic()
+                    if now - last_report >= HASH_PROGRESS_INTERVAL_S:
+                        last_report = now
+                        self.queue.put(("status", f"Cataloguing: {file_count} files so far ({root})"))
+                    yield root, dir_mtime, rows
+
+            file_count = self.catalog.build(source_dir, walk(), cancel_event)
+            if file_count is None:
+                self.queue.put(("cancelled", None))
+                return
+            self.queue.put(("catalog_updated", None))
+            msg = f"Catalog complete. {file_count} files catalogued."
+            if skipped[0]:
+                msg += f" Skipped {skipped[0]} files or folders with undecodable names."
+            self.queue.put(("done", msg))
+
+        except Exception as e:
+            self.logger.exception("Error in catalog_build_logic")
+            self.queue.put(("error", f"An error occurred while building the catalog: {e}"))
+
     # --- ============================= ---
     # --- File Sorter Methods ---
     # --- ============================= ---
@@ -1143,25 +4618,23 @@ class FileManagementApp:
             # Define output folder names to avoid scanning them
             date_output_dir = os.path.join(source_dir, "Sorted by Date")
             ext_output_dir = os.path.join(source_dir, "Sorted by Extension")
+            # Our own output folders are excluded like any other rule, so they're never listed
+            rules = self.walk_rules("sorter", source_dir, extra_patterns=("/Sorted by Date/", "/Sorted by Extension/"))
             
-            for root, dirs, files in os.walk(source_dir):
+            for root, dirs, files in scan_tree(source_dir, rules=rules):
                 if cancel_event.is_set():
                     self.queue.put(("cancelled", None))
                     return
-
-                # --- Skip our own output directories ---
-                if root.startswith(date_output_dir) or root.startswith(ext_output_dir):
-                    dirs[:] = [] # Don't recurse into these
-                    continue
                 
                 # Batch results for UI
                 results_batch = []
                 
-                for file in files:
-                    file_path = os.path.join(root, file)
+                for entry in files:
+                    file = entry.name
+                    file_path = entry.path
                     try:
                         if strategy == "By Date (e.g., .../2023/12/file.jpg)":
-                            stat = os.stat(file_path)
+                            stat = entry.stat()
                             mtime = datetime.fromtimestamp(stat.st_mtime)
                             year = mtime.strftime("%Y")
                             month = mtime.strftime("%m (%B)")
@@ -1201,14 +4674,14 @@ class FileManagementApp:
 
     def start_sorter_process(self):
         """Start the file sorting (move/copy) process."""
-        if not self.sorter_tree.get_children():
+        if not len(self.sorter_tree.store):
             messagebox.showinfo("Nothing to Process", "No files found in the preview list.")
             return
 
         is_copy = self.sorter_copy_var.get()
         action_verb = "copy" if is_copy else "move"
         
-        if not messagebox.askyesno("Confirm Action", f"Are you sure you want to {action_verb} all {len(self.sorter_tree.get_children())} files?"):
+        if not messagebox.askyesno("Confirm Action", f"Are you sure you want to {action_verb} all {len(self.sorter_tree.store)} files?"):
             return
         
         # Get all data from the tree
@@ -1308,12 +4781,14 @@ class FileManagementApp:
             results_batch = []
             count = 0
             
-            for root, dirs, files in os.walk(source_dir):
+            rules = self.walk_rules("collector", source_dir)
+            for root, dirs, files in parallel_scan_tree(source_dir, self.walk_workers, cancel_event=cancel_event, rules=rules):
                 if cancel_event.is_set():
                     self.queue.put(("cancelled", None))
                     return
 
-                for file in files:
+                for entry in files:
+                    file = entry.name
                     try:
                         ext = os.path.splitext(file)[1].lower()
                         if ext in extensions:
@@ -1339,7 +4814,7 @@ class FileManagementApp:
     
     def start_collector_process(self):
         """Start the file collector (move/copy) process."""
-        if not self.collector_tree.get_children():
+        if not len(self.collector_tree.store):
             messagebox.showinfo("Nothing to Process", "No files found in the preview list.")
             return
             
@@ -1355,7 +4830,7 @@ class FileManagementApp:
         is_copy = self.collector_copy_var.get()
         action_verb = "copy" if is_copy else "move"
         
-        if not messagebox.askyesno("Confirm Action", f"Are you sure you want to {action_verb} all {len(self.collector_tree.get_children())} files into '{target_dir}'?"):
+        if not messagebox.askyesno("Confirm Action", f"Are you sure you want to {action_verb} all {len(self.collector_tree.store)} files into '{target_dir}'?"):
             return
         
         # Get all data from the tree
@@ -1461,6 +4936,36 @@ class FileManagementApp:
                     filters['ext'] = extensions
                 else:
                     raise ValueError("Could not parse any valid extensions.")
+
+            if self.finder_name_check_var.get():
+                pattern = self.finder_name_var.get()
+                mode = self.finder_name_mode_var.get()
+                if not pattern:
+                    raise ValueError("Name filter is enabled but no pattern is given.")
+                if mode == "regex":
+                    try:
+                        re.compile(pattern)
+                    except re.error as e:
+                        raise ValueError(f"Invalid regular expression: {e}")
+                filters['name'] = (mode, pattern)
+
+            if self.finder_content_check_var.get():
+                pattern = self.finder_content_var.get()
+                mode = self.finder_content_mode_var.get()
+                if not pattern:
+                    raise ValueError("Content filter is enabled but no text is given.")
+                if mode == "regex":
+                    try:
+                        re.compile(pattern.encode('utf-8'))
+                    except re.error as e:
+                        raise ValueError(f"Invalid regular expression: {e}")
+                filters['content'] = (mode, pattern)
+
+            if self.finder_top_check_var.get():
+                top_k = int(self.finder_top_var.get())
+                if top_k < 1:
+                    raise ValueError("The number of files to show must be at least 1.")
+                filters['top'] = (top_k, self.finder_top_order_var.get())
             
             if not filters:
                 messagebox.showerror("No Filters", "Please enable at least one filter to start the search.")
@@ -1476,71 +4981,142 @@ class FileManagementApp:
             self.update_status(f"Searching for files...")
             
     def find_files_logic(self, cancel_event, source_dir, filters):
-        """Worker thread logic for finding files by metadata filters."""
+        """
+        Worker thread logic for finding files by metadata and content filters.
+        The metadata filters run first; with a content filter, only the files
+        that pass them are read, by a pool of reader threads.
+        """
         try:
             results_batch = []
             count = 0
             
-            for root, dirs, files in os.walk(source_dir):
-                if cancel_event.is_set():
-                    self.queue.put(("cancelled", None))
+            rules = self.walk_rules("finder", source_dir)
+            catalog = self.active_catalog if rules is None else None # The catalog holds every file
+            content_ok = compile_content_filter(filters)
+            index_key = (os.path.abspath(source_dir), json.dumps(self.exclusion_settings("finder"), sort_keys=True))
+            index = self.finder_index
+            if catalog is not None or index is None or index.key != index_key:
+                index = None
+            else:
+                self.queue.put(("status", "Checking whether the last scan is still current..."))
+                if not index.is_current():
+                    index = self.finder_index = None
+
+            def candidates():
+                """Yield (name, folder, size, mtime) for each file passing the metadata filters."""
+                if catalog is not None:
+                    for file, folder, size, mtime_ns in catalog.find(source_dir, filters):
+                        yield file, folder, size, mtime_ns / 1e9
                     return
+                if index is not None:
+                    yield from index.find(filters)
+                    return
+                # Name tests run in the walker threads, which then stat only the files that pass
+                name_ok, stat_ok = compile_finder_filters(filters)
+                # A walk that stats every file is kept for the next queries
+                table = FileTable() if name_ok is None else None
+                dir_mtimes = array.array('q')
+                listed_mtimes = {} if table is not None else None # Taken by the walker threads before each listing
+                for root, dirs, files in parallel_scan_tree(source_dir, self.walk_workers, stat_files=True, cancel_event=cancel_event, rules=rules, file_filter=name_ok, dir_mtimes=listed_mtimes):
+                    mtime_ns = listed_mtimes.pop(root, -1) if listed_mtimes is not None else -1
+                    if table is not None:
+                        if mtime_ns < 0:
+                            table = None # The folder couldn't be stat'd, so changes to it couldn't be seen
+                        else:
+                            dir_mtimes.append(mtime_ns)
+                            dir_id = table.add_dir(root)
+                    for entry in files:
+                        try:
+                            stat = entry.stat()
+                        except (IOError, OSError) as e:
+                            self.logger.warning(f"Could not access file {entry.name}: {e}")
+                            continue
+                        if table is not None:
+                            if len(table) < FINDER_INDEX_MAX_FILES:
+                                table.add(dir_id, entry.name, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, stat.st_nlink)
+                            else:
+                                table = None
+                        if stat_ok is None or stat_ok(stat):
+                            yield entry.name, root, stat.st_size, stat.st_mtime
+                if table is not None and not cancel_event.is_set():
+                    self.finder_index = RangeIndex(index_key, table, dir_mtimes)
+
+            def matches():
+                """Yield the candidates whose contents match, in walk order."""
+                if content_ok is None:
+                    yield from candidates()
+                    return
+                pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.walk_workers)
+                in_flight = collections.deque() # (future, row), oldest first
+                try:
+                    rows = candidates()
+                    while True:
+                        row = next(rows, None)
+                        if row is not None:
+                            in_flight.append((pool.submit(content_ok, os.path.join(row[1], row[0])), row))
+                        # Keep every reader busy, but report in order
+                        while in_flight and (row is None or len(in_flight) >= self.walk_workers * 4 or in_flight[0][0].done()):
+                            future, done_row = in_flight.popleft()
+                            try:
+                                if future.result():
+                                    yield done_row
+                            except (IOError, OSError) as e:
+                                self.logger.warning(f"Could not read file {done_row[0]}: {e}")
+                        if row is None:
+                            return
+                finally:
+                    pool.shutdown(wait=False, cancel_futures=True)
+
+            if catalog is not None:
+                self.queue.put(("status", "Searching the catalog..."))
+            rows = matches()
+            top = None
+            if 'top' in filters:
+                # Only the best k rows are kept, and sent once the search is over
+                top_k, order = filters['top']
+                top = TopK(top_k)
+                for row in rows:
+                    if cancel_event.is_set():
+                        break
+                    _, _, size, mtime = row
+                    top.offer(size if order == "largest" else mtime if order == "newest" else -mtime, row)
+                rows = top.items()
+            for file, folder, size, mtime in rows:
+                if cancel_event.is_set():
+                    break
+                mod_str = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+                results_batch.append((file, folder, self.format_size(size), mod_str))
+                count += 1
+                
+                if len(results_batch) >= 100:
+                    self.queue.put(("finder_results_batch", results_batch))
+                    results_batch = []
 
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        # --- Apply Filters ---
-                        stat = None
-                        
-                        # --- CORRECTED FILTER LOGIC ---
-                        if 'size' in filters:
-                            op, size_bytes = filters['size']
-                            stat = os.stat(file_path)
-                            if op == "greater than":
-                                if not stat.st_size > size_bytes: continue
-                            elif op == "less than":
-                                if not stat.st_size < size_bytes: continue
-                        
-                        if 'date' in filters:
-                            op, timestamp = filters['date']
-                            if not stat: stat = os.stat(file_path)
-                            if op == "before":
-                                if not stat.st_mtime < timestamp: continue
-                            elif op == "after":
-                                if not stat.st_mtime > timestamp: continue
-                        
-                        if 'ext' in filters:
-                            ext = os.path.splitext(file)[1].lower()
-                            if ext not in filters['ext']:
-                                continue
-                        # --- END CORRECTED FILTER LOGIC ---
-                        
-                        # --- If all filters passed ---
-                        if not stat: stat = os.stat(file_path)
-                        
-                        size_str = self.format_size(stat.st_size)
-                        mod_str = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        results_batch.append((file, root, size_str, mod_str))
-                        count += 1
-                        
-                        if len(results_batch) >= 100:
-                            self.queue.put(("finder_results_batch", results_batch))
-                            results_batch = []
-                                
-                    except (IOError, OSError) as e:
-                        self.logger.warning(f"Could not access file {file}: {e}")
-                        continue
+            if cancel_event.is_set():
+                self.queue.put(("cancelled", None))
+                return
                 
             if results_batch: # Send final batch
                 self.queue.put(("finder_results_batch", results_batch))
             
-            self.queue.put(("finder_preview_done", (f"Scan complete. Found {count} matching files.", count)))
+            found = f"Found {top.seen} matching files, showing the top {count}" if top is not None else f"Found {count} matching files"
+            if catalog is not None:
+                self.queue.put(("finder_preview_done", (f"Search complete (from catalog). {found}.", count)))
+            elif index is not None:
+                # Files edited since only drop out; one edited into matching needs a new walk
+                self.queue.put(("finder_preview_done", (f"Search complete (from the last scan; Forget Last Scan to find files edited since). {found}.", count)))
+            else:
+                self.queue.put(("finder_preview_done", (f"Scan complete. {found}.", count)))
             
         except Exception as e:
             self.logger.exception("Error in find_files_logic")
             self.queue.put(("error", f"An error occurred during scan: {e}"))
 
+    def forget_finder_index(self):
+        """Drop the Finder's last scan, so the next search walks the disk again."""
+        self.finder_index = None
+        self.update_status("The next search will scan the disk again.")
+
     def start_finder_action(self, action):
         """Start an action (delete, move, copy) on selected files in the finder."""
         selected_iids = self.finder_tree.selection()
@@ -1634,8 +5210,8 @@ class FileManagementApp:
     # --- Folder Analyzer Methods ---
     # --- ============================= ---
 
-    def start_analyzer_scan(self):
-        """Start the folder size analysis."""
+    def start_analyzer_scan(self, incremental=False):
+        """Start the folder size analysis (or a rescan of changed folders only)."""
         
         # Disable button *before* starting task
         self.analyzer_delete_button.config(state=tk.DISABLED)
@@ -1660,101 +5236,195 @@ class FileManagementApp:
                 op = self.analyzer_items_op_var.get()
                 filters['items'] = (op, items)
 
+            if self.analyzer_top_check_var.get():
+                top_k = int(self.analyzer_top_var.get())
+                if top_k < 1:
+                    raise ValueError("The number of items to show must be at least 1.")
+                filters['top'] = (top_k, self.analyzer_top_order_var.get())
+
         except Exception as e:
             messagebox.showerror("Invalid Filter", f"Error in filter settings: {e}")
             self.toggle_controls(scanning=False)
             return
             
-        if self.start_task(self.analyzer_scan_logic, include_files, filters):
-            self.update_status(f"Scanning folder sizes...")
+        if self.start_task(self.analyzer_scan_logic, include_files, filters, self.analyzer_processes_var.get(), incremental):
+            self.update_status("Rescanning changed folders..." if incremental else "Scanning folder sizes...")
+
+    def start_analyzer_rescan(self):
+        """Re-run the folder size analysis, re-listing only folders that changed."""
+        self.start_analyzer_scan(incremental=True)
             
-    def analyzer_scan_logic(self, cancel_event, source_dir, include_files, filters):
-        """Worker thread logic for scanning folder sizes from the bottom up."""
+    def analyzer_scan_logic(self, cancel_event, source_dir, include_files, filters, use_processes=False, incremental=False):
+        """
+        Worker thread logic for scanning folder sizes from the bottom up.
+        Without filters the sizes are sent as one SizeNode tree, which the UI
+        expands on demand; with filters, the matching items are sent as a list.
+
+        Every scan saves the folder sizes; in incremental mode the folders
+        whose mtime hasn't changed since are taken from there without being
+        listed. Files that grow or shrink in place don't change their folder's
+        mtime, so run a full scan to pick those up.
+        """
         try:
-            folder_data = {} # Stores {'size': s, 'items': i} for each path
+            tree_view = not filters
             results_batch = []
             total_items_found = 0
 
             # --- Filter Check Helper ---
             def check_filters(item_size, item_count, is_file=False):
-                # --- CORRECTED FILTER LOGIC ---
-                if 'size' in filters:
-                    op, size_bytes = filters['size']
-                    if op == "greater than":
-                        if not item_size > size_bytes: return False
-                    elif op == "less than":
-                        if not item_size < size_bytes: return False
-                
-                if not is_file and 'items' in filters:
-                    op, count = filters['items']
-                    if op == "greater than":
-                        if not item_count > count: return False
-                    elif op == "less than":
-                        if not item_count < count: return False
-                
-                return True # All checks passed
-                # --- END CORRECTED FILTER LOGIC ---
+                return check_size_filters(filters, item_size, item_count, is_file)
             # ---------------------------
 
-            for root, dirs, files in os.walk(source_dir, topdown=False):
-                if cancel_event.is_set():
-                    self.queue.put(("cancelled", None))
+            top = None
+            if 'top' in filters:
+                # Only the best k rows are kept, and sent once the scan is over
+                top_k, order = filters['top']
+                top = TopK(top_k)
+
+            def add_result(name, parent, size, items):
+                """Queue one matching row, or offer it to the top-k heap."""
+                nonlocal total_items_found
+                total_items_found += 1
+                if top is None:
+                    results_batch.append((name, parent, self.format_size(size), items))
+                else:
+                    top.offer(analyzer_rank(order, size, items), (name, parent, size, items))
+
+            def finish(message, root_node=None):
+                """Send the size tree or the held-back top-k rows (if any), and the done message."""
+                shown = total_items_found
+                if tree_view:
+                    root_node = root_node or SizeNode(source_dir, 0, 0, [])
+                    self.queue.put(("analyzer_size_tree", root_node))
+                    shown = len(root_node.children)
+                    message += f" {self.format_size(root_node.size)} in {root_node.items} items."
+                elif top is not None:
+                    rows = [(name, parent, self.format_size(size), items) for name, parent, size, items in top.items()]
+                    for i in range(0, len(rows), 100):
+                        self.queue.put(("analyzer_results_batch", rows[i:i + 100]))
+                    shown = len(rows)
+                    message += f" Found {total_items_found} matching items, showing the top {shown}."
+                else:
+                    message += f" Found {total_items_found} matching items."
+                self.queue.put(("analyzer_scan_done", (message, shown)))
+
+            rules = self.walk_rules("analyzer", source_dir)
+            catalog = self.active_catalog if rules is None else None # The catalog holds every file
+            if catalog is not None:
+                self.queue.put(("status", "Reading folder sizes from the catalog..."))
+                if tree_view:
+                    nodes = {}
+                    for path, size, items in catalog.folder_totals(source_dir):
+                        nodes[path] = SizeNode(path, size, items, [])
+                    if cancel_event.is_set():
+                        self.queue.put(("cancelled", None))
+                        return
+                    for path, node in nodes.items():
+                        parent = nodes.get(os.path.dirname(path))
+                        if parent is not None and parent is not node:
+                            parent.children.append(node)
+                    if include_files:
+                        for f, folder, size, _ in catalog.find(source_dir, {}):
+                            nodes[folder].children.append(SizeNode(os.path.join(folder, f), size, 1))
+                    for node in nodes.values():
+                        node.sort_children()
+                    finish("Scan complete (from catalog).", nodes.get(os.path.abspath(source_dir)))
                     return
+                if include_files:
+                    file_filters = {'size': filters['size']} if 'size' in filters else {}
+                    for f, folder, size, _ in catalog.find(source_dir, file_filters):
+                        # Send "File" as the item count
+                        add_result(f, folder, size, "File")
+                catalog_root = os.path.abspath(source_dir)
+                for path, size, items in catalog.folder_totals(source_dir):
+                    if cancel_event.is_set():
+                        self.queue.put(("cancelled", None))
+                        return
+                    if path != catalog_root and check_filters(size, items, is_file=False):
+                        add_result(os.path.basename(path), os.path.dirname(path), size, items)
+                for i in range(0, len(results_batch), 100):
+                    self.queue.put(("analyzer_results_batch", results_batch[i:i + 100]))
+                finish("Scan complete (from catalog).")
+                return
 
-                self.queue.put(("status", f"Scanning: {root}"))
-                
-                file_size_total = 0
-                file_count = 0
-                
-                # Process files in the current directory
-                for f in files:
-                    file_path = os.path.join(root, f)
-                    try:
-                        size = os.path.getsize(file_path)
-                        file_size_total += size
-                        file_count += 1
-                        
-                        if include_files:
-                            if check_filters(size, 1, is_file=True):
-                                # Send "File" as the item count
-                                results_batch.append((f, root, self.format_size(size), "File"))
-                                total_items_found += 1
-                                
-                    except (IOError, OSError):
-                        continue # Skip inaccessible files
-                
-                # Get size and items from subdirectories (already processed)
-                subdir_size = sum(folder_data.get(os.path.join(root, d), {'size': 0})['size'] for d in dirs)
-                subdir_items = sum(folder_data.get(os.path.join(root, d), {'items': 0})['items'] for d in dirs)
-                
-                my_size = file_size_total + subdir_size
-                my_items = file_count + subdir_items
-                my_name = os.path.basename(root)
-                my_parent = os.path.dirname(root)
-
-                # Store this folder's data for its parent
-                folder_data[root] = {'size': my_size, 'items': my_items}
-                
-                # Add this folder to the results
-                # Don't add the root source_dir itself, only its children
-                if root != source_dir:
-                    if check_filters(my_size, my_items, is_file=False):
-                        results_batch.append((my_name, my_parent, self.format_size(my_size), my_items))
-                        total_items_found += 1
-
-                if len(results_batch) >= 100:
-                    self.queue.put(("analyzer_results_batch", results_batch))
-                    results_batch = []
+            def on_rows(rows, matched, done, total):
+                nonlocal total_items_found
+                self.queue.put(("status", f"Sized {done} of {total} subfolders..."))
+                total_items_found += matched - len(rows) # Rows a subtree's own top-k dropped
+                for row in rows:
+                    add_result(*row)
+                while len(results_batch) >= 100:
+                    self.queue.put(("analyzer_results_batch", results_batch[:100]))
+                    del results_batch[:100]
+
+            # Independent subtrees are sized at once, by threads or worker processes,
+            # and a rescan reuses the folders that haven't changed since the last scan
+            rules_key = json.dumps(self.exclusion_settings("analyzer"), sort_keys=True)
+            cached = None
+            if incremental and self.folder_sizes is not None:
+                try:
+                    cached = self.folder_sizes.load(source_dir, rules_key)
+                except sqlite3.Error as e:
+                    self.logger.warning(f"Could not load saved folder sizes: {e}")
+            root_node, folders, reused = analyze_tree(source_dir, include_files, filters, rules, self.walk_workers, use_processes, cancel_event, on_rows, cached)
+            if cancel_event.is_set():
+                self.queue.put(("cancelled", None))
+                return
+            if self.folder_sizes is not None:
+                try:
+                    self.folder_sizes.save(source_dir, rules_key, folders)
+                except sqlite3.Error as e:
+                    self.logger.warning(f"Could not save folder sizes: {e}")
             
             if results_batch: # Send final batch
                 self.queue.put(("analyzer_results_batch", results_batch))
             
-            self.queue.put(("analyzer_scan_done", (f"Scan complete. Found {total_items_found} matching items.", total_items_found)))
+            if incremental and cached is None:
+                finish("Rescan complete: there was no earlier scan to reuse, so every folder was listed.", root_node)
+            elif incremental:
+                finish(f"Rescan complete: {reused} of {len(folders)} folders unchanged, their sizes taken from the last scan.", root_node)
+            else:
+                finish("Scan complete.", root_node)
             
         except Exception as e:
             self.logger.exception("Error in analyzer_scan_logic")
             self.queue.put(("error", f"An error occurred during folder scan: {e}"))
 
+    def analyzer_row(self, node):
+        """Return the (Name, Path, Size, Items) of a SizeNode's row."""
+        items = "File" if node.children is None else node.items
+        return (os.path.basename(node.path), os.path.dirname(node.path), self.format_size(node.size), items)
+
+    def update_analyzer_ancestors(self, iids):
+        """
+        Take deleted tree rows off the totals of the folders shown above them,
+        deepest rows first, so a folder deleted along with its parent isn't
+        subtracted twice.
+        """
+        tree = self.analyzer_tree
+
+        def depth(iid):
+            count = 0
+            while iid:
+                iid = tree.parent(iid)
+                count += 1
+            return count
+
+        live = [iid for iid in iids if tree.exists(iid) and tree.data(iid) is not None]
+        for iid in sorted(live, key=depth, reverse=True):
+            node = tree.data(iid)
+            items = 1 if node.children is None else node.items
+            parent = tree.parent(iid)
+            if parent is not None and node in tree.data(parent).children:
+                tree.data(parent).children.remove(node)
+            while parent is not None:
+                ancestor = tree.data(parent)
+                ancestor.size -= node.size
+                ancestor.items -= items
+                tree.set(parent, "Size", self.format_size(ancestor.size))
+                tree.set(parent, "Items", ancestor.items)
+                parent = tree.parent(parent)
+
     def start_analyzer_delete(self):
         """Start the delete process for selected items in the analyzer."""
         selected_iids = self.analyzer_tree.selection()
@@ -1771,46 +5441,69 @@ class FileManagementApp:
             values = self.analyzer_tree.item(iid, 'values')
             name, path, _, _ = values
             full_path = os.path.join(path, name)
-            plan.append(full_path)
+            plan.append((full_path, iid))
         
         # --- CRITICAL: Sort by path length, deepest first ---
         # This ensures we delete 'C:/A/B/file.txt' before 'C:/A/B'
-        plan.sort(key=len, reverse=True)
+        plan.sort(key=lambda item: len(item[0]), reverse=True)
 
-        if self.start_task(self.analyzer_delete_logic, plan, selected_iids):
+        if self.start_task(self.analyzer_delete_logic, plan):
             self.update_status(f"Deleting {len(plan)} items...")
             # Disable action button during processing
             self.analyzer_delete_button.config(state=tk.DISABLED)
 
-    def analyzer_delete_logic(self, cancel_event, source_dir, plan, iids_to_remove):
-        """Worker thread logic for deleting items from the analyzer list."""
+    def analyzer_delete_logic(self, cancel_event, source_dir, plan):
+        """
+        Worker thread logic for deleting items from the analyzer list. plan
+        holds (path, row id) pairs. Only the rows whose path is gone afterwards
+        are removed and taken off the folder totals, so a failed or partial
+        delete (or a cancel) leaves the rest as they were.
+        """
         try:
             processed_count = 0
             failed_count = 0
+            deleted = [] # (path, file size or None, parent mtime before, after)
             total_count = len(plan)
             
-            for i, path in enumerate(plan):
+            for i, (path, _) in enumerate(plan):
                 if cancel_event.is_set():
-                    self.queue.put(("cancelled", None))
-                    return
+                    break
                 
                 self.queue.put(("status", f"Deleting {i+1}/{total_count}: {os.path.basename(path)}"))
                 
                 try:
-                    if not os.path.exists(path):
+                    if not os.path.lexists(path):
                         continue # Already deleted, perhaps as part of a parent
+
+                    # Note what goes, so the saved folder sizes can be updated without a rescan
+                    is_folder = os.path.isdir(path) and not os.path.islink(path)
+                    file_size = None if is_folder else os.lstat(path).st_size
+                    parent = os.path.dirname(path)
+                    mtime_before = os.stat(parent).st_mtime_ns
                         
                     if not self.safe_delete(path):
                         raise IOError(f"safe_delete failed for {path}")
                     
                     processed_count += 1
+                    deleted.append((path, file_size, mtime_before, os.stat(parent).st_mtime_ns))
                 
                 except (IOError, OSError, shutil.Error) as e:
                     self.logger.warning(f"Failed to delete {path}: {e}")
                     failed_count += 1
+
+            if deleted and self.folder_sizes is not None:
+                try:
+                    self.folder_sizes.apply_deletes(source_dir, json.dumps(self.exclusion_settings("analyzer"), sort_keys=True), deleted)
+                except sqlite3.Error as e:
+                    self.logger.warning(f"Could not update saved folder sizes: {e}")
             
-            # Send UI update to remove processed items
+            # Send UI update to take the deleted sizes off the folders above, then remove the items
+            iids_to_remove = [iid for path, iid in plan if not os.path.lexists(path)]
+            self.queue.put(("analyzer_items_deleted", iids_to_remove))
             self.queue.put(("remove_finder_items", iids_to_remove))
+            if cancel_event.is_set():
+                self.queue.put(("cancelled", None))
+                return
             
             msg = f"Delete complete. {processed_count} items deleted."
             if failed_count > 0:
@@ -1863,6 +5556,7 @@ class FileManagementApp:
         if self.start_task(self.generic_delete_logic, paths_to_delete, selected_iids):
             self.update_status(f"Deleting {len(paths_to_delete)} files...")
             self.auto_delete_button.config(state=tk.DISABLED) # Disable main button
+            self.link_dedupe_button.config(state=tk.DISABLED)
 
     def generic_delete_logic(self, cancel_event, source_dir, paths, iids_to_remove):
         """Used by dupe_delete_selected for a simple delete task."""
@@ -1949,13 +5643,66 @@ class FileManagementApp:
     # --- Core & Utility Methods ---
     # --- ============================= ---
 
-    def hash_file(self, path, block_size=65536):
-        """Return the SHA-256 hash of a file."""
-        sha256 = hashlib.sha256()
+    def hash_file(self, path, block_size=HASH_BLOCK_SIZE, cancel_event=None, algorithm=DEFAULT_HASH_ALGORITHM, use_mmap=False, drop_cache=False):
+        """Return the hash of a file, or None if cancelled part-way."""
+        return digest_file(path, algorithm, block_size, cancel_event, use_mmap, drop_cache)
+
+    def sample_hash_file(self, path, size, sample_size=SAMPLE_HASH_BYTES, algorithm=DEFAULT_HASH_ALGORITHM, cancel_event=None):
+        """Return the hash of the first and last sample_size bytes of a file."""
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        hasher = HASH_ALGORITHMS[algorithm]()
         with open(path, 'rb') as f:
-            for block in iter(lambda: f.read(block_size), b''):
-                sha256.update(block)
-        return sha256.hexdigest()
+            hasher.update(f.read(sample_size))
+            f.seek(max(0, size - sample_size))
+            hasher.update(f.read(sample_size))
+        return hasher.hexdigest()
+
+    def cached_hash_file(self, path, hash_cache=None, rebuild_cache=False, algorithm=DEFAULT_HASH_ALGORITHM, cancel_event=None, io_options=None, recorded=None):
+        """
+        Return (hash, from_cache) for a file, reusing the persistent cache when the
+        file's device, inode, size and mtime are unchanged since it was last hashed.
+        recorded is the file's stat from the scan (a FileStat), used for the
+        lookup so a hit costs no syscall; the file is stat'd again only when it
+        has to be hashed, and stored under that stat.
+        """
+        io_options = io_options or {}
+        if hash_cache is None:
+            return self.hash_file(path, cancel_event=cancel_event, algorithm=algorithm, **io_options), False
+
+        stat = recorded if recorded is not None else os.stat(path)
+        try:
+            if rebuild_cache:
+                file_hash = None
+                hash_cache.record_miss()
+            else:
+                file_hash = hash_cache.lookup(stat, algorithm)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Hash cache lookup failed for {path}: {e}")
+            file_hash = None
+        if file_hash is not None:
+            return file_hash, True
+
+        if recorded is not None:
+            stat = os.stat(path) # It may have changed since the scan
+        file_hash = self.hash_file(path, cancel_event=cancel_event, algorithm=algorithm, **io_options)
+        if file_hash is None: # Cancelled
+            return None, False
+        try:
+            hash_cache.store(stat, file_hash, algorithm)
+        except sqlite3.Error as e:
+            self.logger.warning(f"Hash cache store failed for {path}: {e}")
+        return file_hash, False
+
+    def format_age(self, seconds):
+        """Convert a duration in seconds to a short string (e.g., '5 min')."""
+        if seconds < 60:
+            return "< 1 min"
+        if seconds < 3600:
+            return f"{int(seconds // 60)} min"
+        if seconds < 86400:
+            return f"{int(seconds // 3600)} h"
+        return f"{int(seconds // 86400)} days"
 
     def format_size(self, size_bytes):
         """Convert bytes to a human-readable string (KB, MB, GB)."""
@@ -1968,74 +5715,17 @@ class FileManagementApp:
         else:
             return f"{size_bytes/1024**3:.2f} GB"
 
-    def sort_treeview(self, tree, col, reverse):
+    def sort_treeview(self, tree, col, reverse, heading=None):
         """
-        Sort a treeview column when the header is clicked.
-        This now correctly handles file sizes.
+        Sort a result list by a column when the header is clicked. Sizes and
+        counts sort by value (see result_sort_key), and rows under expanded
+        rows are sorted within their parent. heading is the column whose
+        header was clicked, when it isn't col itself.
         """
-        try:
-            data_list = [(tree.set(k, col), k) for k in tree.get_children('')]
-        except tk.TclError:
-            return # Handle edge case where tree is modified during sort
-
-        # --- CORRECTED LOGIC ---
-        if col == "Size":
-            # Special handling for 'Size' column
-            def convert_size_to_bytes(size_str):
-                try:
-                    parts = str(size_str).split(" ")
-                    if len(parts) != 2:
-                        return 0
-                    
-                    val_str, unit = parts
-                    val = float(val_str)
-                    
-                    if unit == "KB":
-                        return val * 1024
-                    elif unit == "MB":
-                        return val * 1024**2
-                    elif unit == "GB":
-                        return val * 1024**3
-                    elif unit == "B":
-                        return val
-                    else:
-                        return 0
-                except (ValueError, TypeError, AttributeError):
-                    return 0 # Fallback for invalid format
-            
-            # Sort by the converted byte value
-            data_list.sort(key=lambda x: convert_size_to_bytes(x[0]), reverse=reverse)
-            
-        elif col in ("Set #", "Items"):
-            # Try numeric sort for 'Set #' and 'Items'
-            def extract_num(val_tuple):
-                val_str = str(val_tuple[0])
-                if val_str.lower() == 'file': 
-                    return -1 # Treat "File" as -1 in 'Items' col
-                
-                try:
-                    # First, try to convert the whole string (e.g., "500")
-                    return float(val_str.replace(',', ''))
-                except (ValueError, TypeError, AttributeError):
-                    try:
-                        # Fallback: get the *second* part (e.g., "Set 1" -> "1")
-                        s_num = val_str.split(" ")[1].replace(',', '')
-                        return float(s_num)
-                    except (ValueError, TypeError, AttributeError, IndexError):
-                         return 0 # Fallback for non-numeric
-            
-            data_list.sort(key=extract_num, reverse=reverse)
-        
-        else:
-            # Default string sort for all other columns (File, Path, Modified, etc.)
-            data_list.sort(key=lambda x: str(x[0]).lower(), reverse=reverse)
-        # --- END OF CORRECTED LOGIC ---
-
-        for index, (val, k) in enumerate(data_list):
-            tree.move(k, '', index)
+        tree.sort(col, reverse, key=result_sort_key(col))
 
         # Reverse sort direction for next click
-        tree.heading(col, command=lambda: self.sort_treeview(tree, col, not reverse))
+        tree.heading(heading or col, command=lambda: self.sort_treeview(tree, col, not reverse, heading))
 
     def safe_delete(self, path):
         """
@@ -2058,6 +5748,33 @@ class FileManagementApp:
             self.logger.error(f"Error deleting '{path}': {e}")
             return False
     
+    def replace_with_link(self, source, target, link_mode="hardlink"):
+        """
+        Atomically replace target with a hardlink or reflink to source. The link
+        is made under a temporary name in target's folder and renamed over
+        target, so target always exists. Returns the kind of link made.
+        """
+        temp_path = os.path.join(os.path.dirname(target), f".{os.path.basename(target)}.{os.getpid()}.{threading.get_ident()}.linktmp")
+        try:
+            kind = None
+            if link_mode in ("reflink", "auto"):
+                try:
+                    reflink_file(source, temp_path)
+                    shutil.copystat(target, temp_path) # A clone is its own file: keep the copy's metadata
+                    kind = "reflink"
+                except OSError:
+                    if link_mode == "reflink":
+                        raise
+            if kind is None:
+                os.link(source, temp_path)
+                kind = "hardlink"
+            os.replace(temp_path, target)
+            return kind
+        except OSError:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            raise
+
     def get_unique_filename(self, path):
         """Finds a unique filename by appending (1), (2), etc. if the path exists."""
         if not os.path.exists(path):
@@ -2084,8 +5801,13 @@ class FileManagementApp:
             self.logger.warning(f"Failed to open path {path}: {e}")
             messagebox.showwarning("Open Failed", f"Could not open path: {e}")
 
-    def export_csv_report(self, final_dupe_sets, source_dir):
-        """Export the duplicate file list to a CSV file."""
+    def export_csv_report(self, final_dupe_sets, source_dir, algorithm=None, records=None):
+        """
+        Export the duplicate file list to a CSV file. algorithm is None for
+        mod-time matching. records maps paths to the scan's (size, mtime_ns)
+        so files don't need to be stat'd again.
+        """
+        records = records or {}
         try:
             timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
             filename = f"Duplicate_Report_{timestamp}.csv"
@@ -2093,17 +5815,22 @@ class FileManagementApp:
             
             with open(report_path, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow(["Set #", "File Path", "Size (Bytes)", "Modification Time"])
+                writer.writerow(["Set #", "File Path", "Size (Bytes)", "Modification Time", "Hash Algorithm"])
+                match_method = algorithm or "None (size + modification time)"
                 
                 for i, dupe_set in enumerate(final_dupe_sets):
                     set_id = f"Set {i+1}"
                     for path in dupe_set:
                         try:
-                            stat = os.stat(path)
-                            mod_time_str = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-                            writer.writerow([set_id, path, stat.st_size, mod_time_str])
+                            if path in records:
+                                size, mtime_ns = records[path][:2]
+                            else:
+                                stat = os.stat(path)
+                                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+                            mod_time_str = datetime.fromtimestamp(mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+                            writer.writerow([set_id, path, size, mod_time_str, match_method])
                         except (IOError, OSError):
-                            writer.writerow([set_id, path, "N/A", "N/A (File may be inaccessible)"])
+                            writer.writerow([set_id, path, "N/A", "N/A (File may be inaccessible)", match_method])
             
             self.queue.put(("status", f"Successfully exported report to {report_path}"))
         except Exception as e:
@@ -2115,13 +5842,31 @@ class FileManagementApp:
         if self.current_task:
             if messagebox.askyesno("Task in Progress", "A task is still running. Are you sure you want to quit?"):
                 self.cancel_task()
+                self.stop_catalog_watch()
                 self.root.destroy()
         else:
+            self.stop_catalog_watch()
             self.root.destroy()
 
 # --- Main execution ---
 if __name__ == "__main__":
+    # Spawned Analyzer workers of a frozen (PyInstaller) build re-run this
+    # executable; this hands them to multiprocessing instead of opening the app
+    multiprocessing.freeze_support()
     
+    # Command-line micro-benchmark: python FileManager.py --benchmark-hash
+    if "--benchmark-hash" in sys.argv:
+        run_hash_benchmark()
+        sys.exit(0)
+    if "--benchmark-table" in sys.argv:
+        run_table_benchmark()
+        sys.exit(0)
+    if "--benchmark-analyzer" in sys.argv:
+        # Optionally followed by the folder to size
+        args = sys.argv[sys.argv.index("--benchmark-analyzer") + 1:]
+        run_analyzer_benchmark(args[0] if args else None)
+        sys.exit(0)
+
     # Configure logging
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     
@@ -2137,6 +5882,14 @@ if __name__ == "__main__":
     # Now that logger is available, log the icon error if it happened
     if hasattr(app, 'initial_icon_error'):
         app.logger.warning(f"Could not load application icon: {app.initial_icon_error}")
+    if hasattr(app, 'initial_cache_error'):
+        app.logger.warning(f"Hash cache disabled, could not create cache folder: {app.initial_cache_error}")
+    if hasattr(app, 'initial_snapshot_error'):
+        app.logger.warning(f"Incremental duplicate rescans disabled, could not create cache folder: {app.initial_snapshot_error}")
+    if hasattr(app, 'initial_folder_size_error'):
+        app.logger.warning(f"Incremental Analyzer rescans disabled, could not create cache folder: {app.initial_folder_size_error}")
+    if hasattr(app, 'initial_catalog_error'):
+        app.logger.warning(f"Filesystem catalog disabled, could not create cache folder: {app.initial_catalog_error}")
     
     # Store start time on the app object for elapsed time calculation
     app.start_time = datetime.now() 
@@ -0,0 +1,206 @@
+import os
+
+import pytest
+
+import FileManager as fm
+
+
+def catalog_walk(top):
+    """The catalog build's walk: (folder, folder mtime_ns, file rows), top-down."""
+    def lister(path):
+        dirs, dir_mtime, rows, _ = fm.catalog_listing(path)
+        return dirs, (dir_mtime, rows)
+    for root, _, (dir_mtime, rows) in fm.parallel_scan_tree(top, 2, lister=lister):
+        yield root, dir_mtime, rows
+
+
+def make_tree(root):
+    files = {
+        "a.txt": 100, "b.jpg": 100, "c.jpg": 250, "empty1": 0, "empty2": 0,
+        "sub/d.JPG": 250, "sub/e.txt": 7, "sub/deeper/f.txt": 100, "other/g.png": 9000,
+    }
+    for name, size in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+    return {str(root / name): size for name, size in files.items()}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    tree = tmp_path / "tree"
+    files = make_tree(tree)
+    catalog = fm.FileCatalog(str(tmp_path / "catalog.db"))
+    assert catalog.build(str(tree), catalog_walk(str(tree))) == len(files)
+    return catalog, str(tree), files
+
+
+def test_build_records_every_file(catalog):
+    catalog, tree, files = catalog
+    updated_at, file_count = catalog.info(tree)
+    assert file_count == len(files)
+    found = {os.path.join(folder, name): size for name, folder, size, _ in catalog.find(tree, {})}
+    assert found == files
+    assert set(catalog.dir_mtimes(tree)) == {root for root, _, _ in os.walk(tree)}
+
+
+def test_find_filters_match_a_linear_filter(catalog):
+    catalog, tree, files = catalog
+    for filters in ({'size': ("greater than", 100)}, {'size': ("less than", 100)}, {'ext': [".jpg"]},
+                    {'ext': [".txt"], 'size': ("greater than", 50)}, {'name': ("wildcard", "?.txt")},
+                    {'date': ("after", 0)}, {'date': ("before", 0)}):
+        name_ok, stat_ok = fm.compile_finder_filters(filters)
+        expected = {path for path in files
+                    if (name_ok is None or name_ok(os.path.basename(path))) and (stat_ok is None or stat_ok(os.stat(path)))}
+        assert {os.path.join(folder, name) for name, folder, _, _ in catalog.find(tree, filters)} == expected, filters
+
+
+def test_load_table_holds_only_shared_sizes(catalog):
+    catalog, tree, files = catalog
+    table, singles, singles_bytes = catalog.load_table(tree)
+    assert {path: record[0] for path, record in table.items()} == {path: size for path, size in files.items() if size in (100, 250)}
+    assert (singles, singles_bytes) == (2, 7 + 9000) # Empty files are never candidates
+
+
+def test_folder_totals_include_subfolders(catalog):
+    catalog, tree, files = catalog
+    totals = {path: (size, items) for path, size, items in catalog.folder_totals(tree)}
+    assert totals[tree] == (sum(files.values()), len(files))
+    assert totals[os.path.join(tree, "sub")] == (250 + 7 + 100, 3)
+
+
+def test_a_missing_catalog_gives_nothing(tmp_path):
+    catalog = fm.FileCatalog(str(tmp_path / "catalog.db"))
+    assert catalog.info(str(tmp_path)) is None
+    assert catalog.load_table(str(tmp_path)) is None
+    assert list(catalog.find(str(tmp_path), {})) == []
+    assert catalog.folder_totals(str(tmp_path)) == []
+
+
+def test_a_cancelled_build_keeps_the_old_catalog(catalog):
+    catalog, tree, files = catalog
+    cancel = fm.threading.Event()
+    cancel.set()
+    assert catalog.build(tree, catalog_walk(tree), cancel) is None
+    assert catalog.info(tree)[1] == len(files)
+
+
+def test_a_new_schema_version_drops_old_catalogs(catalog, monkeypatch):
+    catalog, tree, files = catalog
+    monkeypatch.setattr(fm, "CATALOG_SCHEMA_VERSION", fm.CATALOG_SCHEMA_VERSION + 1)
+    assert catalog.info(tree) is None
+    assert catalog.load_table(tree) is None
+    assert catalog.build(tree, catalog_walk(tree)) == len(files)
+    assert catalog.info(tree)[1] == len(files)
+
+
+def test_listing_skips_names_sqlite_cannot_store(tmp_path):
+    (tmp_path / "ok.txt").write_bytes(b"x")
+    with open(os.path.join(os.fsencode(tmp_path), b"bad\xff.txt"), "wb"):
+        pass
+    os.mkdir(os.path.join(os.fsencode(tmp_path), b"bad\xff"))
+    dirs, _, rows, skipped = fm.catalog_listing(str(tmp_path))
+    assert dirs == []
+    assert [row[0] for row in rows] == ["ok.txt"]
+    assert skipped == 2
+
+
+def catalogued(catalog, tree):
+    return {os.path.join(folder, name): size for name, folder, size, _ in catalog.find(tree, {})}
+
+
+def row(name, size):
+    return (name, size, 1, 1, 1, 1)
+
+
+def test_file_changes_move_the_count_and_update_time(catalog, monkeypatch):
+    catalog, tree, files = catalog
+    monkeypatch.setattr(fm.time, "time", lambda: 2_000_000_000)
+    sub = os.path.join(tree, "sub")
+    # e.txt grows, new.txt appears and gone.txt was never there (deleted right after creation)
+    assert catalog.apply_changes(tree, [('files', sub, {"e.txt", "new.txt", "gone.txt"}, [row("e.txt", 70), row("new.txt", 5)])]) == []
+    expected = dict(files, **{os.path.join(sub, "e.txt"): 70, os.path.join(sub, "new.txt"): 5})
+    assert catalogued(catalog, tree) == expected
+    assert catalog.info(tree) == (2_000_000_000, len(files) + 1)
+
+    assert catalog.apply_changes(tree, [('files', sub, {"new.txt", "d.JPG"}, [])]) == []
+    assert catalog.info(tree)[1] == len(files) - 1
+    # Folders that aren't catalogued are listed whole later instead
+    assert catalog.apply_changes(tree, [('files', os.path.join(tree, "nowhere"), {"x"}, [row("x", 1)])]) == []
+    assert catalog.info(tree)[1] == len(files) - 1
+
+
+def test_relisted_folders_replace_their_files_and_subfolders(catalog):
+    catalog, tree, files = catalog
+    sub = os.path.join(tree, "sub")
+    new_dir = os.path.join(sub, "new")
+    # sub now holds one file, its "deeper" folder is gone and "new" appeared
+    new_dirs = catalog.apply_changes(tree, [('dir', sub, 12345, [row("only.txt", 3)], [new_dir])])
+    assert new_dirs == [new_dir]
+    assert catalog.dir_mtimes(tree)[sub] == 12345
+    assert os.path.join(sub, "deeper") not in catalog.dir_mtimes(tree)
+    kept = {path: size for path, size in files.items() if not path.startswith(sub + os.sep)}
+    assert catalogued(catalog, tree) == dict(kept, **{os.path.join(sub, "only.txt"): 3})
+
+    # The new folder is listed next, as a child of sub
+    assert catalog.apply_changes(tree, [('dir', new_dir, 1, [row("n.txt", 4)], [])]) == []
+    assert catalogued(catalog, tree)[os.path.join(new_dir, "n.txt")] == 4
+    assert catalog.info(tree)[1] == len(kept) + 2
+    assert dict((path, (size, items)) for path, size, items in catalog.folder_totals(tree))[sub] == (7, 2)
+    # A folder whose parent isn't catalogued is outside the tree
+    assert catalog.apply_changes(tree, [('dir', os.path.join(tree, "x", "y"), 1, [row("z", 1)], [])]) == []
+    assert catalog.info(tree)[1] == len(kept) + 2
+
+
+def test_deleted_subtrees_are_dropped(catalog):
+    catalog, tree, files = catalog
+    sub = os.path.join(tree, "sub")
+    catalog.apply_changes(tree, [('gone', sub)])
+    assert catalogued(catalog, tree) == {path: size for path, size in files.items() if not path.startswith(sub + os.sep)}
+    assert catalog.info(tree)[1] == len(files) - 3
+    assert not any(path.startswith(sub) for path in catalog.dir_mtimes(tree))
+
+
+def fresh_catalog(tmp_path, tree):
+    catalog = fm.FileCatalog(str(tmp_path / "fresh.db"))
+    catalog.build(tree, catalog_walk(tree))
+    return catalog
+
+
+def test_sweep_catches_up_with_the_disk(catalog, tmp_path):
+    catalog, tree, files = catalog
+    changed = []
+    watcher = fm.CatalogWatcher(catalog, tree, on_change=lambda: changed.append(True))
+    os.remove(os.path.join(tree, "a.txt"))
+    os.makedirs(os.path.join(tree, "other", "new", "newer"))
+    with open(os.path.join(tree, "other", "new", "newer", "n.bin"), "wb") as f:
+        f.write(b"n" * 33)
+    for root, dirs, names in os.walk(os.path.join(tree, "sub"), topdown=False):
+        for name in names:
+            os.remove(os.path.join(root, name))
+        os.rmdir(root)
+    for folder in (tree, os.path.join(tree, "other")):
+        os.utime(folder, ns=(0, os.stat(folder).st_mtime_ns + 10**9)) # Past the timestamp granularity of any filesystem
+
+    watcher._sweep()
+    assert changed
+    assert catalogued(catalog, tree) == catalogued(fresh_catalog(tmp_path, tree), tree)
+    assert catalog.info(tree)[1] == len(files) - 1 - 3 + 1
+
+
+def test_events_are_applied_per_folder(catalog, tmp_path):
+    catalog, tree, files = catalog
+    watcher = fm.CatalogWatcher(catalog, tree)
+    sub = os.path.join(tree, "sub")
+    watcher._paths = {1: tree, 2: sub}
+    with open(os.path.join(sub, "e.txt"), "ab") as f:
+        f.write(b"more")
+    os.remove(os.path.join(tree, "b.jpg"))
+    os.mkdir(os.path.join(tree, "made"))
+    with open(os.path.join(tree, "made", "m.txt"), "wb") as f:
+        f.write(b"m")
+    watcher._on_event(2, 0, "e.txt")
+    watcher._on_event(1, 0, "b.jpg")
+    watcher._on_event(1, fm.IN_ISDIR, "made")
+    watcher._flush()
+    assert catalogued(catalog, tree) == catalogued(fresh_catalog(tmp_path, tree), tree)
@@ -0,0 +1,44 @@
+import threading
+
+import FileManager as fm
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_groups_identical_files_and_splits_on_late_difference(tmp_path):
+    base = b"x" * 10000
+    a = write(tmp_path, "a", base)
+    b = write(tmp_path, "b", base)
+    c = write(tmp_path, "c", base[:-1] + b"y") # Differs only in the last chunk
+    d = write(tmp_path, "d", base[:-1] + b"y")
+    e = write(tmp_path, "e", b"z" + base[1:]) # Differs in the first chunk
+    groups, singles, _ = fm.compare_files_lockstep([a, b, c, d, e], chunk_size=4096)
+    assert sorted(sorted(group) for group in groups) == [[a, b], [c, d]]
+    assert singles == [(e, 4096)] # Dropped after its first chunk
+
+
+def test_unreadable_files_are_left_out(tmp_path):
+    a = write(tmp_path, "a", b"same")
+    groups, singles, _ = fm.compare_files_lockstep([a, str(tmp_path / "missing")])
+    assert groups == []
+    assert singles == [(a, 0)]
+
+
+def test_empty_files_are_identical(tmp_path):
+    a = write(tmp_path, "a", b"")
+    b = write(tmp_path, "b", b"")
+    groups, singles, bytes_read = fm.compare_files_lockstep([a, b])
+    assert groups == [[a, b]]
+    assert singles == []
+    assert bytes_read == 0
+
+
+def test_cancelled_compare_returns_none(tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    paths = [write(tmp_path, name, b"data") for name in "ab"]
+    assert fm.compare_files_lockstep(paths, cancel_event=cancel) is None
@@ -0,0 +1,63 @@
+import queue
+import threading
+
+import FileManager as fm
+
+SAMPLE = fm.SAMPLE_HASH_BYTES
+
+
+class DupeApp:
+    """The parts of the app confirm_groups_by_content uses."""
+    confirm_groups_by_content = fm.FileManagementApp.confirm_groups_by_content
+    sample_hash_file = fm.FileManagementApp.sample_hash_file
+    cached_hash_file = fm.FileManagementApp.cached_hash_file
+    format_size = fm.FileManagementApp.format_size
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.logger = None
+        self.hashed = []
+
+    def hash_file(self, path, cancel_event=None, algorithm=fm.DEFAULT_HASH_ALGORITHM, **io_options):
+        self.hashed.append(path)
+        return fm.digest_file(path, algorithm, cancel_event=cancel_event)
+
+
+def confirm(groups, options=None):
+    app = DupeApp()
+    tiers = {key: fm.DupeTier(key) for key in ('size', 'compare', 'sample', 'full')}
+    sets = []
+    engine = fm.HashingEngine(2, threading.Event())
+    app.confirm_groups_by_content(groups, engine, tiers, options or {}, lambda paths: sets.append(sorted(paths)))
+    return sorted(sets), tiers, app
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_sample_tier_splits_heads_and_tails_before_full_hashing(tmp_path):
+    base = bytearray(b"m" * (3 * SAMPLE))
+    head, tail, middle = bytearray(base), bytearray(base), bytearray(base)
+    head[0] = ord("h")
+    tail[-1] = ord("t")
+    middle[len(base) // 2] = ord("x") # Same sample as base: only the full hash tells them apart
+    paths = {name: write(tmp_path, name, bytes(data)) for name, data in
+             [("a", base), ("b", base), ("c", base), ("head", head), ("tail", tail), ("middle", middle)]}
+
+    sets, tiers, app = confirm([(len(base), list(paths.values()))])
+    assert sets == [sorted(paths[name] for name in "abc")]
+    assert tiers['sample'].files_eliminated == 2
+    assert tiers['full'].files_eliminated == 1
+    # Only the files sharing a sample were read in full
+    assert sorted(app.hashed) == sorted(paths[name] for name in ("a", "b", "c", "middle"))
+
+
+def test_small_files_skip_the_sample_tier(tmp_path):
+    small = [write(tmp_path, name, data) for name, data in [("a", b"same"), ("b", b"same"), ("c", b"diff")]]
+    sets, tiers, app = confirm([(4, small)])
+    assert sets == [sorted(small[:2])]
+    assert tiers['sample'].files_in == 0
+    assert sorted(app.hashed) == sorted(small)
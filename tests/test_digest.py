@@ -0,0 +1,53 @@
+import hashlib
+
+import pytest
+
+import FileManager as fm
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 1000 + b"tail")
+    return path
+
+
+@pytest.mark.parametrize("algorithm", sorted(fm.HASH_ALGORITHMS))
+def test_every_algorithm_matches_its_reference(data_file, algorithm):
+    expected = fm.HASH_ALGORITHMS[algorithm](data_file.read_bytes()).hexdigest()
+    assert fm.digest_file(str(data_file), algorithm) == expected
+
+
+def test_algorithms_give_different_digests(data_file):
+    digests = {fm.digest_file(str(data_file), algorithm) for algorithm in fm.HASH_ALGORITHMS}
+    assert len(digests) == len(fm.HASH_ALGORITHMS)
+    assert fm.HASH_ALGORITHMS["SHA-256"] is hashlib.sha256
+
+
+def test_match_method_names_the_algorithm():
+    describe = fm.FileManagementApp.dupe_match_method
+    assert describe(None, True, False, "BLAKE2b") == "BLAKE2b"
+    assert "BLAKE2b" in describe(None, True, True, "BLAKE2b")
+    assert describe(None, False, False, "BLAKE2b") == "Size + modification time"
+
+
+@pytest.mark.parametrize("block_size", [1, 1000, 4096, fm.HASH_BLOCK_SIZE, 10**7])
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_buffered_and_mmap_reads_give_the_same_digest(data_file, monkeypatch, block_size, use_mmap):
+    monkeypatch.setattr(fm, "HASH_MMAP_THRESHOLD", 1) # Small enough for the mmap path
+    expected = hashlib.sha256(data_file.read_bytes()).hexdigest()
+    assert fm.digest_file(str(data_file), block_size=block_size, use_mmap=use_mmap, drop_cache=True) == expected
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty"
+    path.write_bytes(b"")
+    assert fm.digest_file(str(path), use_mmap=True) == hashlib.sha256().hexdigest()
+
+
+def test_cancel_returns_none(data_file, monkeypatch):
+    monkeypatch.setattr(fm, "HASH_MMAP_THRESHOLD", 1)
+    cancel = fm.threading.Event()
+    cancel.set()
+    assert fm.digest_file(str(data_file), cancel_event=cancel) is None
+    assert fm.digest_file(str(data_file), cancel_event=cancel, use_mmap=True) is None
@@ -0,0 +1,110 @@
+import logging
+import os
+import queue
+import threading
+from datetime import datetime
+
+import FileManager as fm
+
+
+class ScanApp:
+    """The parts of the app scan_logic uses, without a window."""
+    scan_logic = fm.FileManagementApp.scan_logic
+    collect_file_records = fm.FileManagementApp.collect_file_records
+    changed_sizes = fm.FileManagementApp.changed_sizes
+    confirm_groups_by_content = fm.FileManagementApp.confirm_groups_by_content
+    save_scan_snapshot = fm.FileManagementApp.save_scan_snapshot
+    dupe_match_method = fm.FileManagementApp.dupe_match_method
+    sample_hash_file = fm.FileManagementApp.sample_hash_file
+    cached_hash_file = fm.FileManagementApp.cached_hash_file
+    hash_file = fm.FileManagementApp.hash_file
+    format_size = fm.FileManagementApp.format_size
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+        self.walk_workers = 2
+        self.active_catalog = None
+        self.start_time = datetime.now()
+
+    def walk_rules(self, tab, source_dir):
+        return None
+
+
+def scan(source_dir, catalog=None, **options):
+    """Run one scan and return (message types in order, {set id: paths}, done message)."""
+    app = ScanApp()
+    app.active_catalog = catalog
+    app.scan_logic(threading.Event(), str(source_dir), dict({'use_hash': True}, **options))
+    kinds, sets, done = [], {}, None
+    while not app.queue.empty():
+        kind, data = app.queue.get()
+        kinds.append(kind)
+        if kind == "dupe_results_batch":
+            for set_id, path, _, _ in data:
+                sets.setdefault(set_id, []).append(path)
+        elif kind == "dupe_scan_done":
+            done = data[0]
+        elif kind == "error":
+            raise AssertionError(data)
+    return kinds, {set_id: sorted(paths) for set_id, paths in sets.items()}, done
+
+
+def test_hardlinks_to_one_inode_count_once(tmp_path):
+    original = tmp_path / "original.bin"
+    original.write_bytes(b"shared data" * 100)
+    os.link(original, tmp_path / "link.bin")
+    (tmp_path / "copy.bin").write_bytes(b"shared data" * 100)
+
+    _, sets, done = scan(tmp_path)
+    duplicate_sets = {set_id: paths for set_id, paths in sets.items() if not set_id.startswith(fm.HARDLINK_SET_PREFIX)}
+    assert len(duplicate_sets) == 1
+    pair = next(iter(duplicate_sets.values()))
+    assert len(pair) == 2 and str(tmp_path / "copy.bin") in pair # Not a triple
+    link_sets = [paths for set_id, paths in sets.items() if set_id.startswith(fm.HARDLINK_SET_PREFIX)]
+    assert link_sets == [sorted([str(original), str(tmp_path / "link.bin")])]
+    assert "1 hardlink groups" in done
+
+
+def make_pairs(tmp_path, sizes):
+    for size in sizes:
+        for copy in "ab":
+            path = tmp_path / f"{size}{copy}.bin"
+            path.write_bytes(b"x" * size)
+            os.utime(path, ns=(10**18, 10**18)) # Same mtime, for mod-time matching
+
+
+def test_sets_stream_biggest_waste_first(tmp_path):
+    make_pairs(tmp_path, [10, 5000, 300])
+    for options in ({'use_hash': False}, {'use_hash': True, 'hash_workers': 1}):
+        _, sets, _ = scan(tmp_path, **options)
+        assert [os.path.basename(sets[f"Set {i}"][0]) for i in (1, 2, 3)] == ["5000a.bin", "300a.bin", "10a.bin"]
+
+
+def test_results_arrive_in_batches_before_the_scan_ends(tmp_path):
+    make_pairs(tmp_path, range(1, 151)) # 300 rows
+    kinds, sets, _ = scan(tmp_path, hash_workers=1)
+    assert len(sets) == 150
+    assert kinds.count("dupe_results_batch") >= 3
+    assert kinds[-1] == "dupe_scan_done"
+
+
+def test_catalog_scans_match_walking_scans(tmp_path):
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    make_pairs(tree, [10, 5000, 300])
+    (tree / "unique.bin").write_bytes(b"u" * 777)
+    _, walked, _ = scan(tree)
+    walked = sorted(walked.values())
+
+    catalog = fm.FileCatalog(str(tmp_path / "catalog.db"))
+    # No catalog of this folder (e.g. removed since the task started): the folder is walked
+    _, sets, _ = scan(tree, catalog)
+    assert sorted(sets.values()) == walked
+
+    def lister(path):
+        dirs, dir_mtime, rows, _ = fm.catalog_listing(path)
+        return dirs, (dir_mtime, rows)
+    catalog.build(str(tree), ((root, mtime, rows) for root, _, (mtime, rows) in fm.parallel_scan_tree(str(tree), lister=lister)))
+    _, sets, _ = scan(tree, catalog)
+    assert sorted(sets.values()) == walked
@@ -0,0 +1,25 @@
+import os
+
+import FileManager as fm
+
+
+def test_rows_round_trip():
+    records = [
+        ("/photos/2020", "IMG_1.jpg", (10, 5, 1, 2, 1)),
+        ("/photos/2021", "ünïcode name.png", (0, 6, 1, 3, 2)),
+        ("/photos/2020", "IMG_2.jpg", (2**40, 7, 1, 2**63 + 1, 1)), # Inode past the signed 64-bit range
+    ]
+    table = fm.FileTable()
+    for folder, name, record in records:
+        table.add(table.add_dir(folder), name, *record)
+
+    assert len(table) == 3
+    assert table.dirs == ["/photos/2020", "/photos/2021"] # Each folder stored once
+    assert [table.name(row) for row in range(3)] == [name for _, name, _ in records]
+    assert dict(table.items()) == {os.path.join(folder, name): record for folder, name, record in records}
+
+
+def test_inodes_are_kept_to_64_bits():
+    table = fm.FileTable()
+    table.add(table.add_dir("/d"), "f", 1, 1, 1, 2**64 + 5, 1)
+    assert table.record(0)[3] == 5
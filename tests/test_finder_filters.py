@@ -0,0 +1,144 @@
+import re
+import types
+
+import pytest
+
+import FileManager as fm
+
+
+def stat(size=0, mtime=0.0):
+    return types.SimpleNamespace(st_size=size, st_mtime=mtime)
+
+
+def test_no_filters_compile_to_nothing():
+    assert fm.compile_finder_filters({}) == (None, None)
+    assert fm.compile_finder_filters({'top': (5, "largest")}) == (None, None)
+
+
+def test_size_bounds_are_strict():
+    _, greater = fm.compile_finder_filters({'size': ("greater than", 100)})
+    _, less = fm.compile_finder_filters({'size': ("less than", 100)})
+    assert [greater(stat(size)) for size in (99, 100, 101)] == [False, False, True]
+    assert [less(stat(size)) for size in (99, 100, 101)] == [True, False, False]
+
+
+def test_date_bounds_are_strict():
+    _, before = fm.compile_finder_filters({'date': ("before", 1000.0)})
+    _, after = fm.compile_finder_filters({'date': ("after", 1000.0)})
+    assert [before(stat(mtime=t)) for t in (999.5, 1000.0, 1000.5)] == [True, False, False]
+    assert [after(stat(mtime=t)) for t in (999.5, 1000.0, 1000.5)] == [False, False, True]
+
+
+def test_every_stat_test_must_pass():
+    _, stat_ok = fm.compile_finder_filters({'size': ("greater than", 10), 'date': ("after", 50.0)})
+    assert stat_ok(stat(11, 51.0))
+    assert not stat_ok(stat(11, 49.0))
+    assert not stat_ok(stat(9, 51.0))
+
+
+def test_name_tests():
+    ext_ok, _ = fm.compile_finder_filters({'ext': [".jpg", ".png"]})
+    assert [ext_ok(name) for name in ("a.JPG", "b.png", "c.jpeg", "jpg")] == [True, True, False, False]
+    wildcard_ok, _ = fm.compile_finder_filters({'name': ("wildcard", "IMG_*.jpg")})
+    assert [wildcard_ok(name) for name in ("img_1.JPG", "IMG_.jpg", "x_IMG_1.jpg")] == [True, True, False]
+    regex_ok, _ = fm.compile_finder_filters({'name': ("regex", r"\d{4}")})
+    assert [regex_ok(name) for name in ("report 2024.pdf", "report.pdf")] == [True, False]
+    both_ok, stat_ok = fm.compile_finder_filters({'ext': [".jpg"], 'name': ("wildcard", "a*")})
+    assert stat_ok is None
+    assert [both_ok(name) for name in ("a.jpg", "a.png", "b.jpg")] == [True, False, False]
+
+
+def test_invalid_regex_is_rejected():
+    with pytest.raises(re.error):
+        fm.compile_finder_filters({'name': ("regex", "[unclosed")})
+
+
+def content_ok(mode, pattern):
+    return fm.compile_content_filter({'content': (mode, pattern)})
+
+
+def test_no_content_filter():
+    assert fm.compile_content_filter({'name': ("wildcard", "*")}) is None
+
+
+def test_content_modes(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("Meeting at 10:30 with Zoë\n", encoding="utf-8")
+    assert content_ok("text", "with Zoë")(str(path))
+    assert not content_ok("text", "WITH ZOË")(str(path))
+    assert content_ok("text, ignore case", "MEETING")(str(path))
+    assert content_ok("regex", r"^Meeting at \d\d:\d\d")(str(path))
+    assert not content_ok("regex", r"\d{3}:")(str(path))
+
+
+def test_invalid_content_regex_is_rejected():
+    with pytest.raises(re.error):
+        content_ok("regex", "(unclosed")
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_matches_across_the_first_read(tmp_path, monkeypatch, use_mmap):
+    if use_mmap:
+        monkeypatch.setattr(fm, "CONTENT_MMAP_THRESHOLD", 1)
+    path = tmp_path / "big.txt"
+    needle = "needle in the haystack"
+    # The needle straddles the end of the first CONTENT_SNIFF_BYTES (and of the first page)
+    path.write_bytes(b"h" * (fm.CONTENT_SNIFF_BYTES - 6) + needle.encode() + b"h" * 3 * fm.CONTENT_SNIFF_BYTES)
+    assert content_ok("text", needle)(str(path))
+    assert content_ok("regex", "needle.*haystack")(str(path))
+    assert not content_ok("text", "needle in the hay stack")(str(path))
+
+
+def test_binary_files_never_match(tmp_path):
+    binary = tmp_path / "image.bin"
+    binary.write_bytes(b"\x89PNG\0\0 find me")
+    assert not content_ok("text", "find me")(str(binary))
+    # A NUL past the sniffed head doesn't make a file binary
+    late_nul = tmp_path / "late.txt"
+    late_nul.write_bytes(b"find me" + b" " * fm.CONTENT_SNIFF_BYTES + b"\0")
+    assert content_ok("text", "find me")(str(late_nul))
+
+
+def test_unreadable_files_raise(tmp_path):
+    # The Finder logs these and goes on
+    with pytest.raises(OSError):
+        content_ok("text", "x")(str(tmp_path / "missing.txt"))
+    with pytest.raises(OSError):
+        content_ok("text", "x")(str(tmp_path))
+
+
+class FinderApp:
+    """The parts of the app find_files_logic uses, without a window."""
+    find_files_logic = fm.FileManagementApp.find_files_logic
+    format_size = fm.FileManagementApp.format_size
+
+    def __init__(self):
+        self.queue = fm.queue.Queue()
+        self.logger = fm.logging.getLogger(__name__)
+        self.walk_workers = 4
+        self.active_catalog = None
+        self.finder_index = None
+
+    def walk_rules(self, tab, source_dir):
+        return None
+
+    def exclusion_settings(self, tab):
+        return {}
+
+
+def test_content_search_reports_in_walk_order(tmp_path):
+    for folder in range(5):
+        (tmp_path / f"d{folder}").mkdir()
+        for i in range(20):
+            (tmp_path / f"d{folder}" / f"f{i:02}.txt").write_text("match" if (folder + i) % 3 == 0 else "other")
+    app = FinderApp()
+    app.find_files_logic(fm.threading.Event(), str(tmp_path), {'content': ("text", "match")})
+    rows = []
+    while not app.queue.empty():
+        kind, data = app.queue.get()
+        if kind == "finder_results_batch":
+            rows.extend((folder, name) for name, folder, _, _ in data)
+    expected = [(str(tmp_path / f"d{folder}"), f"f{i:02}.txt") for folder in range(5) for i in range(20) if (folder + i) % 3 == 0]
+    assert sorted(rows) == expected
+    walk_order = [(root, entry.name) for root, _, files in fm.scan_tree(str(tmp_path)) for entry in files]
+    assert rows == [row for row in walk_order if row in set(expected)]
@@ -0,0 +1,99 @@
+import os
+
+import FileManager as fm
+
+
+def make_tree(root):
+    for i in range(6):
+        for j in range(4):
+            folder = root / f"d{i}" / f"s{j}"
+            folder.mkdir(parents=True)
+            for k in range(j + 1):
+                (folder / f"f{k}.bin").write_bytes(b"x" * (i * 100 + j * 10 + k))
+        (root / f"d{i}" / "own.txt").write_bytes(b"y" * i)
+    (root / "top.txt").write_bytes(b"z" * 7)
+
+
+def walk_totals(top):
+    """(bytes, files) under top, the plain way."""
+    size = count = 0
+    for root, _, files in os.walk(top):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+            count += 1
+    return size, count
+
+
+def test_totals_match_os_walk(tmp_path):
+    make_tree(tmp_path)
+    for use_processes in (False, True):
+        root, folders, reused = fm.analyze_tree(str(tmp_path), False, {}, workers=2, use_processes=use_processes)
+        assert (root.size, root.items) == walk_totals(tmp_path)
+        assert reused == 0
+        assert len(folders) == 1 + 6 + 6 * 4
+        for child in root.children:
+            assert (child.size, child.items) == walk_totals(child.path)
+
+
+def test_cached_rescan_matches_a_fresh_one(tmp_path):
+    make_tree(tmp_path)
+    _, folders, _ = fm.analyze_tree(str(tmp_path), False, {}, workers=2)
+
+    root, _, reused = fm.analyze_tree(str(tmp_path), False, {}, workers=2, cached=folders)
+    assert reused == len(folders)
+    assert (root.size, root.items) == walk_totals(tmp_path)
+
+    (tmp_path / "d2" / "s1" / "new.bin").write_bytes(b"n" * 5000)
+    (tmp_path / "d4" / "s3" / "f0.bin").unlink()
+    for folder in (tmp_path / "d2" / "s1", tmp_path / "d4" / "s3"):
+        os.utime(folder, ns=(0, os.stat(folder).st_mtime_ns + 10**9)) # Past the timestamp granularity of any filesystem
+    for use_processes in (False, True):
+        root, _, reused = fm.analyze_tree(str(tmp_path), False, {}, workers=2, use_processes=use_processes, cached=folders)
+        assert reused == len(folders) - 2
+        assert (root.size, root.items) == walk_totals(tmp_path)
+
+
+def test_saved_scan_round_trips(tmp_path):
+    make_tree(tmp_path / "tree")
+    cache = fm.FolderSizeCache(str(tmp_path / "sizes.db"))
+    assert cache.load(str(tmp_path / "tree"), "") is None
+    _, folders, _ = fm.analyze_tree(str(tmp_path / "tree"), False, {}, workers=2)
+    cache.save(str(tmp_path / "tree"), "", folders)
+    assert cache.load(str(tmp_path / "tree"), "") == folders
+    assert cache.load(str(tmp_path / "tree"), "other rules") is None
+
+
+def test_deleting_a_folder_drops_its_subtree_only(tmp_path):
+    cache = fm.FolderSizeCache(str(tmp_path / "sizes.db"))
+    a = os.path.join(str(tmp_path), "a")
+    b = os.path.join(a, "b")
+    folders = {
+        a: (1, 0, 0),
+        b: (2, 10, 1),
+        os.path.join(b, "c"): (3, 20, 2),
+        a + os.sep + "bc": (4, 30, 3), # Shares the "b" prefix but isn't under it
+        a + os.sep + "b0": (5, 40, 4),
+    }
+    cache.save(a, "", folders)
+    cache.apply_deletes(a, "", [(b, None, 1, 11)])
+    assert cache.load(a, "") == {a: (11, 0, 0), a + os.sep + "bc": (4, 30, 3), a + os.sep + "b0": (5, 40, 4)}
+
+
+def test_deleting_a_file_updates_its_folder_if_unchanged(tmp_path):
+    cache = fm.FolderSizeCache(str(tmp_path / "sizes.db"))
+    a = os.path.join(str(tmp_path), "a")
+    b = os.path.join(a, "b")
+    cache.save(a, "", {a: (1, 100, 2), b: (2, 50, 3)})
+    cache.apply_deletes(a, "", [(os.path.join(a, "f"), 40, 1, 9), (os.path.join(b, "g"), 5, 999, 8)])
+    # b had another mtime than the one saved, so it's left for the next scan to notice
+    assert cache.load(a, "") == {a: (9, 60, 1), b: (2, 50, 3)}
+
+
+def test_folders_sqlite_cannot_store_are_listed_again(tmp_path):
+    cache = fm.FolderSizeCache(str(tmp_path / "sizes.db"))
+    a = os.path.join(str(tmp_path), "a")
+    bad = os.path.join(a, "bad\udcff") # An undecodable byte, as os.listdir returns it on Linux
+    folders = {a: (1, 10, 1), bad: (2, 20, 2), os.path.join(bad, "c"): (3, 30, 3), os.path.join(a, "d"): (4, 40, 4)}
+    cache.save(a, "", folders)
+    # a isn't saved either: reused, it would lose the folder it can't list from the cache
+    assert cache.load(a, "") == {os.path.join(a, "d"): (4, 40, 4)}
@@ -0,0 +1,154 @@
+import collections
+import hashlib
+import threading
+
+import FileManager as fm
+
+
+def hash_path(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return hashlib.sha256(data).hexdigest(), len(data)
+
+
+def make_files(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"f{i}"
+        path.write_bytes(bytes([i % 256]) * (i * 100))
+        paths.append(str(path))
+    return paths
+
+
+def test_run_hashes_every_item_once(tmp_path):
+    paths = make_files(tmp_path, 20)
+    engine = fm.HashingEngine(workers=4, max_in_flight=3)
+    results = {item: result for item, result, error in engine.run(hash_path, paths)}
+    assert results == {path: hash_path(path)[0] for path in paths}
+    assert engine.files_done == 20
+    assert engine.bytes_done == sum(i * 100 for i in range(20))
+
+
+def test_run_reports_errors_and_keeps_going(tmp_path):
+    paths = make_files(tmp_path, 3) + [str(tmp_path / "missing")]
+    outcome = {item: error for item, _, error in fm.HashingEngine(workers=2).run(hash_path, paths)}
+    assert isinstance(outcome.pop(str(tmp_path / "missing")), OSError)
+    assert set(outcome.values()) == {None}
+
+
+def test_run_takes_items_added_while_consuming(tmp_path):
+    first, second = make_files(tmp_path, 2)
+    items = collections.deque([first])
+    seen = []
+    for item, _, _ in fm.HashingEngine(workers=2).run(hash_path, items):
+        seen.append(item)
+        if item == first:
+            items.append(second)
+    assert seen == [first, second]
+
+
+def test_run_stops_when_cancelled(tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    engine = fm.HashingEngine(workers=2, cancel_event=cancel)
+    assert list(engine.run(hash_path, make_files(tmp_path, 5))) == []
+
+
+class HashingApp:
+    """The parts of the app cached_hash_file uses."""
+
+    def __init__(self):
+        self.logger = None
+
+    def hash_file(self, path, cancel_event=None, algorithm=fm.DEFAULT_HASH_ALGORITHM, **io_options):
+        return fm.digest_file(path, algorithm, cancel_event=cancel_event)
+
+
+def cached_hash(path, cache, **options):
+    return fm.FileManagementApp.cached_hash_file(HashingApp(), path, cache, **options)
+
+
+def test_cache_hits_on_the_recorded_stat_need_no_stat(tmp_path, monkeypatch):
+    path = tmp_path / "f"
+    path.write_bytes(b"data" * 100)
+    stat = path.stat()
+    recorded = fm.FileStat(stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino)
+    cache = fm.HashCache(str(tmp_path / "hashes.db"))
+    digest, from_cache = cached_hash(str(path), cache, recorded=recorded)
+    assert (digest, from_cache) == (hash_path(path)[0], False)
+
+    stats = []
+    real_stat = fm.os.stat
+    monkeypatch.setattr(fm.os, "stat", lambda *args, **kwargs: stats.append(args) or real_stat(*args, **kwargs))
+    assert cached_hash(str(path), cache, recorded=recorded) == (digest, True)
+    assert stats == []
+
+
+def test_a_file_changed_since_the_scan_is_stored_under_its_new_stat(tmp_path):
+    path = tmp_path / "f"
+    path.write_bytes(b"old")
+    stat = path.stat()
+    recorded = fm.FileStat(stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino)
+    path.write_bytes(b"new data")
+    cache = fm.HashCache(str(tmp_path / "hashes.db"))
+    digest, _ = cached_hash(str(path), cache, recorded=recorded)
+    assert digest == hash_path(path)[0]
+    assert cache.lookup(recorded) is None
+    assert cache.lookup(path.stat()) == digest
+
+
+def file_stat(ino, size=10, mtime_ns=1):
+    return fm.FileStat(size, mtime_ns, 1, ino)
+
+
+def test_cache_keys_on_stat_and_algorithm(tmp_path):
+    cache = fm.HashCache(str(tmp_path / "hashes.db"))
+    cache.store(file_stat(1), "aaa")
+    assert cache.lookup(file_stat(1)) == "aaa"
+    assert cache.lookup(file_stat(1, mtime_ns=2)) is None # Modified
+    assert cache.lookup(file_stat(1, size=11)) is None
+    assert cache.lookup(file_stat(1), "md5") is None
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.store(file_stat(0), "no inode") # Not cacheable
+    assert cache.lookup(file_stat(0)) is None
+    assert cache.entry_count() == 1
+
+
+def test_flush_evicts_the_least_recently_used(tmp_path, monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(fm.time, "time", lambda: now[0])
+    cache = fm.HashCache(str(tmp_path / "hashes.db"), max_entries=2)
+    for ino in (1, 2, 3):
+        now[0] += 1
+        cache.store(file_stat(ino), f"d{ino}")
+    now[0] += 1
+    assert cache.lookup(file_stat(1)) == "d1" # Used again, so 2 is now the oldest
+    cache.flush()
+    assert cache.entry_count() == 2
+    assert cache.lookup(file_stat(2)) is None
+    assert cache.lookup(file_stat(3)) == "d3"
+
+
+def test_entries_survive_reopening_and_purge_empties(tmp_path):
+    db_path = str(tmp_path / "hashes.db")
+    cache = fm.HashCache(db_path)
+    cache.store(file_stat(1), "aaa")
+    cache.flush()
+    cache = fm.HashCache(db_path)
+    assert cache.lookup(file_stat(1)) == "aaa"
+    cache.purge()
+    assert cache.entry_count() == 0
+    assert fm.HashCache(db_path).lookup(file_stat(1)) is None
+
+
+def test_cache_of_another_schema_version_is_discarded(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "hashes.db")
+    cache = fm.HashCache(db_path)
+    cache.store(file_stat(1), "aaa")
+    cache.flush()
+    monkeypatch.setattr(fm, "HASH_CACHE_SCHEMA_VERSION", fm.HASH_CACHE_SCHEMA_VERSION + 1)
+    cache = fm.HashCache(db_path)
+    assert cache.entry_count() == 0
+    cache.store(file_stat(1), "bbb")
+    cache.flush()
+    assert fm.HashCache(db_path).lookup(file_stat(1)) == "bbb" # The new version is kept
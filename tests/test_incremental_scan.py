@@ -0,0 +1,62 @@
+import FileManager as fm
+
+
+def make_table(records):
+    """A FileTable from {path: (size, mtime_ns, dev, ino, nlink)}."""
+    table = fm.FileTable()
+    for path, record in records.items():
+        table.add(table.add_dir("/d"), path.rsplit("/", 1)[1], *record)
+    return table
+
+
+def changed_sizes(old_records, new_records):
+    # changed_sizes doesn't use the app's state
+    return fm.FileManagementApp.changed_sizes(None, old_records, make_table(new_records))
+
+
+def test_unchanged_scan_affects_no_size():
+    records = {"/d/a": (10, 1, 1, 1, 1), "/d/b": (10, 1, 1, 2, 1)}
+    assert changed_sizes(records, dict(records)) == set()
+
+
+def test_added_removed_and_changed_files_mark_their_sizes():
+    old = {"/d/a": (10, 1, 1, 1, 1), "/d/b": (20, 1, 1, 2, 1), "/d/c": (30, 1, 1, 3, 1), "/d/e": (50, 1, 1, 5, 1)}
+    new = {
+        "/d/a": (10, 1, 1, 1, 1), # Unchanged
+        "/d/b": (20, 2, 1, 2, 1), # Touched: same size, new mtime
+        "/d/c": (35, 1, 1, 3, 1), # Grew: both sizes affected
+        "/d/d": (40, 1, 1, 4, 1), # Added
+    } # /d/e removed
+    assert changed_sizes(old, new) == {20, 30, 35, 40, 50}
+
+
+
+def test_snapshot_round_trips(tmp_path):
+    store = fm.ScanSnapshotStore(str(tmp_path / "snapshots.db"))
+    assert store.load("/r") is None
+    table = fm.FileTable()
+    for folder, name, record in [("/r", "a", (10, 1, 1, 1, 1)), ("/r/s", "b", (10, 2, 1, 2, 1))]:
+        table.add(table.add_dir(folder), name, *record)
+    store.save("/r", "hash", {"/r": (5, ["/r/s"]), "/r/s": (6, [])}, table, [["/r/a", "/r/s/b"]])
+
+    snapshot = store.load("/r")
+    assert snapshot['method'] == "hash"
+    assert snapshot['dirs'] == {"/r": (5, ["/r/s"]), "/r/s": (6, [])}
+    assert snapshot['files'] == {"/r/a": (10, 1, 1, 1, 1), "/r/s/b": (10, 2, 1, 2, 1)}
+    assert snapshot['dupe_sets'] == [["/r/a", "/r/s/b"]]
+
+
+def test_snapshot_skips_names_sqlite_cannot_store(tmp_path):
+    store = fm.ScanSnapshotStore(str(tmp_path / "snapshots.db"))
+    bad = "bad\udcff" # An undecodable byte, as os.listdir returns it on Linux
+    table = fm.FileTable()
+    for folder, name in [("/r", "a"), ("/r/s", bad), ("/r/s", "b"), ("/r/u", "c"), ("/r/" + bad, "d")]:
+        table.add(table.add_dir(folder), name, 1, 1, 1, 1, 1)
+    dir_info = {"/r": (5, ["/r/s", "/r/u", "/r/" + bad]), "/r/s": (6, []), "/r/u": (7, []), "/r/" + bad: (8, [])}
+    store.save("/r", "hash", dir_info, table, [["/r/a", "/r/s/" + bad]])
+
+    snapshot = store.load("/r")
+    assert snapshot['files'] == {path: (1, 1, 1, 1, 1) for path in ["/r/a", "/r/s/b", "/r/u/c"]}
+    # The folders holding those names have no mtime, so a rescan lists them again
+    assert snapshot['dirs'] == {"/r": (None, ["/r/u"]), "/r/u": (7, [])}
+    assert snapshot['dupe_sets'] == [["/r/a"]]
@@ -0,0 +1,113 @@
+import logging
+import os
+import queue
+import threading
+import types
+
+import pytest
+
+import FileManager as fm
+
+
+class LinkApp:
+    """The parts of the app link_dedupe_logic uses, without a window."""
+    link_dedupe_logic = fm.FileManagementApp.link_dedupe_logic
+    replace_with_link = fm.FileManagementApp.replace_with_link
+    order_for_keeping = fm.FileManagementApp.order_for_keeping
+    format_size = fm.FileManagementApp.format_size
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+
+
+def link(paths, link_mode="hardlink", dry_run=False):
+    """Link a duplicate set, keeping the first path; return the done message."""
+    app = LinkApp()
+    files = {"Set 1": [{'path': str(path), 'mtime': 0} for path in paths]}
+    app.link_dedupe_logic(threading.Event(), None, files, "keep_first_found", link_mode, dry_run)
+    while True:
+        kind, data = app.queue.get_nowait()
+        if kind in ("dupe_action_done", "error"):
+            return data if kind == "error" else data[0]
+
+
+@pytest.fixture
+def pair(tmp_path):
+    keep, dupe = tmp_path / "a.bin", tmp_path / "b.bin"
+    for path in (keep, dupe):
+        path.write_bytes(b"same contents" * 1000)
+    return keep, dupe
+
+
+def test_linked_files_share_one_inode(pair):
+    keep, dupe = pair
+    message = link(pair)
+    assert "Linked 1 files (1 hardlink)" in message
+    assert os.path.samefile(keep, dupe)
+    assert dupe.read_bytes() == b"same contents" * 1000
+    assert os.stat(keep).st_nlink == 2
+    assert sorted(os.listdir(keep.parent)) == ["a.bin", "b.bin"] # No temp file left
+
+
+def test_dry_run_changes_nothing(pair):
+    keep, dupe = pair
+    before = os.stat(dupe)
+    message = link(pair, dry_run=True)
+    assert "Would link 1 files" in message
+    assert not os.path.samefile(keep, dupe)
+    assert os.stat(dupe).st_ino == before.st_ino
+
+
+def test_changed_contents_are_not_linked(pair):
+    keep, dupe = pair
+    dupe.write_bytes(b"same contents" * 999 + b"other content")
+    message = link(pair)
+    assert "Skipped 1" in message
+    assert not os.path.samefile(keep, dupe)
+
+
+def test_files_on_other_devices_are_not_linked(pair, monkeypatch):
+    keep, dupe = pair
+    real_stat = os.stat
+
+    def stat(path, *args, **kwargs):
+        result = real_stat(path, *args, **kwargs)
+        if str(path) == str(dupe):
+            return types.SimpleNamespace(st_dev=result.st_dev + 1, st_ino=result.st_ino, st_nlink=1, st_size=result.st_size)
+        return result
+    monkeypatch.setattr(fm.os, "stat", stat)
+    message = link(pair)
+    monkeypatch.undo()
+    assert "Skipped 1" in message
+    assert not os.path.samefile(keep, dupe)
+
+
+@pytest.mark.parametrize("failing", ["link", "replace"])
+def test_a_failed_link_leaves_the_original(pair, monkeypatch, failing):
+    keep, dupe = pair
+    before = os.stat(dupe)
+
+    def fail(*args, **kwargs):
+        raise OSError("simulated failure")
+    monkeypatch.setattr(fm.os, failing, fail)
+    message = link(pair)
+    monkeypatch.undo()
+    assert "Failed to link 1 files" in message
+    assert os.stat(dupe).st_ino == before.st_ino
+    assert dupe.read_bytes() == b"same contents" * 1000
+    assert sorted(os.listdir(keep.parent)) == ["a.bin", "b.bin"] # The temp link is cleaned up
+
+
+def test_auto_falls_back_to_a_hardlink(pair, monkeypatch):
+    keep, dupe = pair
+
+    def no_reflink(source, dest):
+        raise OSError("not supported")
+    monkeypatch.setattr(fm, "reflink_file", no_reflink)
+    assert "1 hardlink" in link(pair, link_mode="auto")
+    assert os.path.samefile(keep, dupe)
+    dupe.unlink()
+    dupe.write_bytes(keep.read_bytes())
+    assert "Failed to link 1 files" in link(pair, link_mode="reflink")
+    assert not os.path.samefile(keep, dupe)
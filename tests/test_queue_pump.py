@@ -0,0 +1,85 @@
+import queue
+
+import FileManager as fm
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(delay)
+        return len(self.scheduled)
+
+
+class FakeList:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, rows):
+        self.rows.extend(rows)
+
+
+class QueueApp:
+    """Just enough of FileManagementApp for check_queue to run without Tk."""
+    check_queue = fm.FileManagementApp.check_queue
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.root = FakeRoot()
+        self.finder_tree = FakeList()
+        self.shown = []
+        self.current_task = None
+        self.controls = []
+        self._queue_interval_ms = fm.QUEUE_POLL_MIN_MS
+
+    def update_status(self, message):
+        self.shown.append(message)
+
+    def toggle_controls(self, scanning):
+        self.controls.append(scanning)
+
+
+def test_only_the_last_of_a_run_of_statuses_is_shown():
+    app = QueueApp()
+    for msg in [("status", "1"), ("status", "2"), ("finder_results_batch", [("a",)]),
+                ("status", "3"), ("status", "4")]:
+        app.queue.put(msg)
+    app.check_queue()
+    assert app.shown == ["2", "4"]
+    assert app.finder_tree.rows == [("a",)]
+
+
+def test_final_message_comes_after_earlier_statuses():
+    app = QueueApp()
+    app.current_task = object()
+    app.queue.put(("status", "Hashing 10 of 10"))
+    app.queue.put(("done", "Finished."))
+    app.check_queue()
+    assert app.shown == ["Hashing 10 of 10", "Finished."]
+    assert app.controls == [False] and app.current_task is None
+
+
+def test_poll_interval_backs_off_while_idle_and_resets_on_messages():
+    app = QueueApp()
+    for _ in range(6):
+        app.check_queue()
+    intervals = app.root.scheduled
+    assert intervals[0] == fm.QUEUE_POLL_MIN_MS * 2
+    assert intervals == sorted(intervals) and intervals[-1] == fm.QUEUE_POLL_MAX_MS
+
+    app.queue.put(("status", "busy"))
+    app.check_queue()
+    assert app.root.scheduled[-1] == fm.QUEUE_POLL_MIN_MS
+
+
+def test_budget_overrun_yields_to_tk_and_comes_straight_back(monkeypatch):
+    app = QueueApp()
+    for n in range(5):
+        app.queue.put(("status", str(n)))
+    clock = iter(range(100))
+    monkeypatch.setattr(fm.time, "perf_counter", lambda: next(clock) * fm.QUEUE_FRAME_BUDGET_S / 2.5)
+    app.check_queue() # Time for two messages only
+    assert app.shown == ["1"]
+    assert app.queue.qsize() == 3
+    assert app.root.scheduled == [1]
@@ -0,0 +1,86 @@
+import itertools
+import os
+import types
+
+import FileManager as fm
+
+BASE = 1_600_000_000 # Seconds; the mtimes below are whole seconds past it
+
+
+def make_index(tmp_path):
+    table = fm.FileTable()
+    for d in range(3):
+        folder = tmp_path / f"d{d}"
+        folder.mkdir()
+        dir_id = table.add_dir(str(folder))
+        for i in range(20):
+            name = f"f{d}_{i}{'.jpg' if i % 3 else '.txt'}"
+            size = (i * 7 + d) % 10 * 100 # Many equal sizes, to test the edges
+            mtime_ns = (BASE + (i * 3 + d) % 15) * 10**9
+            (folder / name).write_bytes(b"x" * size)
+            os.utime(folder / name, ns=(mtime_ns, mtime_ns))
+            table.add(dir_id, name, size, mtime_ns, 1, d * 100 + i, 1)
+    return fm.RangeIndex("key", table, [0] * len(table.dirs))
+
+
+def linear(index, filters):
+    """The Finder's per-file filters, run over every row."""
+    name_ok, stat_ok = fm.compile_finder_filters(filters)
+    table = index.table
+    for row in range(len(table)):
+        name, size, mtime = table.name(row), table.sizes[row], table.mtimes[row] / 1e9
+        if name_ok is not None and not name_ok(name):
+            continue
+        if stat_ok is not None and not stat_ok(types.SimpleNamespace(st_size=size, st_mtime=mtime)):
+            continue
+        yield name, table.dirs[table.dir_ids[row]], size, mtime
+
+
+def test_find_matches_a_linear_filter_at_the_bounds(tmp_path):
+    index = make_index(tmp_path)
+    # Every bound is also a value in the table, plus one past each end
+    sizes = [("greater than", size) for size in (-1, 0, 300, 900, 1000)] + [("less than", size) for size in (0, 100, 500, 900, 1000)]
+    dates = [(op, BASE + second) for op in ("before", "after") for second in (-1, 0, 7, 14, 15)]
+    for size, date, ext in itertools.product([None] + sizes, [None] + dates, [None, [".jpg"]]):
+        filters = {}
+        if size: filters['size'] = size
+        if date: filters['date'] = date
+        if ext: filters['ext'] = ext
+        assert list(index.find(filters)) == list(linear(index, filters)), filters
+
+
+def test_no_filters_yields_every_file_in_walk_order(tmp_path):
+    index = make_index(tmp_path)
+    assert [name for name, *_ in index.find({})] == [index.table.name(row) for row in range(len(index.table))]
+
+
+def test_is_current_notices_folder_changes(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    table = fm.FileTable()
+    for name in ("a", "b"):
+        table.add_dir(str(tmp_path / name))
+    index = fm.RangeIndex("key", table, [os.stat(path).st_mtime_ns for path in table.dirs])
+    assert index.is_current()
+
+    (tmp_path / "b" / "new.txt").write_text("x")
+    os.utime(tmp_path / "b", ns=(0, index.dir_mtimes[1] + 10**9)) # Past the timestamp granularity of any filesystem
+    assert not index.is_current()
+
+    (tmp_path / "b" / "new.txt").unlink()
+    os.rmdir(tmp_path / "b")
+    assert not index.is_current()
+
+
+def test_find_rechecks_files_changed_since_the_walk(tmp_path):
+    index = make_index(tmp_path)
+    filters = {'size': ("greater than", 800)}
+    before = {name for name, *_ in index.find(filters)}
+    grown, shrunk, removed = sorted(before)[:3]
+    (tmp_path / f"d{grown[1]}" / grown).write_bytes(b"x" * 5000) # Still matches, with its new size
+    (tmp_path / f"d{shrunk[1]}" / shrunk).write_bytes(b"") # No longer matches
+    (tmp_path / f"d{removed[1]}" / removed).unlink()
+
+    after = {name: size for name, _, size, _ in index.find(filters)}
+    assert set(after) == before - {shrunk, removed}
+    assert after[grown] == 5000
@@ -0,0 +1,87 @@
+import FileManager as fm
+
+COLUMNS = ("Name", "Size")
+
+
+def names(store):
+    return [store.values(pos)[0] for pos in range(len(store))]
+
+
+def make_tree():
+    """
+    b
+      b2
+      b1
+        x
+    a
+    c
+      c1
+    """
+    store = fm.ResultStore(COLUMNS)
+    store.insert(0, [("b", 2), ("a", 1), ("c", 3)])
+    store.insert(1, [("b2", 5), ("b1", 4)], depth=1)
+    store.insert(3, [("x", 0)], depth=2)
+    store.insert(6, [("c1", 6)], depth=1)
+    return store
+
+
+def test_flat_sort_keeps_ids_and_data_with_their_rows():
+    store = fm.ResultStore(COLUMNS)
+    ids = store.insert(0, [("b", 2), ("a", 3), ("c", 1)], datas=["B", "A", "C"])
+    store.sort("Size")
+    assert names(store) == ["c", "b", "a"]
+    assert store.data == ["C", "B", "A"]
+    assert [store.position(row_id) for row_id in ids] == [1, 2, 0]
+    store.sort("Name", reverse=True)
+    assert names(store) == ["c", "b", "a"]
+
+
+def test_tree_sort_keeps_children_under_their_parent():
+    store = make_tree()
+    assert names(store) == ["b", "b2", "b1", "x", "a", "c", "c1"]
+    store.sort("Name")
+    assert names(store) == ["a", "b", "b1", "x", "b2", "c", "c1"]
+    assert store.depth == [0, 0, 1, 2, 1, 0, 1]
+    store.sort("Size", reverse=True)
+    assert names(store) == ["c", "c1", "b", "b2", "b1", "x", "a"]
+
+
+def test_subtree_end_and_parent():
+    store = make_tree()
+    assert store.subtree_end(0) == 4
+    assert store.subtree_end(2) == 4
+    assert store.subtree_end(4) == 5
+    assert store.parent(3) == 2
+    assert store.parent(2) == 0
+    assert store.parent(6) == 5
+    assert store.parent(4) is None
+
+
+def test_remove_takes_the_rows_under_too():
+    store = make_tree()
+    ids = list(store.ids)
+    store.remove([0, 6])
+    assert names(store) == ["a", "c"]
+    assert store.position(ids[0]) is None
+    assert store.position(ids[5]) == 1
+
+    store = make_tree()
+    store.remove([2]) # A child and its own child
+    assert names(store) == ["b", "b2", "a", "c", "c1"]
+
+
+def test_positions_follow_inserts_in_the_middle():
+    store = fm.ResultStore(COLUMNS)
+    first = store.insert(0, [("a", 1), ("b", 2)])
+    middle = store.insert(1, [("m", 0)])
+    assert [store.position(row_id) for row_id in first + middle] == [0, 2, 1]
+    assert store.insert(3, []) == []
+
+
+def test_sort_keys():
+    size = fm.result_sort_key("Size")
+    assert sorted(["1.50 MB", "900 B", "2.00 KB", "bad"], key=size) == ["bad", "900 B", "2.00 KB", "1.50 MB"]
+    items = fm.result_sort_key("Items")
+    assert sorted(["1,200", "File", "30"], key=items) == ["File", "30", "1,200"]
+    assert fm.result_sort_key("Set #")("Set 12") == 12
+    assert sorted(["b", "A", "c"], key=fm.result_sort_key("Name")) == ["A", "b", "c"]
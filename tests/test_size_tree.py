@@ -0,0 +1,103 @@
+import os
+
+import FileManager as fm
+
+
+def make_tree(root):
+    sizes = {"big/a.bin": 5000, "big/inner/b.bin": 3000, "small/c.bin": 10, "mid/d.bin": 700, "top.bin": 1}
+    for name, size in sizes.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * size)
+    (root / "empty").mkdir()
+
+
+def test_tree_children_are_sorted_biggest_first(tmp_path):
+    make_tree(tmp_path)
+    root, _, _ = fm.analyze_tree(str(tmp_path), False, {}, workers=2)
+    assert [os.path.basename(node.path) for node in root.children] == ["big", "mid", "small", "empty"]
+    big = root.children[0]
+    assert (big.size, big.items) == (8000, 2)
+    assert [(os.path.basename(node.path), node.size) for node in big.children] == [("inner", 3000)]
+
+
+def test_files_are_leaves_when_included(tmp_path):
+    make_tree(tmp_path)
+    root, _, _ = fm.analyze_tree(str(tmp_path), True, {}, workers=2)
+    names = [os.path.basename(node.path) for node in root.children]
+    assert names == ["big", "mid", "small", "top.bin", "empty"]
+    leaf = root.children[3]
+    assert leaf.children is None and (leaf.size, leaf.items) == (1, 1)
+    assert [os.path.basename(node.path) for node in root.children[0].children] == ["a.bin", "inner"]
+
+
+def test_filtered_scans_keep_no_tree(tmp_path):
+    make_tree(tmp_path)
+    rows = []
+    root, _, _ = fm.analyze_tree(str(tmp_path), False, {'size': ("greater than", 500)}, workers=2,
+                                 on_rows=lambda batch, matched, done, total: rows.extend(batch))
+    assert root.children == []
+    assert root.size == 8711
+    # Every folder passing the filter is a row, at any depth (the root itself isn't one)
+    assert sorted(os.path.basename(os.path.join(parent, name)) for name, parent, _, _ in rows) == ["big", "inner", "mid"]
+
+
+class ExpandableList:
+    """The expand/collapse logic of VirtualList, without its Treeview."""
+    toggle = fm.VirtualList.toggle
+    _can_open = fm.VirtualList._can_open
+
+    def __init__(self, children, row_values):
+        self.store = fm.ResultStore(("Name", "Size"))
+        self._children_of = children
+        self._row_values = row_values
+        self._opened = set()
+        self._selected = set()
+        self._sort = None
+
+    def _schedule(self):
+        pass
+
+
+def test_rows_expand_lazily_and_collapse(tmp_path):
+    make_tree(tmp_path)
+    root, _, _ = fm.analyze_tree(str(tmp_path), True, {}, workers=2)
+    opened = []
+
+    def children(node):
+        opened.append(node.path)
+        return node.children
+    view = ExpandableList(children, lambda node: (os.path.basename(node.path), node.size))
+    view.store.insert(0, [view._row_values(node) for node in root.children], root.children)
+    assert opened == []
+
+    big_id = view.store.ids[0]
+    view.toggle(big_id)
+    assert [values[0] for values in map(view.store.values, range(len(view.store)))][:4] == ["big", "a.bin", "inner", "mid"]
+    assert view.store.depth[:4] == [0, 1, 1, 0]
+    inner_id = view.store.ids[2]
+    view.toggle(inner_id)
+    assert view.store.values(3) == ("b.bin", 3000)
+    leaf_id = view.store.ids[3]
+    view.toggle(leaf_id) # Files have nothing to open
+    assert len(view.store) == 8
+
+    view.toggle(big_id) # Collapses the open row under it too
+    assert len(view.store) == 5
+    assert view._opened == set()
+    view.toggle(big_id)
+    assert len(view.store) == 7 # Opened again one level deep
+
+
+def test_expanded_rows_follow_the_last_sort(tmp_path):
+    make_tree(tmp_path)
+    root, _, _ = fm.analyze_tree(str(tmp_path), True, {}, workers=2)
+    view = ExpandableList(lambda node: node.children, lambda node: (os.path.basename(node.path), node.size))
+    view.store.insert(0, [view._row_values(node) for node in root.children], root.children)
+    view._sort = (0, False, fm.result_sort_key("Name"))
+    view.toggle(view.store.ids[0])
+    assert view.store.values(1)[0] == "a.bin" and view.store.values(2)[0] == "inner"
+    view.toggle(view.store.ids[0])
+    view._sort = (1, False, None) # Smallest first
+    view.toggle(view.store.ids[0])
+    assert [view.store.values(pos)[0] for pos in (1, 2)] == ["inner", "a.bin"]
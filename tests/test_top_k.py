@@ -0,0 +1,36 @@
+import random
+
+import FileManager as fm
+
+
+def test_keeps_the_k_highest_first():
+    values = list(range(1000))
+    random.Random(4).shuffle(values)
+    top = fm.TopK(10)
+    for value in values:
+        top.offer(value, f"item{value}")
+    assert top.items() == [f"item{value}" for value in range(999, 989, -1)]
+    assert top.seen == 1000
+
+
+def test_equal_keys_keep_the_first_offered():
+    top = fm.TopK(2)
+    for name in ["a", "b", "c"]:
+        top.offer(5, name)
+    top.offer(1, "small")
+    assert top.items() == ["a", "b"]
+
+
+def test_fewer_items_than_k():
+    top = fm.TopK(5)
+    top.offer(1, "x")
+    top.offer(3, "y")
+    assert top.items() == ["y", "x"]
+    assert fm.TopK(3).items() == []
+
+
+def test_items_need_not_be_comparable():
+    top = fm.TopK(2)
+    for key in [1, 1, 2]:
+        top.offer(key, {"key": key}) # Dicts can't be ordered, so ties must never compare them
+    assert top.items() == [{"key": 2}, {"key": 1}]
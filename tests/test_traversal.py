@@ -0,0 +1,94 @@
+import os
+
+import FileManager as fm
+
+
+def make_tree(root):
+    for folder in ["a", "a/deep/er", "b", "c/skip", "c/keep"]:
+        os.makedirs(root / folder)
+    for path in ["top.txt", "a/1.txt", "a/deep/2.txt", "a/deep/er/3.txt", "b/4.txt", "c/skip/5.txt", "c/keep/6.txt"]:
+        (root / path).write_text(path)
+
+
+def flatten(walk):
+    return [(root, list(dirs), sorted(entry.name for entry in files)) for root, dirs, files in walk]
+
+
+def test_same_output_as_scan_tree(tmp_path):
+    make_tree(tmp_path)
+    top = str(tmp_path)
+    for topdown in (True, False):
+        expected = flatten(fm.scan_tree(top, topdown=topdown))
+        for workers in (1, 4):
+            # max_buffered=1 keeps the threads in step with the consumer
+            for max_buffered in (1, 64):
+                walk = fm.parallel_scan_tree(top, workers=workers, topdown=topdown, max_buffered=max_buffered)
+                assert flatten(walk) == expected
+
+
+def test_pruned_folders_are_not_walked(tmp_path):
+    make_tree(tmp_path)
+    seen = []
+    for root, dirs, files in fm.parallel_scan_tree(str(tmp_path), workers=4):
+        if os.path.basename(root) == "c":
+            dirs.remove("skip")
+        seen.append(os.path.relpath(root, tmp_path))
+    assert "c/skip".replace("/", os.sep) not in seen
+    assert "c/keep".replace("/", os.sep) in seen
+
+
+def test_rules_and_file_filter(tmp_path):
+    make_tree(tmp_path)
+    rules = fm.WalkRules(str(tmp_path), ["deep/", "4.txt"])
+    names = set()
+    for root, dirs, files in fm.parallel_scan_tree(str(tmp_path), rules=rules, file_filter=lambda name: name != "top.txt"):
+        names.update(entry.name for entry in files)
+    assert names == {"1.txt", "5.txt", "6.txt"}
+
+
+def test_listing_errors_go_to_onerror(tmp_path):
+    errors = []
+    walk = list(fm.parallel_scan_tree(str(tmp_path / "missing"), onerror=errors.append))
+    assert walk == []
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
+
+
+def test_dir_mtimes_are_taken_for_every_folder(tmp_path):
+    make_tree(tmp_path)
+    mtimes = {}
+    roots = [root for root, _, _ in fm.parallel_scan_tree(str(tmp_path), dir_mtimes=mtimes)]
+    assert set(mtimes) == set(roots)
+    assert all(mtimes[root] == os.stat(root).st_mtime_ns for root in roots)
+
+
+def test_scan_tree_matches_os_walk(tmp_path):
+    make_tree(tmp_path)
+    for topdown in (True, False):
+        expected = [(root, sorted(dirs), sorted(files)) for root, dirs, files in os.walk(tmp_path, topdown=topdown)]
+        walked = [(root, sorted(dirs), sorted(entry.name for entry in files)) for root, dirs, files in fm.scan_tree(str(tmp_path), topdown=topdown)]
+        assert sorted(walked) == sorted(expected)
+
+
+def test_scan_dir_never_follows_folder_links(tmp_path):
+    make_tree(tmp_path)
+    os.symlink(tmp_path / "a", tmp_path / "link_to_a")
+    os.symlink(tmp_path / "top.txt", tmp_path / "link_to_top")
+    dirs, files = fm.scan_dir(str(tmp_path))
+    assert sorted(dirs) == ["a", "b", "c"]
+    assert sorted(entry.name for entry in files) == ["link_to_top", "top.txt"] # A folder link is in neither list
+    roots = [root for root, _, _ in fm.scan_tree(str(tmp_path))]
+    assert str(tmp_path / "link_to_a") not in roots
+
+
+def test_scan_tree_can_be_pruned_and_reports_errors(tmp_path):
+    make_tree(tmp_path)
+    roots = []
+    for root, dirs, files in fm.scan_tree(str(tmp_path)):
+        roots.append(os.path.relpath(root, tmp_path))
+        if "a" in dirs:
+            dirs.remove("a")
+    assert not any(root.startswith("a") for root in roots)
+
+    errors = []
+    assert list(fm.scan_tree(str(tmp_path / "missing"), onerror=errors.append)) == []
+    assert len(errors) == 1
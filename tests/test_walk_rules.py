@@ -0,0 +1,69 @@
+import os
+
+import FileManager as fm
+
+ROOT = os.path.abspath("scan")
+
+
+def folder(*parts):
+    return os.path.join(ROOT, *parts)
+
+
+def kept_dirs(patterns, parent, names):
+    return fm.WalkRules(ROOT, patterns).filter_dirs(parent, names)
+
+
+def kept_files(patterns, parent, names):
+    rules = fm.WalkRules(ROOT, patterns)
+    return [name for name in names if rules.keep_file(parent, name)]
+
+
+def test_unanchored_patterns_match_at_any_depth():
+    assert kept_files(["*.tmp"], ROOT, ["a.tmp", "a.txt"]) == ["a.txt"]
+    assert kept_files(["*.tmp"], folder("x", "y"), ["b.tmp", "b.txt"]) == ["b.txt"]
+    assert kept_dirs(["node_modules"], folder("web", "app"), ["node_modules", "src"]) == ["src"]
+
+
+def test_anchored_patterns_match_from_the_root_only():
+    assert kept_dirs(["/build"], ROOT, ["build", "src"]) == ["src"]
+    assert kept_dirs(["/build"], folder("src"), ["build"]) == ["build"]
+    assert kept_dirs(["src/gen"], ROOT, ["gen"]) == ["gen"] # Only under src
+    assert kept_dirs(["src/gen"], folder("src"), ["gen", "lib"]) == ["lib"]
+
+
+def test_globs_stay_within_one_component():
+    assert kept_dirs(["src/*"], folder("src"), ["a"]) == []
+    assert kept_files(["src/*"], folder("src", "a"), ["f"]) == ["f"]
+    assert kept_files(["?.log"], ROOT, ["a.log", "ab.log"]) == ["ab.log"]
+    assert kept_files(["[ab].txt"], ROOT, ["a.txt", "c.txt"]) == ["c.txt"]
+    assert kept_files(["[!ab].txt"], ROOT, ["a.txt", "c.txt"]) == ["a.txt"]
+
+
+def test_double_star_crosses_folders():
+    assert kept_files(["docs/**/*.pdf"], folder("docs"), ["a.pdf"]) == []
+    assert kept_files(["docs/**/*.pdf"], folder("docs", "x", "y"), ["b.pdf", "b.md"]) == ["b.md"]
+    assert kept_files(["docs/**/*.pdf"], folder("other"), ["c.pdf"]) == ["c.pdf"]
+    assert kept_files(["logs/**"], folder("logs", "2020"), ["d"]) == []
+
+
+def test_trailing_slash_matches_folders_only():
+    assert kept_dirs(["cache/"], ROOT, ["cache", "src"]) == ["src"]
+    assert kept_files(["cache/"], ROOT, ["cache"]) == ["cache"]
+
+
+def test_last_matching_pattern_wins():
+    patterns = ["*.log", "!keep.log"]
+    assert kept_files(patterns, folder("a"), ["x.log", "keep.log", "y.txt"]) == ["keep.log", "y.txt"]
+    assert kept_files(["!keep.log", "*.log"], ROOT, ["keep.log"]) == []
+
+
+def test_comments_and_blank_lines_are_ignored():
+    assert kept_files(["# *.txt", "", "   "], ROOT, ["a.txt"]) == ["a.txt"]
+
+
+def test_filter_files_takes_dir_entries(tmp_path):
+    for name in ["a.txt", "b.tmp"]:
+        (tmp_path / name).write_text(name)
+    rules = fm.WalkRules(str(tmp_path), ["*.tmp"])
+    with os.scandir(tmp_path) as entries:
+        assert [entry.name for entry in rules.filter_files(str(tmp_path), list(entries))] == ["a.txt"]